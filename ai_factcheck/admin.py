@@ -1,10 +1,32 @@
 # ai_factcheck/admin.py
 from django.contrib import admin
-from .models import AIAnalysis
+from .models import AIAnalysis, AnalysisJob, AnalysisCacheEntry, AIUsageRollup
 
 @admin.register(AIAnalysis)
 class AIAnalysisAdmin(admin.ModelAdmin):
-    list_display = ['id', 'submission', 'suggested_verdict', 'confidence_score', 'created_at']
-    list_filter = ['suggested_verdict', 'created_at']
+    list_display = ['id', 'submission', 'suggested_verdict', 'confidence_score', 'from_cache', 'cost_usd', 'created_at']
+    list_filter = ['suggested_verdict', 'from_cache', 'created_at']
     search_fields = ['submission__claim_text', 'claim_extracted']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'submission', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    raw_id_fields = ['submission', 'requested_by', 'analysis']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'locked_by', 'locked_until']
+
+
+@admin.register(AnalysisCacheEntry)
+class AnalysisCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'suggested_verdict', 'ai_model_used', 'prompt_version', 'hit_count', 'time_saved', 'expires_at']
+    list_filter = ['suggested_verdict', 'ai_model_used', 'prompt_version']
+    readonly_fields = ['cache_key', 'claim_hash', 'hit_count', 'time_saved', 'created_at', 'last_hit_at']
+
+
+@admin.register(AIUsageRollup)
+class AIUsageRollupAdmin(admin.ModelAdmin):
+    list_display = ['hour', 'ai_model_used', 'calls', 'cache_hits', 'prompt_tokens', 'completion_tokens', 'cost_usd']
+    list_filter = ['ai_model_used']
+    date_hierarchy = 'hour'
@@ -0,0 +1,114 @@
+# ai_factcheck/analysis_cache.py
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import AIAnalysis, AnalysisCacheEntry
+
+
+def normalize_claim(text):
+    """
+    Normalize claim text so trivially different submissions hash the same:
+    Unicode-normalized, case-folded, accents and punctuation removed, whitespace collapsed.
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^\w\s]', ' ', text.casefold())
+    return ' '.join(text.split())
+
+
+def claim_hash(submission):
+    """Hash of the normalized claim and context"""
+    normalized = f"{normalize_claim(submission.claim_text)}\n{normalize_claim(submission.context)}"
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def make_cache_key(submission, model, prompt_version):
+    """
+    Cache key for a submission's analysis. The model and prompt version are part
+    of the key, so changing either one stops old answers from being served.
+    """
+    raw = f"{claim_hash(submission)}:{model}:{prompt_version}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def lookup_many(cache_keys):
+    """Return {cache_key: entry} for the unexpired entries among `cache_keys`"""
+    entries = AnalysisCacheEntry.objects.filter(cache_key__in=set(cache_keys), expires_at__gt=timezone.now())
+    return {entry.cache_key: entry for entry in entries}
+
+
+def lookup(cache_key):
+    return lookup_many([cache_key]).get(cache_key)
+
+
+def store(submission, cache_key, model, prompt_version, ai_data, processing_time):
+    """
+    Remember a fresh AI answer for this claim. Entries for the same claim made with
+    another model or prompt version are dropped, since they'll never be served again.
+    """
+    key_hash = claim_hash(submission)
+    AnalysisCacheEntry.objects.filter(claim_hash=key_hash).exclude(cache_key=cache_key).delete()
+
+    fields = dict(
+        claim_hash=key_hash,
+        ai_model_used=model,
+        prompt_version=prompt_version,
+        confidence_score=ai_data.get('confidence_score', 0.5),
+        suggested_verdict=ai_data.get('suggested_verdict', 'unverifiable'),
+        evidence_sources=ai_data.get('evidence', []),
+        similar_claims=ai_data.get('similar_claims', []),
+        processing_time=processing_time,
+        expires_at=timezone.now() + timedelta(seconds=settings.AI_ANALYSIS_CACHE_TTL),
+    )
+    # Single-statement writes rather than update_or_create(): worker threads store
+    # concurrently, and SQLite can't upgrade a read transaction to a write one under contention
+    if AnalysisCacheEntry.objects.filter(cache_key=cache_key).update(**fields):
+        return
+    try:
+        AnalysisCacheEntry.objects.create(cache_key=cache_key, **fields)
+    except IntegrityError:
+        pass  # Another worker stored the same claim at the same time
+
+
+def build_cached_analysis(submission, entry, lookup_time):
+    """Build (without saving) an AIAnalysis that copies a cached answer"""
+    return AIAnalysis(
+        submission=submission,
+        claim_extracted=submission.claim_text,
+        confidence_score=entry.confidence_score,
+        suggested_verdict=entry.suggested_verdict,
+        evidence_sources=entry.evidence_sources,
+        similar_claims=entry.similar_claims,
+        processing_time=lookup_time,
+        ai_model_used=entry.ai_model_used,
+        from_cache=True,
+    )
+
+
+def record_hits(entry, count=1, lookup_time=0.0):
+    """Count cache hits and the AI time they saved"""
+    AnalysisCacheEntry.objects.filter(pk=entry.pk).update(
+        hit_count=F('hit_count') + count,
+        time_saved=F('time_saved') + count * max(entry.processing_time - lookup_time, 0),
+        last_hit_at=timezone.now(),
+    )
+
+
+def cache_stats():
+    """Hit ratio over all analyses, and the AI time saved by the cache"""
+    hits = AIAnalysis.objects.filter(from_cache=True).count()
+    total = AIAnalysis.objects.count()
+    totals = AnalysisCacheEntry.objects.aggregate(time_saved=Sum('time_saved'), hits=Sum('hit_count'))
+    return {
+        'analyses': total,
+        'cache_hits': hits,
+        'cache_misses': total - hits,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+        'time_saved_seconds': round(totals['time_saved'] or 0.0, 3),
+        'entries': AnalysisCacheEntry.objects.filter(expires_at__gt=timezone.now()).count(),
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiFactcheckConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_factcheck'
+
+    def ready(self):
+        # Keep the fact-check similarity index in sync
+        from . import signals  # noqa: F401
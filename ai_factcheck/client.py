@@ -0,0 +1,268 @@
+# ai_factcheck/client.py
+"""
+Process-wide client for the AI provider.
+
+Every request and worker thread in the process shares one ProviderClient, which
+wraps the backend picked with settings.AI_PROVIDER_BACKEND (see
+ai_factcheck/providers), so the backend's connection pool is reused between calls.
+Calls go through jittered exponential retries on retryable errors and a circuit
+breaker: after AI_CIRCUIT_FAILURE_THRESHOLD consecutive failures, calls fail fast
+with CircuitOpenError for AI_CIRCUIT_RECOVERY_TIMEOUT seconds, then a single
+probe call decides whether the breaker closes again.
+
+Breaker state and call/retry counters are per process; see provider_metrics().
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .providers import ProviderError, ProviderUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """Raised instead of calling the provider while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"AI provider circuit open, retry in {retry_after:.0f}s", retry_after=retry_after)
+
+
+def is_retryable_error(error):
+    """Whether a failed analysis is worth retrying later (timeouts, rate limits, provider 5xx, open breaker)"""
+    return isinstance(error, ProviderError) and error.retryable
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, recovery_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            waited = self.clock() - self.opened_at
+            if self.state == self.OPEN and waited >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True  # Let one probe through; everyone else still fails fast
+                return
+            raise CircuitOpenError(max(self.recovery_timeout - waited, 0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("AI provider circuit closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def release(self):
+        """
+        End a call that has no outcome (cancelled or interrupted), so a probe
+        that never finished doesn't keep the breaker half-open for good
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.times_opened += 1
+                logger.warning(f"AI provider circuit opened after {self.consecutive_failures} consecutive failure(s)")
+            self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'seconds_until_probe': (
+                    round(max(self.recovery_timeout - (self.clock() - self.opened_at), 0), 1)
+                    if self.state == self.OPEN else None
+                ),
+            }
+
+
+class ProviderClient:
+    """
+    Wraps a provider backend with retries, the circuit breaker and metrics.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else import_string(settings.AI_PROVIDER_BACKEND)()
+        self.max_retries = settings.AI_PROVIDER_MAX_RETRIES
+        self.breaker = CircuitBreaker(settings.AI_CIRCUIT_FAILURE_THRESHOLD, settings.AI_CIRCUIT_RECOVERY_TIMEOUT)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(['calls', 'successes', 'failures', 'retries', 'rejected'], 0)
+
+    @property
+    def model(self):
+        """The model answering the calls"""
+        return self.backend.model
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def retry_delay(self, attempt, error):
+        """Full-jitter exponential backoff, or the provider's Retry-After when it sent one"""
+        cap = settings.AI_PROVIDER_RETRY_MAX_DELAY
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return min(retry_after, cap)
+        return random.uniform(0, min(cap, settings.AI_PROVIDER_RETRY_BASE * 2 ** attempt))
+
+    def _before_attempt(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count('rejected')
+            raise
+        self._count('calls')
+
+    def _after_error(self, error, attempt):
+        """Record a failed attempt; returns the delay before retrying, or None to give up"""
+        if not is_retryable_error(error):
+            # The provider answered (bad request, quota...), so it's healthy
+            self.breaker.record_success()
+            self._count('failures')
+            return None
+        self.breaker.record_failure()
+        self._count('failures')
+        if attempt >= self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+            return None
+        self._count('retries')
+        delay = self.retry_delay(attempt, error)
+        logger.warning(f"AI provider call failed ({error}), retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    def _after_success(self):
+        self.breaker.record_success()
+        self._count('successes')
+
+    def create_completion(self, call_info=None, **kwargs):
+        """
+        A Completion from the backend, with retries and the breaker.
+        Pass a dict as `call_info` to get the number of retries it took back in it.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._before_attempt()
+            try:
+                response = self.backend.complete(**kwargs)
+            except Exception as e:
+                delay = self._after_error(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self._after_success()
+                if call_info is not None:
+                    call_info['retries'] = attempt
+                return response
+
+    async def _aretry(self, call, call_info, kwargs):
+        for attempt in range(self.max_retries + 1):
+            self._before_attempt()
+            try:
+                response = await call(**kwargs)
+            except Exception as e:
+                delay = self._after_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled (e.g. the client of a stream went away): no outcome to record
+                self.breaker.release()
+                raise
+            else:
+                self._after_success()
+                if call_info is not None:
+                    call_info['retries'] = attempt
+                return response
+
+    async def acreate_completion(self, call_info=None, **kwargs):
+        """Async create_completion()"""
+        return await self._aretry(self.backend.acomplete, call_info, kwargs)
+
+    async def astream_completion(self, call_info=None, **kwargs):
+        """
+        Start a streamed answer and return an async iterator of CompletionChunk.
+        Only starting the stream is retried; an error mid-stream is raised to the caller.
+        """
+        return await self._aretry(self.backend.open_stream, call_info, kwargs)
+
+    async def aclose(self):
+        """Close the backend's connections on the running event loop (e.g. at the end of a batch)"""
+        await self.backend.aclose()
+
+    def metrics(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {'backend': type(self.backend).__name__, 'model': self.model, 'circuit': self.breaker.snapshot(), **counters}
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """The process-wide ProviderClient"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = ProviderClient()
+        return _provider
+
+
+def reset_provider():
+    """Drop the shared client, e.g. after changing provider settings"""
+    global _provider
+    with _provider_lock:
+        if _provider is not None:
+            _provider.backend.close()
+        _provider = None
+
+
+@contextmanager
+def use_backend(backend):
+    """Route this process's AI calls through another backend (e.g. a LocalProvider) while in the block"""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, ProviderClient(backend)
+    try:
+        yield _provider
+    finally:
+        with _provider_lock:
+            _provider = previous
+        backend.close()
+
+
+def provider_metrics():
+    return get_provider().metrics()
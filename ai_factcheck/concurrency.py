@@ -0,0 +1,154 @@
+# ai_factcheck/concurrency.py
+"""
+Cross-worker coordination of paid AI calls, kept in the shared cache
+(settings.AI_RATE_LIMIT_CACHE_ALIAS; configure REDIS_URL so every worker
+process sees the same cache).
+
+- Token buckets: each user, and the whole site, may start at most N new
+  analyses per period (AI_RATE_LIMIT_USER / AI_RATE_LIMIT_GLOBAL, e.g. "10/min"),
+  with bursts up to N.
+- Single-flight locks: one in-flight provider call per submission; other
+  requests for the same submission wait for its result instead of paying again.
+"""
+import logging
+import math
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def get_cache():
+    return caches[settings.AI_RATE_LIMIT_CACHE_ALIAS]
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60). None or '' means unlimited."""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip().lower()]
+
+
+@contextmanager
+def cache_lock(key, timeout=2.0, wait=1.0):
+    """
+    A short mutual-exclusion lock built on cache.add(). Yields whether it was acquired.
+    """
+    cache = get_cache()
+    lock_key = f'ai:lock:{key}'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    acquired = cache.add(lock_key, token, timeout=timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.005)
+        acquired = cache.add(lock_key, token, timeout=timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _take(bucket, rate, cost):
+    """
+    Take `cost` tokens from a bucket. Returns 0 on success, otherwise the
+    seconds until enough tokens will have refilled.
+    """
+    capacity, period = rate
+    refill_per_second = capacity / period
+    cache = get_cache()
+    key = f'ai:bucket:{bucket}'
+
+    with cache_lock(key) as locked:
+        if not locked:
+            # Don't take the feature down because the cache is slow; let the call through
+            logger.warning(f"Could not lock rate limit bucket {bucket}; allowing the call")
+            return 0
+        now = time.time()
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        wait = 0 if tokens >= cost else (cost - tokens) / refill_per_second
+        if not wait:
+            tokens -= cost
+        cache.set(key, (tokens, now), timeout=period + 60)
+    return wait
+
+
+def _refund(bucket, rate, cost):
+    cache = get_cache()
+    key = f'ai:bucket:{bucket}'
+    with cache_lock(key) as locked:
+        state = cache.get(key)
+        if locked and state:
+            cache.set(key, (min(rate[0], state[0] + cost), state[1]), timeout=rate[1] + 60)
+
+
+def check_rate_limits(user, cost=1):
+    """
+    Take tokens from the user's bucket and the global bucket for a new AI call.
+    With no user (management commands), only the global bucket applies.
+    Returns 0 when the call may go ahead, otherwise the seconds to wait
+    (and nothing is taken).
+    """
+    buckets = [('global', parse_rate(settings.AI_RATE_LIMIT_GLOBAL))]
+    if user is not None:
+        buckets.insert(0, (f'user:{user.pk}', parse_rate(settings.AI_RATE_LIMIT_USER)))
+    taken = []
+    for bucket, rate in buckets:
+        if rate is None:
+            continue
+        wait = _take(bucket, rate, cost)
+        if wait:
+            for taken_bucket, taken_rate in taken:
+                _refund(taken_bucket, taken_rate, cost)
+            logger.info(f"AI rate limit hit on bucket {bucket}, retry in {wait:.1f}s")
+            return wait
+        taken.append((bucket, rate))
+    return 0
+
+
+def retry_after_header(wait):
+    return str(max(1, math.ceil(wait)))
+
+
+def _flight_key(submission_id):
+    return f'ai:inflight:submission:{submission_id}'
+
+
+def acquire_flight(submission_id):
+    """
+    Claim the single in-flight AI call for a submission. Returns a token to pass
+    to release_flight(), or None when another request already has it.
+    The claim expires after AI_SINGLE_FLIGHT_TIMEOUT in case its holder dies.
+    """
+    token = uuid.uuid4().hex
+    if get_cache().add(_flight_key(submission_id), token, timeout=settings.AI_SINGLE_FLIGHT_TIMEOUT):
+        return token
+    return None
+
+
+def release_flight(submission_id, token):
+    cache = get_cache()
+    if token and cache.get(_flight_key(submission_id)) == token:
+        cache.delete(_flight_key(submission_id))
+
+
+def flight_in_progress(submission_id):
+    return get_cache().get(_flight_key(submission_id)) is not None
+
+
+@contextmanager
+def single_flight(submission_id):
+    """Yields True when this caller owns the submission's in-flight call"""
+    token = acquire_flight(submission_id)
+    try:
+        yield token is not None
+    finally:
+        release_flight(submission_id, token)
@@ -0,0 +1,63 @@
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from factchecks.models import Submission
+from ai_factcheck import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyze submissions with AI in concurrent batches and report throughput. "
+        "Calls share the global AI rate limit and the single-flight claims with the API; "
+        "submissions another request is analyzing are reported as in_progress. "
+        "Set OPENAI_BASE_URL to run it against a local stub provider (run_ai_stub_server)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', type=int, nargs='+', help="Submission ids to analyze.")
+        parser.add_argument('--status', help="Analyze submissions with this status (e.g. 'new').")
+        parser.add_argument('--limit', type=int, help="Stop after this many submissions.")
+        parser.add_argument('--concurrency', type=int, default=settings.AI_BATCH_CONCURRENCY)
+        parser.add_argument('--batch-size', type=int, default=settings.AI_BATCH_MAX_SIZE)
+
+    def handle(self, *args, **options):
+        if not options['ids'] and not options['status']:
+            raise CommandError("Provide --ids or --status.")
+
+        if options['ids']:
+            submission_ids = options['ids'][:options['limit']]
+        else:
+            # Pick the whole selection up front so failed submissions aren't picked again
+            submission_ids = list(
+                Submission.objects.filter(status=options['status'], ai_analyses__isnull=True)
+                .order_by('date_submitted', 'id').values_list('id', flat=True)[:options['limit']]
+            )
+
+        totals = Counter()
+        start_time = time.time()
+        batch_size = options['batch_size']
+        for i in range(0, len(submission_ids), batch_size):
+            batch = submission_ids[i:i + batch_size]
+            while batch:
+                results = services.run_batch(batch, concurrency=options['concurrency'])
+                # Stay under the global AI rate limit, which the API's requests share
+                limited = [result for result in results if result['status'] == 'rate_limited']
+                for result in results:
+                    if result['status'] != 'rate_limited':
+                        totals[result['status']] += 1
+                    if result['status'] == 'failed':
+                        self.stderr.write(f"Submission {result['submission_id']}: {result['error']}")
+                batch = [result['submission_id'] for result in limited]
+                if limited:
+                    wait = max(result['retry_after'] for result in limited)
+                    self.stdout.write(f"  Rate limited, waiting {wait:.1f}s")
+                    time.sleep(wait)
+            self.stdout.write(f"  {min(i + batch_size, len(submission_ids))}/{len(submission_ids)}")
+
+        elapsed = time.time() - start_time
+        throughput = totals['analyzed'] / elapsed if elapsed else 0
+        self.stdout.write(', '.join(f"{count} {name}" for name, count in sorted(totals.items())) or "Nothing to analyze.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.2f}s ({throughput:.1f} analyses/s, concurrency {options['concurrency']})."
+        ))
@@ -0,0 +1,189 @@
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from factchecks.models import Submission
+from ai_factcheck import analysis_cache, services, usage
+from ai_factcheck.client import get_provider, use_backend
+from ai_factcheck.models import AIAnalysis, AnalysisCacheEntry, AnalysisJob
+from ai_factcheck.providers.local import LocalProvider
+from ai_factcheck.worker import claim_jobs, make_worker_id, run_job
+
+SUBJECTS = ['The mayor', 'A new study', 'The ministry of health', 'A viral video', 'The central bank', 'Local farmers']
+CLAIMS = [
+    'says fuel prices will double next month', 'shows that the river water is unsafe to drink',
+    'announced free school meals for every district', 'proves the election results were changed',
+    'reports that the new road will open in March', 'claims the vaccine campaign has ended',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive N synthetic submissions through the AI analysis pipeline and report "
+        "throughput and latency percentiles. Use --local to run offline against the "
+        "deterministic LocalProvider. It creates (and afterwards deletes) rows, so "
+        "run it against a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100, help="Number of submissions to analyze.")
+        parser.add_argument(
+            '--mode', choices=['direct', 'jobs', 'batch'], default='jobs',
+            help="direct: run_analysis() from a thread pool; jobs: queued AnalysisJobs drained by "
+                 "worker threads; batch: analyze_batch().",
+        )
+        parser.add_argument('--concurrency', type=int, default=settings.AI_WORKER_CONCURRENCY)
+        parser.add_argument('--batch-size', type=int, default=settings.AI_BATCH_MAX_SIZE)
+        parser.add_argument(
+            '--duplicates', type=float, default=0.0,
+            help="Share of submissions (0-1) repeating an earlier claim, to exercise the analysis cache.",
+        )
+        parser.add_argument('--local', action='store_true', help="Use the LocalProvider instead of the configured backend.")
+        parser.add_argument('--latency', type=float, help="LocalProvider latency in seconds.")
+        parser.add_argument('--jitter', type=float, help="LocalProvider extra random latency in seconds.")
+        parser.add_argument('--failure-rate', type=float, help="Share of LocalProvider calls that fail (0-1).")
+        parser.add_argument('--seed', type=int, help="Seed for the synthetic claims and the LocalProvider.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark submissions and analyses.")
+
+    def handle(self, *args, **options):
+        if options['count'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--count and --concurrency must be at least 1.")
+
+        if options['local']:
+            backend = LocalProvider(
+                latency=options['latency'], jitter=options['jitter'],
+                failure_rate=options['failure_rate'], seed=options['seed'],
+            )
+            with use_backend(backend):
+                self.benchmark(options)
+        else:
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        provider = get_provider()
+        metrics_before = provider.metrics()
+        started_at = timezone.now()
+        submissions = self.create_submissions(options['count'], options['duplicates'], options['seed'])
+        self.stdout.write(
+            f"Analyzing {len(submissions)} submission(s) with {type(provider.backend).__name__} "
+            f"({provider.model}), mode {options['mode']}, concurrency {options['concurrency']}..."
+        )
+
+        try:
+            start_time = time.time()
+            run = getattr(self, f"run_{options['mode']}")
+            latencies, outcomes = run(submissions, options)
+            elapsed = time.time() - start_time
+            self.report(submissions, latencies, outcomes, elapsed, metrics_before, provider.metrics())
+        finally:
+            if not options['keep']:
+                self.clean_up(submissions, started_at)
+
+    def create_submissions(self, count, duplicates, seed):
+        rng = random.Random(seed)
+        run_id = uuid.uuid4().hex[:8]
+        claims = []
+        for i in range(count):
+            if claims and rng.random() < duplicates:
+                claims.append(rng.choice(claims))
+            else:
+                claims.append(f"{rng.choice(SUBJECTS)} {rng.choice(CLAIMS)} (benchmark {run_id} #{i})")
+        # Saved one by one, not bulk-created: the stats counters count these rows
+        # on save, and clean_up's delete uncounts them
+        with transaction.atomic():
+            return [Submission.objects.create(claim_text=claim, submitter_name='benchmark_ai') for claim in claims]
+
+    def run_direct(self, submissions, options):
+        def analyze(submission):
+            start_time = time.time()
+            try:
+                services.run_analysis(submission)
+                return time.time() - start_time, 'analyzed'
+            except services.PROVIDER_ERRORS:
+                return time.time() - start_time, 'failed'
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='ai-benchmark') as pool:
+            results = list(pool.map(analyze, submissions))
+        latencies = [latency for latency, outcome in results if outcome == 'analyzed']
+        return latencies, Counter(outcome for _, outcome in results)
+
+    def run_jobs(self, submissions, options):
+        jobs = AnalysisJob.objects.bulk_create(
+            AnalysisJob(submission=submission, max_attempts=settings.AI_JOB_MAX_ATTEMPTS) for submission in submissions
+        )
+        job_ids = [job.id for job in jobs]
+        concurrency = options['concurrency']
+        worker_id = make_worker_id()
+
+        # The same loop as run_ai_worker, until every benchmark job has finished; it only
+        # claims the benchmark's own jobs, never ones queued by the site
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-benchmark') as pool:
+            while True:
+                free = concurrency - len(running)
+                for job in claim_jobs(worker_id, free, job_ids) if free else []:
+                    running.add(pool.submit(run_job, job))
+                if running:
+                    _, running = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                elif not AnalysisJob.objects.filter(id__in=job_ids, status__in=AnalysisJob.ACTIVE_STATUSES).exists():
+                    break
+                else:
+                    time.sleep(0.2)  # Waiting out a retry backoff
+
+        finished = AnalysisJob.objects.filter(id__in=job_ids).values_list('status', 'created_at', 'finished_at')
+        latencies = [
+            (finished_at - created_at).total_seconds()
+            for job_status, created_at, finished_at in finished if job_status == 'succeeded'
+        ]
+        return latencies, Counter('analyzed' if job_status == 'succeeded' else job_status for job_status, _, _ in finished)
+
+    def run_batch(self, submissions, options):
+        # Per-analysis latency here is the provider call time; the batch itself is measured by the wall clock
+        outcomes = Counter()
+        batch_size = options['batch_size']
+        for i in range(0, len(submissions), batch_size):
+            for result in services.analyze_batch(submissions[i:i + batch_size], options['concurrency']):
+                outcomes[result['status']] += 1
+        latencies = list(
+            AIAnalysis.objects.filter(submission__in=submissions).values_list('processing_time', flat=True)
+        )
+        return latencies, outcomes
+
+    def report(self, submissions, latencies, outcomes, elapsed, metrics_before, metrics_after):
+        analyses = AIAnalysis.objects.filter(submission__in=submissions)
+        cache_hits = analyses.filter(from_cache=True).count()
+        tokens = sum(prompt + completion for prompt, completion in analyses.values_list('prompt_tokens', 'completion_tokens'))
+        latencies = sorted(latencies)
+        analyzed = outcomes['analyzed']
+
+        self.stdout.write(', '.join(f"{count} {name}" for name, count in sorted(outcomes.items())))
+        self.stdout.write(f"Wall time:   {elapsed:.2f}s")
+        self.stdout.write(f"Throughput:  {analyzed / elapsed if elapsed else 0:.2f} analyses/s")
+        if latencies:
+            self.stdout.write(
+                f"Latency:     mean {sum(latencies) / len(latencies):.3f}s, "
+                + ', '.join(f"p{p} {usage.percentile(latencies, p):.3f}s" for p in usage.PERCENTILES)
+                + f", max {latencies[-1]:.3f}s"
+            )
+        self.stdout.write(f"Cache hits:  {cache_hits}")
+        self.stdout.write(f"Tokens:      {tokens}")
+        calls = {name: metrics_after[name] - metrics_before[name] for name in ('calls', 'retries', 'failures', 'rejected')}
+        self.stdout.write(
+            f"Provider:    {calls['calls']} call(s), {calls['retries']} retr{'y' if calls['retries'] == 1 else 'ies'}, "
+            f"{calls['failures']} failure(s), {calls['rejected']} rejected by the open circuit "
+            f"(circuit {metrics_after['circuit']['state']})"
+        )
+
+    def clean_up(self, submissions, started_at):
+        hashes = {analysis_cache.claim_hash(submission) for submission in submissions}
+        Submission.objects.filter(id__in=[submission.id for submission in submissions]).delete()
+        AnalysisCacheEntry.objects.filter(claim_hash__in=hashes, created_at__gte=started_at).delete()
+        usage.rebuild_rollups(since=started_at)  # Take the benchmark out of the usage stats
+        self.stdout.write("Deleted the benchmark submissions.")
@@ -0,0 +1,106 @@
+import random
+import string
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from factchecks.models import FactCheck
+from ai_factcheck import near_duplicates
+from ai_factcheck.usage import percentile
+
+EDITS = ['typo', 'drop', 'swap', 'case', 'punctuation']
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the recall, false positives and lookup latency of the near-duplicate "
+        "pre-screen on a synthetic corpus. The corpus is created in a transaction that "
+        "is rolled back, so the database is left as it was."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', type=int, default=5000, help="Synthetic fact-checks to index.")
+        parser.add_argument('--queries', type=int, default=500, help="Edited copies of corpus titles to look up.")
+        parser.add_argument('--negatives', type=int, default=500, help="Unrelated claims to look up.")
+        parser.add_argument('--max-edits', type=int, default=4, help="Most random edits applied to a query.")
+        parser.add_argument('--threshold', type=float, default=settings.AI_NEAR_DUPLICATE_THRESHOLD)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['corpus'] < 1:
+            raise CommandError("--corpus must be at least 1.")
+        self.rng = random.Random(options['seed'])
+        self.vocabulary = [self.word() for _ in range(5000)]
+
+        with transaction.atomic():
+            self.benchmark(options)
+            transaction.set_rollback(True)
+
+    def word(self):
+        return ''.join(self.rng.choice(string.ascii_lowercase) for _ in range(self.rng.randint(3, 10)))
+
+    def sentence(self, low, high):
+        return ' '.join(self.rng.choice(self.vocabulary) for _ in range(self.rng.randint(low, high))).capitalize()
+
+    def edit(self, text, edits):
+        words = text.split()
+        for _ in range(edits):
+            kind = self.rng.choice(EDITS)
+            i = self.rng.randrange(len(words))
+            if kind == 'typo' and len(words[i]) > 1:
+                j = self.rng.randrange(len(words[i]))
+                words[i] = words[i][:j] + self.rng.choice(string.ascii_lowercase) + words[i][j + 1:]
+            elif kind == 'drop' and len(words) > 3:
+                del words[i]
+            elif kind == 'swap' and i + 1 < len(words):
+                words[i], words[i + 1] = words[i + 1], words[i]
+            elif kind == 'case':
+                words[i] = words[i].upper()
+            else:
+                words[i] += self.rng.choice('.,!?')
+        return ' '.join(words)
+
+    def benchmark(self, options):
+        threshold = options['threshold']
+        start = time.perf_counter()
+        factchecks = FactCheck.objects.bulk_create(
+            FactCheck(title=self.sentence(6, 14), summary=self.sentence(30, 80), verdict='False')
+            for _ in range(options['corpus'])
+        )
+        near_duplicates.rebuild_index()
+        self.stdout.write(f"Indexed {len(factchecks)} synthetic fact-check(s) in {time.perf_counter() - start:.2f}s.")
+
+        latencies = []
+        expected = found = found_any = 0
+        for _ in range(options['queries']):
+            factcheck = self.rng.choice(factchecks)
+            query = self.edit(factcheck.title, self.rng.randint(0, options['max_edits']))
+            start = time.perf_counter()
+            match = near_duplicates.find_near_duplicate(query, threshold)
+            latencies.append(time.perf_counter() - start)
+            # Ground truth: the exact Jaccard similarity against the title it was made from
+            if near_duplicates.jaccard(query, factcheck.title) >= threshold:
+                expected += 1
+                found += bool(match and match.fact_check.id == factcheck.id)
+            found_any += bool(match and match.fact_check.id == factcheck.id)
+
+        false_positives = 0
+        for _ in range(options['negatives']):
+            start = time.perf_counter()
+            match = near_duplicates.find_near_duplicate(self.sentence(6, 14), threshold)
+            latencies.append(time.perf_counter() - start)
+            false_positives += match is not None
+
+        latencies.sort()
+        self.stdout.write(f"Threshold:        {threshold}")
+        self.stdout.write(
+            f"Recall:           {found}/{expected} queries at or above the threshold "
+            f"({found / expected if expected else 0:.1%})"
+        )
+        self.stdout.write(f"Matched overall:  {found_any}/{options['queries']} edited titles")
+        self.stdout.write(f"False positives:  {false_positives}/{options['negatives']} unrelated claims")
+        self.stdout.write(
+            "Lookup latency:   "
+            + ', '.join(f"p{p} {percentile(latencies, p) * 1000:.2f} ms" for p in (50, 95, 99))
+            + f", max {latencies[-1] * 1000:.2f} ms"
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from ai_factcheck.models import AnalysisCacheEntry
+from ai_factcheck.services import PROMPT_VERSION, current_model
+
+
+class Command(BaseCommand):
+    help = "Delete expired analysis cache entries and entries made with another model or prompt version."
+
+    def handle(self, *args, **options):
+        stale = AnalysisCacheEntry.objects.filter(
+            Q(expires_at__lte=timezone.now()) | ~Q(ai_model_used=current_model()) | ~Q(prompt_version=PROMPT_VERSION)
+        )
+        deleted, _ = stale.delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} analysis cache entr{'y' if deleted == 1 else 'ies'}."))
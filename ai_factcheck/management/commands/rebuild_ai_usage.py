@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ai_factcheck.usage import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly AI usage rollups from the saved analyses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Only recompute the last N days (default: everything).")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the AI usage rollups."))
@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from ai_factcheck import near_duplicates
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-index every fact-check for the near-duplicate pre-screen. Run once after "
+        "deploying it, and after changing the MinHash/LSH constants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', help="Afterwards, print the fact-check this text nearly duplicates.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = near_duplicates.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} fact-check(s) in {time.perf_counter() - start:.2f}s."
+        ))
+
+        if options['query']:
+            start = time.perf_counter()
+            match = near_duplicates.find_near_duplicate(options['query'])
+            elapsed = (time.perf_counter() - start) * 1000
+            if match:
+                self.stdout.write(
+                    f"  {match.similarity:.3f}  {match.fact_check.title} "
+                    f"(verdict: {match.fact_check.verdict}, fact-check #{match.fact_check.id}, {match.field})"
+                )
+            else:
+                self.stdout.write("  No near-duplicate.")
+            self.stdout.write(f"Looked up in {elapsed:.1f} ms")
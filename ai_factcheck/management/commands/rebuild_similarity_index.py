@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from ai_factcheck import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-index every fact-check in the similarity index used for AIAnalysis.similar_claims. "
+        "Run after changing AI_SIMILARITY_DIMENSIONS, or now and then to refresh IDF weights."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', help="Afterwards, print the fact-checks most similar to this text.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = similarity.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} fact-check(s) in {time.perf_counter() - start:.2f}s."
+        ))
+
+        if options['query']:
+            start = time.perf_counter()
+            matches = similarity.find_similar_factchecks(options['query'])
+            elapsed = (time.perf_counter() - start) * 1000
+            for factcheck in matches:
+                self.stdout.write(f"  {factcheck.similarity:.3f}  {similarity.describe_factcheck(factcheck)}")
+            self.stdout.write(f"{len(matches)} match(es) in {elapsed:.1f} ms")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from ai_factcheck.stub_server import StubProviderServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Run an OpenAI-compatible stub of the AI provider. Set OPENAI_BASE_URL to the "
+        "printed URL to run the AI features without calling OpenAI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before each answer.")
+        parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds between streamed chunks.")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of calls answered with a 500 (0-1).")
+        parser.add_argument('--seed', type=int, help="Seed for the failure injection.")
+
+    def handle(self, *args, **options):
+        server = StubProviderServer(
+            (options['host'], options['port']),
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            token_delay=options['token_delay'],
+            seed=options['seed'],
+            verbose=options['verbosity'] > 1,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Stub AI provider listening; OPENAI_BASE_URL={server.base_url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
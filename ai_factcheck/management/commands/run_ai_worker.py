@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ai_factcheck.worker import claim_jobs, make_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = "Drain the AI analysis job queue with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.AI_WORKER_CONCURRENCY,
+            help="Number of jobs analyzed in parallel.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to wait before polling again when the queue is empty.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit as soon as the queue is empty instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        worker_id = make_worker_id()
+        self.stdout.write(f"AI worker {worker_id} started with {concurrency} thread(s).")
+
+        processed = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-worker') as pool:
+            try:
+                while True:
+                    free = concurrency - len(running)
+                    jobs = claim_jobs(worker_id, free) if free else []
+                    for job in jobs:
+                        running.add(pool.submit(run_job, job))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    # Wait for a slot, but wake up regularly to pick up new jobs
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    processed += len(done)
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running jobs to finish...")
+
+        processed += len(running)
+        self.stdout.write(self.style.SUCCESS(f"AI worker stopped after {processed} job(s)."))
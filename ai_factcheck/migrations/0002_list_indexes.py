@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0001_initial'),
+        ('factchecks', '0012_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aianalysis',
+            index=models.Index(fields=['submission', 'created_at'], name='aianalysis_submission_idx'),
+        ),
+    ]
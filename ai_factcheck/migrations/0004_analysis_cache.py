@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0003_analysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('claim_hash', models.CharField(db_index=True, max_length=64)),
+                ('ai_model_used', models.CharField(max_length=100)),
+                ('prompt_version', models.PositiveIntegerField()),
+                ('confidence_score', models.FloatField()),
+                ('suggested_verdict', models.CharField(choices=[('true', 'True'), ('false', 'False'), ('misleading', 'Misleading'), ('unverifiable', 'Unverifiable')], max_length=20)),
+                ('evidence_sources', models.JSONField(default=list)),
+                ('similar_claims', models.JSONField(default=list)),
+                ('processing_time', models.FloatField(default=0.0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('time_saved', models.FloatField(default=0.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'AI analysis cache entries',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='from_cache',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0004_analysis_cache'),
+        ('factchecks', '0012_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='analysisjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('submission',), name='aijob_one_active_per_submission'),
+        ),
+    ]
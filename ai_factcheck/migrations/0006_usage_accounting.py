@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0005_one_active_job_per_submission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aianalysis',
+            name='completion_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='cost_usd',
+            field=models.DecimalField(decimal_places=6, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='prompt_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='queue_wait',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='retries',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='AIUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('ai_model_used', models.CharField(max_length=100)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveBigIntegerField(default=0)),
+                ('completion_tokens', models.PositiveBigIntegerField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=14)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('total_latency', models.FloatField(default=0.0)),
+                ('latency_histogram', models.JSONField(default=list)),
+                ('queued_calls', models.PositiveIntegerField(default=0)),
+                ('total_queue_wait', models.FloatField(default=0.0)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'ai_model_used'), name='aiusage_hour_model_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0006_usage_accounting'),
+        ('factchecks', '0012_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NearDuplicateSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('title', 'Title'), ('summary', 'Summary')], max_length=20)),
+                ('signature', models.BinaryField()),
+                ('fact_check', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='factchecks.factcheck')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NearDuplicateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='ai_factcheck.nearduplicatesignature')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='nearduplicatesignature',
+            constraint=models.UniqueConstraint(fields=('fact_check', 'field'), name='neardup_factcheck_field_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='nearduplicatebucket',
+            index=models.Index(fields=['key'], name='neardup_bucket_key_idx'),
+        ),
+    ]
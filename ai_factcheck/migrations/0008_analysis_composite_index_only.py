@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0007_near_duplicate_index'),
+        ('factchecks', '0017_submitter_composite_index_only'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aianalysis',
+            name='submission',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ai_analyses', to='factchecks.submission'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_factcheck', '0008_analysis_composite_index_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='force',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,6 +1,8 @@
 # ai_factcheck/models.py
+from django.conf import settings
 from django.db import models
-from factchecks.models import Submission
+from django.utils import timezone
+from factchecks.models import FactCheck, Submission
 
 class AIAnalysis(models.Model):
     VERDICT_CHOICES = [
@@ -10,7 +12,8 @@ class AIAnalysis(models.Model):
         ('unverifiable', 'Unverifiable'),
     ]
     
-    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='ai_analyses')
+    # Not indexed on its own: aianalysis_submission_idx leads on it
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='ai_analyses', db_index=False)
     claim_extracted = models.TextField()
     confidence_score = models.FloatField(default=0.0)  # 0-1 confidence level
     suggested_verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES, default='unverifiable')
@@ -18,11 +21,166 @@ class AIAnalysis(models.Model):
     similar_claims = models.JSONField(default=list)  # Previously checked similar claims
     processing_time = models.FloatField(default=0.0)  # Time taken in seconds
     ai_model_used = models.CharField(max_length=100, default='gpt-4')
+    from_cache = models.BooleanField(default=False)  # Copied from an identical earlier claim, no AI call
+    # Provider usage of the call behind this analysis (all zero for cache hits)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, default=0)  # From settings.AI_MODEL_PRICING
+    retries = models.PositiveSmallIntegerField(default=0)  # Provider call retries before it succeeded
+    queue_wait = models.FloatField(null=True, blank=True)  # Seconds the job waited in the queue; null when not queued
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'AI Analyses'
+        indexes = [
+            # Latest analysis for a submission (get_ai_analysis, process_submission_ai)
+            models.Index(fields=['submission', 'created_at'], name='aianalysis_submission_idx'),
+        ]
 
     def __str__(self):
-        return f"AI Analysis for Submission #{self.submission.id}"
\ No newline at end of file
+        return f"AI Analysis for Submission #{self.submission.id}"
+
+class AnalysisJob(models.Model):
+    """
+    A queued request to analyze a submission with AI.
+    Created by the process-submission endpoint and drained by `python manage.py run_ai_worker`.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='ai_jobs')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # Not picked up before this time (retry backoff)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Visibility timeout of a running job
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    force = models.BooleanField(default=False)  # Call the AI even when the claim nearly duplicates a published fact-check
+    analysis = models.ForeignKey(AIAnalysis, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers look for queued jobs that are due, or running jobs whose lock expired
+            models.Index(fields=['status', 'run_after'], name='aijob_status_idx'),
+            models.Index(fields=['submission', 'status'], name='aijob_submission_idx'),
+        ]
+        constraints = [
+            # Concurrent requests for a submission share one active job (see process_submission_ai)
+            models.UniqueConstraint(
+                fields=['submission'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='aijob_one_active_per_submission',
+            ),
+        ]
+
+    def __str__(self):
+        return f"AI job #{self.id} for Submission #{self.submission_id} ({self.status})"
+
+
+class AnalysisCacheEntry(models.Model):
+    """
+    A stored AI answer, keyed on the normalized claim + context, the model and the prompt version.
+    Duplicate claims reuse it instead of calling the AI again (see ai_factcheck/analysis_cache.py).
+    """
+    cache_key = models.CharField(max_length=64, unique=True)
+    claim_hash = models.CharField(max_length=64, db_index=True)  # Same claim across models/prompt versions
+    ai_model_used = models.CharField(max_length=100)
+    prompt_version = models.PositiveIntegerField()
+    confidence_score = models.FloatField()
+    suggested_verdict = models.CharField(max_length=20, choices=AIAnalysis.VERDICT_CHOICES)
+    evidence_sources = models.JSONField(default=list)
+    similar_claims = models.JSONField(default=list)
+    processing_time = models.FloatField(default=0.0)  # Time the original AI call took
+    hit_count = models.PositiveIntegerField(default=0)
+    time_saved = models.FloatField(default=0.0)  # Seconds of AI calls avoided by hits
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'AI analysis cache entries'
+
+    def __str__(self):
+        return f"Cached {self.suggested_verdict} ({self.ai_model_used}, prompt v{self.prompt_version})"
+
+
+class AIUsageRollup(models.Model):
+    """
+    Hourly totals of AI analyses per model (see ai_factcheck/usage.py).
+    Latencies of provider calls are kept as a histogram over LATENCY_BUCKETS,
+    so percentiles can be estimated for any range of hours.
+    """
+    # Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+    LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60]
+
+    hour = models.DateTimeField()
+    ai_model_used = models.CharField(max_length=100)
+    calls = models.PositiveIntegerField(default=0)  # Analyses that called the provider
+    cache_hits = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=14, decimal_places=6, default=0)
+    retries = models.PositiveIntegerField(default=0)
+    total_latency = models.FloatField(default=0.0)
+    latency_histogram = models.JSONField(default=list)  # Counts per LATENCY_BUCKETS bucket, plus one overflow
+    queued_calls = models.PositiveIntegerField(default=0)
+    total_queue_wait = models.FloatField(default=0.0)
+    version = models.PositiveIntegerField(default=0)  # Optimistic concurrency for updates
+
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'ai_model_used'], name='aiusage_hour_model_uniq'),
+        ]
+
+    def __str__(self):
+        return f"AI usage {self.hour:%Y-%m-%d %H:00} {self.ai_model_used}"
+
+
+class NearDuplicateSignature(models.Model):
+    """
+    MinHash signature of a fact-check's title or summary, for the near-duplicate
+    pre-screen (see ai_factcheck/near_duplicates.py). Kept in sync by signals.
+    """
+    FIELD_CHOICES = [
+        ('title', 'Title'),
+        ('summary', 'Summary'),
+    ]
+
+    fact_check = models.ForeignKey(FactCheck, on_delete=models.CASCADE, related_name='+')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    signature = models.BinaryField()  # near_duplicates.NUM_PERM little-endian uint32 min-hashes
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fact_check', 'field'], name='neardup_factcheck_field_uniq'),
+        ]
+
+    def __str__(self):
+        return f"MinHash of fact-check #{self.fact_check_id} {self.field}"
+
+
+class NearDuplicateBucket(models.Model):
+    """One LSH band of a signature: signatures sharing a key are near-duplicate candidates"""
+    signature = models.ForeignKey(NearDuplicateSignature, on_delete=models.CASCADE, related_name='buckets')
+    key = models.BigIntegerField()  # Hash of the band number and its rows
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key'], name='neardup_bucket_key_idx'),
+        ]
@@ -0,0 +1,173 @@
+# ai_factcheck/near_duplicates.py
+"""
+Near-duplicate pre-screen: finds a published fact-check whose title (or summary)
+is nearly the same text as a new claim, so the claim can be answered with the
+existing verdict instead of an AI call.
+
+Texts are compared on character shingles of their normalized form (see
+analysis_cache.normalize_claim), which tolerates typos, reordered punctuation
+and small edits. Each fact-check title and summary gets a MinHash signature of
+NUM_PERM values; the share of equal values estimates the Jaccard similarity of
+two shingle sets. Signatures are split into BANDS bands of ROWS values, and each
+band is hashed into a NearDuplicateBucket key (LSH), so a lookup only compares
+the signatures that share at least one bucket with the claim: one indexed query
+instead of a scan of every fact-check.
+
+With 32 bands of 4 rows, a pair with Jaccard 0.6 becomes a candidate 99% of the
+time, one with Jaccard 0.3 only 23% of the time. Whether a candidate is a match
+is decided on the estimated Jaccard (settings.AI_NEAR_DUPLICATE_THRESHOLD).
+
+The index lives in the database and is updated by FactCheck signals;
+`python manage.py rebuild_near_duplicate_index` rebuilds it, and changing any
+of the constants below requires a rebuild.
+"""
+import hashlib
+import logging
+import zlib
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .analysis_cache import normalize_claim
+from .models import NearDuplicateBucket, NearDuplicateSignature
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5  # Characters per shingle
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+MAX_CANDIDATES = 50  # Signatures compared per lookup, most bucket collisions first
+
+# Multiply-shift hash functions h(x) = ((a * x + b) mod 2**64) >> 32 with odd a;
+# fixed seed, since signatures must be computed the same way in every process
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+
+NearDuplicate = namedtuple('NearDuplicate', ['fact_check', 'similarity', 'field'])
+
+
+def shingles(text):
+    """The set of SHINGLE_SIZE-character shingles of the normalized text (the whole text when shorter)"""
+    text = normalize_claim(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(first, second):
+    """Exact Jaccard similarity of two texts' shingle sets"""
+    first, second = shingles(first), shingles(second)
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint32 values) of the text, or None for an empty text"""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles(text)), dtype=np.uint64
+    )
+    if not hashes.size:
+        return None
+    # uint64 arithmetic wraps around, which is the "mod 2**64"
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype('<u4')
+
+
+def band_keys(sig):
+    """One bucket key per band: a signed 64-bit hash of the band number and its rows"""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8,
+                                 salt=band.to_bytes(2, 'little')).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def estimate_similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(first == second)) / NUM_PERM
+
+
+def _signature_rows(factcheck_id, title, summary):
+    rows, buckets = [], []
+    for field, text in (('title', title), ('summary', summary)):
+        sig = signature(text)
+        if sig is None:
+            continue
+        row = NearDuplicateSignature(fact_check_id=factcheck_id, field=field, signature=sig.tobytes())
+        rows.append(row)
+        buckets.append(band_keys(sig))
+    return rows, buckets
+
+
+def _save(rows, buckets):
+    rows = NearDuplicateSignature.objects.bulk_create(rows)
+    NearDuplicateBucket.objects.bulk_create(
+        [NearDuplicateBucket(signature=row, key=key) for row, keys in zip(rows, buckets) for key in keys],
+        batch_size=2000,
+    )
+
+
+def index_factcheck(factcheck_id, title, summary):
+    """(Re-)index one fact-check's title and summary"""
+    from factchecks.models import FactCheck
+
+    rows, buckets = _signature_rows(factcheck_id, title, summary)
+    with transaction.atomic():
+        NearDuplicateSignature.objects.filter(fact_check_id=factcheck_id).delete()
+        if FactCheck.objects.filter(pk=factcheck_id).exists():  # Not deleted in the meantime
+            _save(rows, buckets)
+
+
+def rebuild_index():
+    """Re-index every fact-check; returns the number indexed"""
+    from factchecks.models import FactCheck
+
+    count = 0
+    with transaction.atomic():
+        NearDuplicateSignature.objects.all().delete()
+        rows, buckets = [], []
+        for factcheck_id, title, summary in FactCheck.objects.order_by('id').values_list(
+                'id', 'title', 'summary').iterator(chunk_size=2000):
+            new_rows, new_buckets = _signature_rows(factcheck_id, title, summary)
+            rows += new_rows
+            buckets += new_buckets
+            count += 1
+            if len(rows) >= 1000:
+                _save(rows, buckets)
+                rows, buckets = [], []
+        _save(rows, buckets)
+    logger.info(f"Near-duplicate index rebuilt with {count} fact-check(s)")
+    return count
+
+
+def find_near_duplicate(text, threshold=None):
+    """
+    The published fact-check whose title or summary is most similar to `text`,
+    as a NearDuplicate(fact_check, similarity, field), or None when none reaches
+    the threshold (settings.AI_NEAR_DUPLICATE_THRESHOLD by default).
+    """
+    threshold = settings.AI_NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    sig = signature(text)
+    if sig is None:
+        return None
+
+    candidates = (
+        NearDuplicateSignature.objects
+        .filter(buckets__key__in=band_keys(sig))
+        .annotate(collisions=Count('id'))
+        .order_by('-collisions', 'id')
+        .select_related('fact_check')[:MAX_CANDIDATES]
+    )
+    best = None
+    for candidate in candidates:
+        similarity = estimate_similarity(sig, np.frombuffer(bytes(candidate.signature), dtype='<u4'))
+        if similarity >= threshold and (best is None or similarity > best.similarity):
+            best = NearDuplicate(candidate.fact_check, round(similarity, 3), candidate.field)
+    return best
@@ -0,0 +1,18 @@
+# ai_factcheck/providers/__init__.py
+"""
+Backends that answer chat completion calls for the AI analysis.
+
+The backend is picked with settings.AI_PROVIDER_BACKEND (a dotted path) and
+wrapped by ai_factcheck.client.ProviderClient, which adds retries, the circuit
+breaker and metrics. Backends raise ProviderError subclasses and return
+Completion / CompletionChunk objects, so nothing outside a backend depends on
+a provider SDK.
+
+- openai_provider.OpenAIProvider: the OpenAI API (or any compatible server, see OPENAI_BASE_URL)
+- local.LocalProvider: deterministic answers with configurable latency and
+  failure injection, for offline tests, CI and load tests (see benchmark_ai)
+"""
+from .base import (  # noqa: F401
+    BaseProvider, Completion, CompletionChunk, Usage,
+    ProviderError, ProviderQuotaError, ProviderTimeoutError, ProviderUnavailableError,
+)
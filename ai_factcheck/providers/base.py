@@ -0,0 +1,73 @@
+# ai_factcheck/providers/base.py
+from dataclasses import dataclass
+
+
+class ProviderError(Exception):
+    """A failed call to the AI provider"""
+    retryable = False  # Whether the same call may succeed later
+
+    def __init__(self, message='', retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after  # Seconds the provider asked us to wait, if it said
+
+
+class ProviderTimeoutError(ProviderError):
+    retryable = True
+
+
+class ProviderUnavailableError(ProviderError):
+    """Connection errors, rate limits and provider-side (5xx) failures"""
+    retryable = True
+
+
+class ProviderQuotaError(ProviderError):
+    """The account is out of credit; retrying won't help"""
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+@dataclass
+class Completion:
+    content: str
+    usage: Usage = None
+    model: str = ''
+
+
+@dataclass
+class CompletionChunk:
+    """A piece of a streamed answer; the last chunk may carry only the usage"""
+    text: str = ''
+    usage: Usage = None
+
+
+class BaseProvider:
+    """
+    Interface of an AI provider backend. `kwargs` are the chat completion
+    arguments (messages, temperature, max_tokens); the backend supplies the model.
+    """
+    model = ''  # Recorded on the analyses (AIAnalysis.ai_model_used) and part of the cache key
+
+    def complete(self, **kwargs):
+        """Return a Completion"""
+        raise NotImplementedError
+
+    async def acomplete(self, **kwargs):
+        """Return a Completion without blocking the event loop"""
+        raise NotImplementedError
+
+    async def open_stream(self, **kwargs):
+        """
+        Start a streamed answer and return an async iterator of CompletionChunk.
+        Errors before the first chunk are raised here, so the call can be retried.
+        """
+        raise NotImplementedError
+
+    async def aclose(self):
+        """Release the connections opened on the running event loop"""
+
+    def close(self):
+        """Release the connections opened for synchronous calls"""
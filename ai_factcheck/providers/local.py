@@ -0,0 +1,91 @@
+# ai_factcheck/providers/local.py
+"""
+A deterministic, offline AI provider for tests, CI and load tests.
+
+The answer is derived from a hash of the prompt, so the same prompt always gets
+the same verdict. Latency (AI_LOCAL_PROVIDER_LATENCY plus up to
+AI_LOCAL_PROVIDER_JITTER seconds) and failures (a share of the calls,
+AI_LOCAL_PROVIDER_FAILURE_RATE) are injected from a seeded random generator,
+so retries, the circuit breaker and timeouts can be exercised without a network.
+A call slower than AI_PROVIDER_TIMEOUT fails with ProviderTimeoutError, like a
+real call would.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from .base import BaseProvider, Completion, CompletionChunk, Usage, ProviderTimeoutError, ProviderUnavailableError
+
+VERDICTS = ['true', 'false', 'misleading', 'unverifiable']
+CHUNK_SIZE = 8  # Characters per streamed chunk
+
+
+def local_analysis(prompt):
+    """The analysis the local provider (and the stub server) answers a prompt with"""
+    digest = hashlib.sha256(prompt.encode()).digest()
+    return {
+        "confidence_score": round(digest[0] / 255, 2),
+        "suggested_verdict": VERDICTS[digest[1] % len(VERDICTS)],
+        "evidence": [f"Stub evidence {digest[2:6].hex()}"],
+    }
+
+
+class LocalProvider(BaseProvider):
+
+    def __init__(self, latency=None, jitter=None, failure_rate=None, token_delay=None, seed=None):
+        self.model = settings.AI_LOCAL_PROVIDER_MODEL
+        self.latency = settings.AI_LOCAL_PROVIDER_LATENCY if latency is None else latency
+        self.jitter = settings.AI_LOCAL_PROVIDER_JITTER if jitter is None else jitter
+        self.failure_rate = settings.AI_LOCAL_PROVIDER_FAILURE_RATE if failure_rate is None else failure_rate
+        self.token_delay = settings.AI_LOCAL_PROVIDER_TOKEN_DELAY if token_delay is None else token_delay
+        self._random = random.Random(settings.AI_LOCAL_PROVIDER_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def _plan(self):
+        """(seconds to wait, error to raise after waiting or None) for the next call"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.failure_rate
+        if delay > settings.AI_PROVIDER_TIMEOUT:
+            return settings.AI_PROVIDER_TIMEOUT, ProviderTimeoutError("Local provider call timed out")
+        return delay, ProviderUnavailableError("Injected local provider failure") if failed else None
+
+    def _answer(self, messages, **kwargs):
+        prompt = ''.join(message.get('content', '') for message in messages)
+        content = json.dumps(local_analysis(prompt))
+        return content, Usage(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+
+    def complete(self, **kwargs):
+        delay, error = self._plan()
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        content, usage = self._answer(**kwargs)
+        return Completion(content, usage, self.model)
+
+    async def acomplete(self, **kwargs):
+        delay, error = self._plan()
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        content, usage = self._answer(**kwargs)
+        return Completion(content, usage, self.model)
+
+    async def open_stream(self, **kwargs):
+        delay, error = self._plan()
+        await asyncio.sleep(delay)  # Time to the first token
+        if error is not None:
+            raise error
+        return self._chunks(*self._answer(**kwargs))
+
+    async def _chunks(self, content, usage):
+        for start in range(0, len(content), CHUNK_SIZE):
+            if start and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield CompletionChunk(text=content[start:start + CHUNK_SIZE])
+        yield CompletionChunk(usage=usage)
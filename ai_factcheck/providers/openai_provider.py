@@ -0,0 +1,133 @@
+# ai_factcheck/providers/openai_provider.py
+"""
+The OpenAI backend.
+
+One OpenAI client is shared by every request and worker thread in the process,
+so its HTTP connection pool (keep-alive, TLS sessions) is reused between calls;
+async calls share one AsyncOpenAI client per event loop.
+"""
+import asyncio
+import threading
+import weakref
+
+from django.conf import settings
+from openai import OpenAI, AsyncOpenAI, Timeout
+from openai import APIError, APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+
+from .base import (
+    BaseProvider, Completion, CompletionChunk, Usage,
+    ProviderError, ProviderQuotaError, ProviderTimeoutError, ProviderUnavailableError,
+)
+
+
+def translate_error(error):
+    """The ProviderError for an OpenAI SDK error"""
+    if isinstance(error, APITimeoutError):
+        error_class = ProviderTimeoutError
+    elif "insufficient_quota" in str(error):
+        error_class = ProviderQuotaError
+    elif isinstance(error, (APIConnectionError, RateLimitError, InternalServerError)):
+        error_class = ProviderUnavailableError
+    else:
+        error_class = ProviderError
+
+    retry_after = None
+    response = getattr(error, 'response', None)
+    header = response.headers.get('retry-after') if response is not None else None
+    if header:
+        try:
+            retry_after = float(header)
+        except ValueError:
+            pass
+    return error_class(str(error), retry_after=retry_after)
+
+
+def _usage(usage):
+    if usage is None:
+        return None
+    return Usage(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+
+
+class OpenAIProvider(BaseProvider):
+
+    def __init__(self):
+        self.model = settings.AI_MODEL
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def client_options():
+        # Retries are ProviderClient's (they feed the breaker), so the SDK's own are disabled
+        return dict(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=Timeout(settings.AI_PROVIDER_TIMEOUT, connect=settings.AI_PROVIDER_CONNECT_TIMEOUT),
+            max_retries=0,
+        )
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(**self.client_options())
+            return self._client
+
+    def async_client(self):
+        """The AsyncOpenAI client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = AsyncOpenAI(**self.client_options())
+            return client
+
+    def complete(self, **kwargs):
+        try:
+            response = self.client.chat.completions.create(model=self.model, **kwargs)
+        except APIError as e:
+            raise translate_error(e) from e
+        return Completion(response.choices[0].message.content, _usage(response.usage), self.model)
+
+    async def acomplete(self, **kwargs):
+        try:
+            response = await self.async_client().chat.completions.create(model=self.model, **kwargs)
+        except APIError as e:
+            raise translate_error(e) from e
+        return Completion(response.choices[0].message.content, _usage(response.usage), self.model)
+
+    async def open_stream(self, **kwargs):
+        try:
+            stream = await self.async_client().chat.completions.create(
+                model=self.model,
+                stream=True,
+                stream_options={'include_usage': True},  # Token counts arrive in a final chunk
+                **kwargs
+            )
+        except APIError as e:
+            raise translate_error(e) from e
+        return self._chunks(stream)
+
+    @staticmethod
+    async def _chunks(stream):
+        try:
+            async for chunk in stream:
+                yield CompletionChunk(
+                    text=(chunk.choices[0].delta.content or '') if chunk.choices else '',
+                    usage=_usage(chunk.usage),
+                )
+        except APIError as e:
+            raise translate_error(e) from e
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
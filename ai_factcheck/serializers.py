@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AIAnalysis
+from .models import AIAnalysis, AnalysisJob
 
 class AIAnalysisSerializer(serializers.ModelSerializer):
     submission_id = serializers.IntegerField(source='submission.id', read_only=True)
@@ -10,6 +10,22 @@ class AIAnalysisSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'submission_id', 'claim_text', 'claim_extracted',
             'confidence_score', 'suggested_verdict', 'evidence_sources',
-            'similar_claims', 'processing_time', 'ai_model_used', 'created_at'
+            'similar_claims', 'processing_time', 'ai_model_used', 'from_cache',
+            'prompt_tokens', 'completion_tokens', 'cost_usd', 'retries', 'queue_wait', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = [
+            'id', 'from_cache', 'prompt_tokens', 'completion_tokens', 'cost_usd', 'retries', 'queue_wait', 'created_at'
+        ]
+
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    submission_id = serializers.IntegerField(source='submission.id', read_only=True)
+    analysis = AIAnalysisSerializer(read_only=True)
+    
+    class Meta:
+        model = AnalysisJob
+        fields = [
+            'id', 'submission_id', 'status', 'attempts', 'max_attempts', 'run_after',
+            'last_error', 'force', 'analysis', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,507 @@
+# ai_factcheck/services.py
+import asyncio
+import json
+import time
+import logging
+from collections import Counter
+from django.conf import settings
+from rest_framework import status
+from factchecks.models import Submission
+from .models import AIAnalysis
+from . import analysis_cache, concurrency, near_duplicates, similarity, usage
+from .client import CircuitOpenError, get_provider, is_retryable_error  # noqa: F401
+from .providers import ProviderError, ProviderQuotaError, ProviderTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Errors from a provider call that describe_provider_error() knows how to report
+PROVIDER_ERRORS = (ProviderError,)
+
+# Bump whenever build_prompt() changes meaningfully, so cached answers to the old prompt aren't reused
+PROMPT_VERSION = 2
+
+# AIAnalysis.ai_model_used and suggested_verdict for claims answered by the
+# published fact-check they nearly duplicate (see near_duplicates), with no AI call
+NEAR_DUPLICATE_MODEL = 'near-duplicate'
+NEAR_DUPLICATE_VERDICTS = {
+    'True': 'true', 'Mostly True': 'true', 'Mixture': 'misleading',
+    'Mostly False': 'false', 'False': 'false', 'Unverifiable': 'unverifiable',
+}
+
+# Used when the model's answer can't be parsed or doesn't match the expected structure
+FALLBACK_AI_DATA = {
+    "confidence_score": 0.5,
+    "suggested_verdict": "unverifiable",
+    "evidence": ["Could not parse AI response properly"],
+}
+
+
+def validate_ai_response(ai_data):
+    """Validate the structure of the AI response"""
+    if not isinstance(ai_data, dict):
+        return False
+
+    required_fields = ['confidence_score', 'suggested_verdict', 'evidence']
+    if not all(field in ai_data for field in required_fields):
+        return False
+
+    # Validate verdict options
+    valid_verdicts = ['true', 'false', 'misleading', 'unverifiable']
+    if ai_data.get('suggested_verdict') not in valid_verdicts:
+        return False
+
+    # Validate confidence score
+    confidence = ai_data.get('confidence_score', 0)
+    if not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        return False
+
+    return True
+
+
+def build_prompt(submission, similar=()):
+    """
+    Prepare the fact-checking prompt for a submission, listing our published
+    fact-checks on similar claims (from the similarity index) as reference.
+    """
+    # Handle null context
+    context_text = submission.context if submission.context else 'No additional context provided'
+    if similar:
+        similar_text = '\n'.join(
+            f"- {factcheck.title} (verdict: {factcheck.verdict})" for factcheck in similar
+        )
+    else:
+        similar_text = 'None found'
+
+    return f"""
+As a fact-checking assistant for Ayiti Vérité, analyze this claim about Haiti:
+
+CLAIM: "{submission.claim_text}"
+
+CONTEXT: {context_text}
+
+OUR PUBLISHED FACT-CHECKS ON SIMILAR CLAIMS:
+{similar_text}
+
+Please provide a JSON response with this exact structure:
+{{
+    "confidence_score": 0.85,  # Number between 0-1
+    "suggested_verdict": "true",  # One of: "true", "false", "misleading", "unverifiable"
+    "evidence": [
+        "Source or reasoning 1",
+        "Source or reasoning 2"
+    ]
+}}
+
+Focus on Haitian context and available evidence. Take our published fact-checks into
+account when they cover the same claim. If uncertain, use "unverifiable".
+"""
+
+
+def parse_ai_response(ai_response):
+    """
+    Extract and validate the JSON analysis from the model's answer.
+    Falls back to an "unverifiable" result when the answer can't be used.
+    """
+    try:
+        # Extract JSON from the response (AI might add text around JSON)
+        json_start = ai_response.find('{')
+        json_end = ai_response.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            json_str = ai_response[json_start:json_end]
+            ai_data = json.loads(json_str)
+        else:
+            raise json.JSONDecodeError("No JSON found", ai_response, 0)
+
+        # Validate the response structure
+        if not validate_ai_response(ai_data):
+            raise ValueError("Invalid AI response structure")
+
+    except (json.JSONDecodeError, ValueError) as e:
+        logger.error(f"Failed to parse AI response: {e}")
+        ai_data = dict(FALLBACK_AI_DATA)
+
+    return ai_data
+
+
+def describe_provider_error(error):
+    """
+    Map a provider error to a (message, HTTP status) pair for API responses and job errors.
+    """
+    if isinstance(error, ProviderTimeoutError):
+        return "AI service timeout", status.HTTP_504_GATEWAY_TIMEOUT
+    if isinstance(error, CircuitOpenError):
+        return "AI service temporarily unavailable", status.HTTP_503_SERVICE_UNAVAILABLE
+
+    # Handle specific error types
+    if isinstance(error, ProviderQuotaError):
+        return "AI service quota exceeded. Please check your AI provider billing.", status.HTTP_402_PAYMENT_REQUIRED
+    if "model_not_found" in str(error):
+        return "AI model not available. Please check your AI provider account settings.", status.HTTP_503_SERVICE_UNAVAILABLE
+    return "AI service error", status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def find_similar(submission):
+    """Published fact-checks similar to the submission's claim, best first"""
+    return similarity.find_similar_factchecks(f"{submission.claim_text}\n{submission.context or ''}")
+
+
+def current_model():
+    """The model of the configured provider backend, recorded on analyses and cache entries"""
+    return get_provider().model
+
+
+def completion_kwargs(submission, similar=()):
+    """Arguments for the chat completion call that analyzes a submission (the backend picks the model)"""
+    return dict(
+        messages=[{"role": "user", "content": build_prompt(submission, similar)}],
+        temperature=0.1,  # Low temperature for more factual responses
+        max_tokens=1000,
+    )
+
+
+def describe_similar(similar):
+    """AIAnalysis.similar_claims for the matched fact-checks"""
+    return [similarity.describe_factcheck(factcheck) for factcheck in similar]
+
+
+def build_analysis(submission, ai_data, processing_time, similar=()):
+    """Build (without saving) the AIAnalysis row for a parsed AI answer"""
+    return AIAnalysis(
+        submission=submission,
+        claim_extracted=submission.claim_text,
+        confidence_score=ai_data.get('confidence_score', 0.5),
+        suggested_verdict=ai_data.get('suggested_verdict', 'unverifiable'),
+        evidence_sources=ai_data.get('evidence', []),
+        similar_claims=describe_similar(similar),
+        processing_time=processing_time,
+        ai_model_used=current_model()
+    )
+
+
+def find_near_duplicate(submission):
+    """The published fact-check the claim nearly duplicates, as a NearDuplicate, or None (also when the pre-screen is off)"""
+    if not settings.AI_NEAR_DUPLICATE_PRESCREEN:
+        return None
+    return near_duplicates.find_near_duplicate(submission.claim_text)
+
+
+def build_near_duplicate_analysis(submission, match, lookup_time):
+    """Build (without saving) an AIAnalysis that answers the claim with the fact-check it nearly duplicates"""
+    fact_check = match.fact_check
+    return AIAnalysis(
+        submission=submission,
+        claim_extracted=submission.claim_text,
+        confidence_score=match.similarity,
+        suggested_verdict=NEAR_DUPLICATE_VERDICTS.get(fact_check.verdict, 'unverifiable'),
+        evidence_sources=[f"Nearly duplicates the {match.field} of our published fact-check #{fact_check.id}: "
+                          f"{fact_check.title} (verdict: {fact_check.verdict})"],
+        similar_claims=describe_similar([fact_check]),
+        processing_time=lookup_time,
+        ai_model_used=NEAR_DUPLICATE_MODEL,
+        from_cache=True,
+    )
+
+
+def analysis_from_near_duplicate(submission, start_time):
+    """
+    Save and return an analysis taken from the published fact-check the claim
+    nearly duplicates, or None when there's no such fact-check.
+    """
+    match = find_near_duplicate(submission)
+    if match is None:
+        return None
+    ai_analysis = build_near_duplicate_analysis(submission, match, time.time() - start_time)
+    ai_analysis.save()
+    usage.record_usage([ai_analysis])
+    logger.info(
+        f"Submission {submission.id} nearly duplicates fact-check {match.fact_check.id} "
+        f"({match.similarity:.2f}); no AI call"
+    )
+    return ai_analysis
+
+
+def cache_key_for(submission):
+    """Analysis cache key for a submission under the current model and prompt"""
+    return analysis_cache.make_cache_key(submission, current_model(), PROMPT_VERSION)
+
+
+def remember_analysis(submission, cache_key, ai_data, processing_time):
+    """Cache a fresh AI answer, unless it's the fallback for an unusable response"""
+    if ai_data != FALLBACK_AI_DATA:
+        analysis_cache.store(submission, cache_key, current_model(), PROMPT_VERSION, ai_data, processing_time)
+
+
+def analysis_from_cache(submission, cache_key, similar, start_time):
+    """
+    Save and return an analysis copied from the analysis cache, or None on a miss.
+    """
+    cached = analysis_cache.lookup(cache_key)
+    if cached is None:
+        return None
+    lookup_time = time.time() - start_time
+    ai_analysis = analysis_cache.build_cached_analysis(submission, cached, lookup_time)
+    ai_analysis.similar_claims = describe_similar(similar)  # The corpus may have grown since
+    ai_analysis.save()
+    analysis_cache.record_hits(cached, lookup_time=lookup_time)
+    usage.record_usage([ai_analysis])
+    logger.info(f"AI analysis for submission {submission.id} served from cache in {lookup_time:.3f}s")
+    return ai_analysis
+
+
+def save_analysis(submission, cache_key, similar, ai_data, processing_time,
+                  token_usage=None, retries=0, queue_wait=None):
+    """
+    Save the analysis for a fresh AI answer with its token usage and cost,
+    and remember the answer in the cache.
+    """
+    ai_analysis = build_analysis(submission, ai_data, processing_time, similar)
+    usage.apply_usage(ai_analysis, token_usage, retries, queue_wait)
+    ai_analysis.save()
+    usage.record_usage([ai_analysis])
+    remember_analysis(submission, cache_key, ai_data, processing_time)
+
+    logger.info(f"AI analysis completed in {processing_time:.2f}s with confidence {ai_data.get('confidence_score', 0)}")
+    return ai_analysis
+
+
+def run_analysis(submission, queue_wait=None, prescreen=True):
+    """
+    Analyze a submission with the AI model and save the result.
+    A near-duplicate of a published fact-check is answered with it, unless
+    `prescreen` is False, and a duplicate of an already analyzed claim is
+    answered from the analysis cache.
+    `queue_wait` is how long the request waited in the job queue, for accounting.
+    Raises ProviderError (including CircuitOpenError) to the caller.
+    """
+    logger.info(f"Starting AI analysis for submission {submission.id}")
+
+    start_time = time.time()
+
+    if prescreen:
+        ai_analysis = analysis_from_near_duplicate(submission, start_time)
+        if ai_analysis is not None:
+            return ai_analysis
+
+    similar = find_similar(submission)
+    cache_key = cache_key_for(submission)
+    ai_analysis = analysis_from_cache(submission, cache_key, similar, start_time)
+    if ai_analysis is not None:
+        return ai_analysis
+
+    # Shared, pooled provider client (with retries and the circuit breaker)
+    call_info = {}
+    response = get_provider().create_completion(call_info=call_info, **completion_kwargs(submission, similar))
+
+    processing_time = time.time() - start_time
+
+    ai_data = parse_ai_response(response.content)
+
+    # Save AI analysis
+    return save_analysis(
+        submission, cache_key, similar, ai_data, processing_time,
+        token_usage=response.usage, retries=call_info['retries'], queue_wait=queue_wait
+    )
+
+
+async def _analyze_async(provider, semaphore, submission, similar):
+    """Analyze one submission, waiting for a free slot under the concurrency cap"""
+    async with semaphore:
+        start_time = time.time()
+        call_info = {}
+        response = await provider.acreate_completion(call_info, **completion_kwargs(submission, similar))
+        processing_time = time.time() - start_time
+    return parse_ai_response(response.content), processing_time, response.usage, call_info['retries']
+
+
+async def _analyze_all(submissions, similar, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    provider = get_provider()
+    try:
+        return await asyncio.gather(
+            *(_analyze_async(provider, semaphore, submission, similar[submission.id])
+              for submission in submissions),
+            return_exceptions=True
+        )
+    finally:
+        await provider.aclose()  # The connections belong to this batch's event loop
+
+
+def _guard_calls(to_call, requested_by):
+    """
+    Take each call's single-flight claim and rate-limit token, as a job or a
+    stream does. Returns the flight tokens taken, by submission id, and a
+    partial result for each cache key that mustn't be sent now: 'in_progress'
+    while another request analyzes it, 'skipped' when that request already
+    saved its analysis, 'rate_limited' with the seconds to wait.
+    """
+    flights, refused = {}, {}
+    for key, submission in to_call.items():
+        token = concurrency.acquire_flight(submission.id)
+        if token is None:
+            refused[key] = {'status': 'in_progress'}
+        else:
+            flights[submission.id] = token
+    analyzed = set(
+        AIAnalysis.objects.filter(submission__in=list(flights)).values_list('submission_id', flat=True)
+    )
+    wait = 0
+    for key, submission in to_call.items():
+        if key in refused:
+            continue
+        if submission.id in analyzed:
+            refused[key] = {'status': 'skipped'}
+            continue
+        # Once the global bucket is empty, the rest of the batch waits too
+        wait = wait or concurrency.check_rate_limits(requested_by)
+        if wait:
+            refused[key] = {'status': 'rate_limited', 'retry_after': wait}
+    return flights, refused
+
+
+def _release_flights(flights):
+    for submission_id, token in flights.items():
+        concurrency.release_flight(submission_id, token)
+
+
+def analyze_batch(submissions, concurrency=None, requested_by=None):
+    """
+    Analyze several submissions with at most `concurrency` provider calls in flight,
+    then save all the successful analyses with one bulk insert.
+
+    Near-duplicates of published fact-checks are answered with them and claims
+    already in the analysis cache are copied, without an AI call, and duplicate
+    claims within the batch are sent only once. Each call takes the submission's
+    single-flight claim and a token from the AI rate limits (`requested_by`'s
+    and the global one); claims refused either are reported rather than sent.
+
+    Returns one result dict per submission, in the same order.
+    """
+    concurrency = max(1, min(concurrency or settings.AI_BATCH_CONCURRENCY, settings.AI_BATCH_CONCURRENCY))
+    submissions = list(submissions)
+    logger.info(f"Starting batch AI analysis of {len(submissions)} submission(s), concurrency {concurrency}")
+
+    start_time = time.time()
+    near = {}
+    for submission in submissions:
+        match = find_near_duplicate(submission)
+        if match is not None:
+            near[submission.id] = match
+    similar = {submission.id: find_similar(submission) for submission in submissions if submission.id not in near}
+    keys = [cache_key_for(submission) for submission in submissions]
+    cached = analysis_cache.lookup_many(keys)
+    lookup_time = time.time() - start_time
+
+    # One provider call per distinct uncached claim
+    to_call = {}
+    for submission, key in zip(submissions, keys):
+        if submission.id not in near and key not in cached:
+            to_call.setdefault(key, submission)
+    flights, refused = _guard_calls(to_call, requested_by)
+    try:
+        for key in refused:
+            del to_call[key]
+        outcomes = asyncio.run(_analyze_all(list(to_call.values()), similar, concurrency)) if to_call else []
+        outcome_by_key = dict(zip(to_call, outcomes))
+
+        analyses = []
+        results = []
+        hits = Counter()
+        for submission, key in zip(submissions, keys):
+            if submission.id in near:
+                match = near[submission.id]
+                analyses.append(build_near_duplicate_analysis(submission, match, lookup_time))
+                results.append({
+                    'submission_id': submission.id, 'status': 'analyzed', 'from_cache': True,
+                    'near_duplicate_of': match.fact_check.id,
+                })
+                continue
+            if key in cached:
+                analysis = analysis_cache.build_cached_analysis(submission, cached[key], lookup_time)
+                analysis.similar_claims = describe_similar(similar[submission.id])
+                analyses.append(analysis)
+                results.append({'submission_id': submission.id, 'status': 'analyzed', 'from_cache': True})
+                hits[key] += 1
+                continue
+            if key in refused:
+                results.append({'submission_id': submission.id, **refused[key]})
+                continue
+            outcome = outcome_by_key[key]
+            if isinstance(outcome, Exception):
+                if not isinstance(outcome, PROVIDER_ERRORS):
+                    logger.exception("Unexpected error in batch AI analysis", exc_info=outcome)
+                message = describe_provider_error(outcome)[0] if isinstance(outcome, PROVIDER_ERRORS) else str(outcome)
+                results.append({'submission_id': submission.id, 'status': 'failed', 'error': message})
+                continue
+            ai_data, processing_time, token_usage, retries = outcome
+            analysis = build_analysis(submission, ai_data, processing_time, similar[submission.id])
+            if to_call[key] is submission:
+                usage.apply_usage(analysis, token_usage, retries)
+            else:
+                # A duplicate of a claim earlier in this batch reuses its answer
+                analysis.processing_time, analysis.from_cache = 0.0, True
+            analyses.append(analysis)
+            results.append({'submission_id': submission.id, 'status': 'analyzed', 'from_cache': analysis.from_cache})
+
+        # Save every analysis in one query
+        saved = AIAnalysis.objects.bulk_create(analyses)
+    finally:
+        _release_flights(flights)
+    usage.record_usage(saved)
+    created = iter(saved)
+    for result in results:
+        if result['status'] == 'analyzed':
+            analysis = next(created)
+            result['analysis_id'] = analysis.id
+            result['suggested_verdict'] = analysis.suggested_verdict
+            result['confidence_score'] = analysis.confidence_score
+
+    for key, count in hits.items():
+        analysis_cache.record_hits(cached[key], count, lookup_time)
+    for key, submission in to_call.items():
+        outcome = outcome_by_key[key]
+        if not isinstance(outcome, Exception):
+            ai_data, processing_time = outcome[:2]
+            remember_analysis(submission, key, ai_data, processing_time)
+
+    return results
+
+
+def batch_submissions(submission_ids=None, status_filter=None, limit=None):
+    """
+    The submissions a batch picks by id or by status, oldest first.
+    Submissions that already have an analysis are left out.
+    """
+    queryset = Submission.objects.exclude(ai_analyses__isnull=False)
+    if submission_ids is not None:
+        queryset = queryset.filter(id__in=submission_ids)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    return list(queryset.order_by('date_submitted', 'id')[:limit])
+
+
+def report_requested(submission_ids, results):
+    """
+    One result per requested id, in request order: the id's result, or
+    'skipped' (already analyzed) or 'not_found' for the ids the batch didn't pick.
+    """
+    by_id = {result['submission_id']: result for result in results}
+    existing = set(Submission.objects.filter(id__in=submission_ids).values_list('id', flat=True))
+    return [
+        by_id.get(submission_id) or {
+            'submission_id': submission_id,
+            'status': 'skipped' if submission_id in existing else 'not_found',
+        }
+        for submission_id in dict.fromkeys(submission_ids)
+    ]
+
+
+def run_batch(submission_ids=None, status_filter=None, limit=None, concurrency=None, requested_by=None):
+    """
+    Analyze the submissions picked by id or by status in this process (see
+    analyze_batch; the API queues jobs instead). Submissions that already have
+    an analysis are skipped, and unknown ids are reported as not found.
+    """
+    results = analyze_batch(batch_submissions(submission_ids, status_filter, limit), concurrency, requested_by)
+    if submission_ids is not None:
+        results = report_requested(submission_ids, results)
+    return results
@@ -0,0 +1,68 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from factchecks.models import FactCheck
+from . import near_duplicates
+from .similarity import factcheck_text, get_index
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = {'title', 'summary'}
+
+
+# Similarity index
+#
+# Fact-checks are re-indexed after the commit, so a rolled back edit never
+# reaches the index. Index errors are logged rather than failing the save;
+# rebuild_similarity_index repairs a missed update.
+
+def index_factcheck(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    factcheck_id, text = instance.pk, factcheck_text(instance)
+
+    def update():
+        try:
+            get_index().upsert(factcheck_id, text)
+        except Exception:
+            logger.exception(f"Failed to index fact-check {factcheck_id} for similarity search")
+
+    transaction.on_commit(update)
+
+
+def unindex_factcheck(sender, instance, **kwargs):
+    factcheck_id = instance.pk
+
+    def update():
+        try:
+            get_index().remove(factcheck_id)
+        except Exception:
+            logger.exception(f"Failed to remove fact-check {factcheck_id} from the similarity index")
+
+    transaction.on_commit(update)
+
+
+post_save.connect(index_factcheck, sender=FactCheck, dispatch_uid='similarity_index_save')
+post_delete.connect(unindex_factcheck, sender=FactCheck, dispatch_uid='similarity_index_delete')
+
+
+# Near-duplicate index
+#
+# Also updated after the commit, with the same error handling; a deleted
+# fact-check's signatures go with it (ON DELETE CASCADE).
+
+def index_factcheck_near_duplicates(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    factcheck_id, title, summary = instance.pk, instance.title, instance.summary
+
+    def update():
+        try:
+            near_duplicates.index_factcheck(factcheck_id, title, summary)
+        except Exception:
+            logger.exception(f"Failed to index fact-check {factcheck_id} for near-duplicate detection")
+
+    transaction.on_commit(update)
+
+
+post_save.connect(index_factcheck_near_duplicates, sender=FactCheck, dispatch_uid='near_duplicate_index_save')
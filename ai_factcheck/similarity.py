@@ -0,0 +1,382 @@
+# ai_factcheck/similarity.py
+"""
+In-process similarity index over published fact-checks (title + summary).
+
+Each fact-check is a hashed TF-IDF vector: unigrams and bigrams of the normalized
+text are hashed into a fixed number of dimensions, weighted by IDF and
+L2-normalized. The vectors live in memory-mapped files under
+AI_SIMILARITY_INDEX_DIR, so every process (web, AI worker) shares one copy
+and sees the others' updates without reloading.
+
+Files:
+    header.i64   [row count, row capacity, dimensions, live documents]
+    ids.i64      FactCheck id per row (-1 for a removed row)
+    vectors.f16  one row per fact-check
+    df.f32       document frequency per dimension (for IDF)
+
+The index is built by `python manage.py rebuild_similarity_index`; until then
+searches find nothing. After that, updates are incremental (FactCheck signals
+call upsert/remove); IDF weights of existing rows are only refreshed by
+rebuilding.
+"""
+import fcntl
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .analysis_cache import normalize_claim
+
+logger = logging.getLogger(__name__)
+
+HEADER_FIELDS = 4
+COUNT, CAPACITY, DIMENSIONS, LIVE = range(HEADER_FIELDS)
+INITIAL_CAPACITY = 1024
+
+
+def tokenize(text):
+    """Unigrams and bigrams of the normalized text (one-letter words dropped)"""
+    words = [word for word in normalize_claim(text).split() if len(word) > 1]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def hash_features(text, dimensions):
+    """
+    {dimension: signed, log-scaled term frequency} for the text's hashed terms.
+    The sign comes from another bit of the hash, so terms that collide on a
+    dimension tend to cancel out instead of inflating similarity scores.
+    """
+    counts = Counter()
+    for term in tokenize(text):
+        hashed = zlib.crc32(term.encode())
+        counts[hashed % dimensions] += 1 if hashed & 0x80000000 else -1
+    return {
+        dimension: math.copysign(1.0 + math.log(abs(count)), count)
+        for dimension, count in counts.items() if count
+    }
+
+
+def factcheck_text(factcheck):
+    return f"{factcheck.title}\n{factcheck.summary}"
+
+
+class SimilarityIndex:
+    def __init__(self, path, dimensions):
+        self.path = Path(path)
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._capacity = 0
+        self._row_of = {}  # FactCheck id -> row
+        self._known_rows = 0
+        self._inode = None
+
+    # Files
+
+    def _file(self, name):
+        return self.path / name
+
+    def exists(self):
+        return self._file('header.i64').exists()
+
+    def _create(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        header = np.memmap(self._file('header.i64'), dtype=np.int64, mode='w+', shape=(HEADER_FIELDS,))
+        header[:] = [0, 0, self.dimensions, 0]
+        header.flush()
+        np.memmap(self._file('df.f32'), dtype=np.float32, mode='w+', shape=(self.dimensions,)).flush()
+        for name in ('ids.i64', 'vectors.f16'):
+            self._file(name).touch()
+
+    def _map(self):
+        """(Re)map the files when another process grew them or they were rebuilt"""
+        header = np.memmap(self._file('header.i64'), dtype=np.int64, mode='r+', shape=(HEADER_FIELDS,))
+        if header[DIMENSIONS] != self.dimensions:
+            raise ValueError(
+                f"Similarity index at {self.path} has {header[DIMENSIONS]} dimensions, "
+                f"settings say {self.dimensions}; run rebuild_similarity_index"
+            )
+        self.header = header
+        self._inode = os.stat(self._file('header.i64')).st_ino
+        self.df = np.memmap(self._file('df.f32'), dtype=np.float32, mode='r+', shape=(self.dimensions,))
+        self._capacity = int(header[CAPACITY])
+        if self._capacity:
+            self.ids = np.memmap(self._file('ids.i64'), dtype=np.int64, mode='r+', shape=(self._capacity,))
+            self.vectors = np.memmap(
+                self._file('vectors.f16'), dtype=np.float16, mode='r+', shape=(self._capacity, self.dimensions)
+            )
+        else:
+            self.ids = np.empty(0, dtype=np.int64)
+            self.vectors = np.empty((0, self.dimensions), dtype=np.float16)
+        self._row_of = {}
+        self._known_rows = 0
+
+    def _header_inode(self):
+        try:
+            return os.stat(self._file('header.i64')).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self, locked=False):
+        """
+        Pick up rows other processes appended, and remap after they grew or rebuilt the index.
+        Writers already hold write.lock; readers remap under a shared swap.lock so a
+        rebuild can't swap the files between mapping the header and the rest.
+        Returns the row count, or None if the index hasn't been built.
+        """
+        if not self.exists():
+            return None
+        if (not self._capacity or self._header_inode() != self._inode
+                or int(self.header[CAPACITY]) != self._capacity):
+            if locked:
+                self._map()
+            else:
+                with self._flock('swap.lock', fcntl.LOCK_SH):
+                    self._map()
+        count = int(self.header[COUNT])
+        if count > self._known_rows:
+            for row in range(self._known_rows, count):
+                if self.ids[row] >= 0:
+                    self._row_of[int(self.ids[row])] = row
+            self._known_rows = count
+        return count
+
+    def _grow(self, needed):
+        capacity = max(INITIAL_CAPACITY, self._capacity)
+        while capacity < needed:
+            capacity *= 2
+        os.truncate(self._file('ids.i64'), capacity * 8)
+        os.truncate(self._file('vectors.f16'), capacity * self.dimensions * 2)
+        # New id slots read as 0; mark them free
+        ids = np.memmap(self._file('ids.i64'), dtype=np.int64, mode='r+', shape=(capacity,))
+        ids[self._capacity:] = -1
+        ids.flush()
+        self.header[CAPACITY] = capacity
+        self.header.flush()
+        self._map()
+        self._refresh(locked=True)
+
+    def _flush(self):
+        for array in (self.header, self.df, self.ids, self.vectors):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    @contextmanager
+    def _flock(self, name, operation):
+        """Hold an flock on one of the index's lock files, across processes"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self._file(name), 'w') as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _writing(self):
+        """Serialize writers across threads and processes"""
+        with self._lock, self._flock('write.lock', fcntl.LOCK_EX):
+            built = self._refresh(locked=True) is not None
+            yield built
+            if built:
+                self._flush()
+
+    # Vectors
+
+    def _idf(self, dimensions):
+        documents = int(self.header[LIVE])
+        return np.log((1.0 + documents) / (1.0 + self.df[dimensions])) + 1.0
+
+    def _vectorize(self, text):
+        """(dimensions, unit-length TF-IDF weights) for the text, or None if it has no terms"""
+        features = hash_features(text, self.dimensions)
+        if not features:
+            return None
+        dimensions = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        weights = np.fromiter(features.values(), dtype=np.float32, count=len(features)) * self._idf(dimensions)
+        return dimensions, weights / np.linalg.norm(weights)
+
+    def _clear_row(self, row):
+        present = np.flatnonzero(self.vectors[row])
+        self.df[present] -= 1
+        self.vectors[row] = 0
+        self.header[LIVE] -= 1
+
+    # Public API
+
+    def upsert(self, factcheck_id, text):
+        """Add or replace the vector for one fact-check (a no-op until the index is built)"""
+        with self._writing() as built:
+            if not built:
+                return
+            row = self._row_of.get(factcheck_id)
+            if row is not None:
+                self._clear_row(row)
+            else:
+                row = int(self.header[COUNT])
+                if row >= self._capacity:
+                    self._grow(row + 1)
+                self.ids[row] = factcheck_id
+                self.header[COUNT] = row + 1
+                self._row_of[factcheck_id] = row
+                self._known_rows = row + 1
+
+            features = hash_features(text, self.dimensions)
+            self.df[list(features)] += 1
+            self.header[LIVE] += 1
+            vector = self._vectorize(text)
+            if vector is not None:
+                self.vectors[row, vector[0]] = vector[1]
+
+    def remove(self, factcheck_id):
+        with self._writing() as built:
+            if not built:
+                return
+            row = self._row_of.pop(factcheck_id, None)
+            if row is not None:
+                self._clear_row(row)
+                self.ids[row] = -1
+
+    def rebuild(self, items):
+        """
+        Replace the whole index with `items`, an iterable of (factcheck_id, text).
+
+        The new files are built in a staging directory while holding write.lock,
+        so upserts from other processes wait and then land in the new files.
+        They're swapped in with os.replace, header last: readers keep their
+        mapping of the old files until the new header's inode tells them to remap.
+        """
+        with self._lock, self._flock('write.lock', fcntl.LOCK_EX):
+            staging = Path(tempfile.mkdtemp(prefix='.rebuild-', dir=self.path))
+            try:
+                count = SimilarityIndex(staging, self.dimensions)._build(items)
+                with self._flock('swap.lock', fcntl.LOCK_EX):
+                    for name in ('df.f32', 'ids.i64', 'vectors.f16', 'header.i64'):
+                        os.replace(staging / name, self._file(name))
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            self._map()
+        return count
+
+    def _build(self, items):
+        """Write a fresh index of `items` into this (private, empty) directory"""
+        items = list(items)
+        self._create()
+        self._map()
+        features = [hash_features(text, self.dimensions) for _, text in items]
+        for counts in features:
+            self.df[list(counts)] += 1
+        self.header[LIVE] = len(items)
+        if items:
+            self._grow(len(items))
+        for row, ((factcheck_id, text), counts) in enumerate(zip(items, features)):
+            self.ids[row] = factcheck_id
+            vector = self._vectorize(text)
+            if vector is not None:
+                self.vectors[row, vector[0]] = vector[1]
+        self.header[COUNT] = len(items)
+        self._flush()
+        return len(items)
+
+    def search(self, text, k=5, min_score=0.0, exclude=()):
+        """
+        Top-k fact-checks by cosine similarity, as [(factcheck_id, score)], best first.
+        Only the query's non-zero dimensions are read from the vectors.
+        """
+        with self._lock:
+            count = self._refresh()
+            if not count:
+                return []
+            vector = self._vectorize(text)
+            if vector is None:
+                return []
+            dimensions, weights = vector
+            scores = self.vectors[:count, dimensions].astype(np.float32) @ weights
+            ids = np.asarray(self.ids[:count])
+
+        scores[ids < 0] = -1.0
+        if exclude:
+            scores[np.isin(ids, list(exclude))] = -1.0
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[row]), float(scores[row])) for row in top if scores[row] > max(min_score, 0.0)]
+
+    def __len__(self):
+        with self._lock:
+            if self._refresh() is None:
+                return 0
+            return int(self.header[LIVE])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def open_index():
+    return SimilarityIndex(settings.AI_SIMILARITY_INDEX_DIR, settings.AI_SIMILARITY_DIMENSIONS)
+
+
+def get_index():
+    """
+    The process-wide index. Never built here: a full scan of the fact-checks
+    doesn't belong in a web request, so it stays empty until
+    rebuild_similarity_index has run.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = open_index()
+        return _index
+
+
+def rebuild_index(index=None):
+    """Re-index every fact-check; returns the number indexed"""
+    from factchecks.models import FactCheck
+
+    if index is None:
+        index = open_index()
+    rows = FactCheck.objects.order_by('id').values_list('id', 'title', 'summary').iterator(chunk_size=2000)
+    count = index.rebuild((factcheck_id, f"{title}\n{summary}") for factcheck_id, title, summary in rows)
+    logger.info(f"Similarity index rebuilt with {count} fact-check(s)")
+    return count
+
+
+def find_similar_factchecks(text, k=None):
+    """
+    The published fact-checks most similar to `text`, best first, each with a `similarity` attribute.
+    """
+    from factchecks.models import FactCheck
+
+    k = k or settings.AI_SIMILARITY_TOP_K
+    index = get_index()
+    if not index.exists():
+        logger.warning("Similarity index not built yet; run `python manage.py rebuild_similarity_index`")
+        return []
+    try:
+        matches = index.search(text, k=k, min_score=settings.AI_SIMILARITY_MIN_SCORE)
+    except (OSError, ValueError):
+        logger.exception("Similarity index unavailable")
+        return []
+
+    factchecks = FactCheck.objects.only('id', 'title', 'verdict').in_bulk([factcheck_id for factcheck_id, _ in matches])
+    similar = []
+    for factcheck_id, score in matches:
+        factcheck = factchecks.get(factcheck_id)
+        if factcheck is not None:  # Deleted since it was indexed
+            factcheck.similarity = score
+            similar.append(factcheck)
+    return similar
+
+
+def describe_factcheck(factcheck):
+    """How a matched fact-check appears in AIAnalysis.similar_claims and in the prompt"""
+    return f"{factcheck.title} (verdict: {factcheck.verdict}, fact-check #{factcheck.id})"
@@ -0,0 +1,182 @@
+# ai_factcheck/stream_views.py
+"""
+Streaming AI analysis over Server-Sent Events.
+
+This is a native async Django view: served by the ASGI app (backend/asgi.py,
+e.g. `uvicorn backend.asgi:application`) it relays provider tokens as they
+arrive without holding a thread per open stream. Database work runs in short
+sync_to_async calls. Under WSGI it still works, but each stream occupies a
+worker thread for its whole duration.
+"""
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from factchecks.models import Submission
+from .models import AIAnalysis
+from . import concurrency, services
+from .client import get_provider
+from .serializers import AIAnalysisSerializer
+from .streaming import IncrementalAnalysisParser, sse_event
+
+logger = logging.getLogger(__name__)
+
+WAIT_POLL_INTERVAL = 0.5  # seconds between checks while waiting on another request's analysis
+
+
+def _authenticate(request):
+    """The user for the request's JWT, or None"""
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return result[0] if result else None
+
+
+def _serialize(analysis):
+    return AIAnalysisSerializer(analysis).data
+
+
+async def _existing_analysis_events(analysis):
+    yield sse_event('analysis', await sync_to_async(_serialize)(analysis))
+
+
+async def _waiting_events(submission):
+    """
+    Another request is already analyzing this submission: wait for its result
+    instead of paying for a second provider call.
+    """
+    yield sse_event('status', {'status': 'waiting', 'submission_id': submission.id})
+    deadline = time.monotonic() + settings.AI_SINGLE_FLIGHT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(WAIT_POLL_INTERVAL)
+        in_progress = await sync_to_async(concurrency.flight_in_progress)(submission.id)
+        analysis = await AIAnalysis.objects.select_related('submission').filter(submission=submission).afirst()
+        if analysis:
+            yield sse_event('analysis', await sync_to_async(_serialize)(analysis))
+            return
+        if not in_progress:
+            break
+    yield sse_event('error', {
+        'error': "The analysis in progress did not complete. Please try again.",
+        'status': status.HTTP_503_SERVICE_UNAVAILABLE,
+    })
+
+
+async def _analysis_events(submission, flight_token):
+    """Produce the SSE stream for one submission's analysis"""
+    start_time = time.time()
+    try:
+        # Sent before any slow work, so the client gets its first byte right away
+        yield sse_event('status', {'status': 'started', 'submission_id': submission.id})
+        async for event in _analyze_and_stream(submission, start_time):
+            yield event
+    finally:
+        # Also runs when the client disconnects mid-stream
+        await sync_to_async(concurrency.release_flight)(submission.id, flight_token)
+
+
+async def _analyze_and_stream(submission, start_time):
+    try:
+        near_duplicate = await sync_to_async(services.analysis_from_near_duplicate)(submission, start_time)
+        if near_duplicate is not None:
+            yield sse_event('analysis', await sync_to_async(_serialize)(near_duplicate))
+            return
+
+        similar = await sync_to_async(services.find_similar)(submission)
+        cache_key = services.cache_key_for(submission)
+        cached = await sync_to_async(services.analysis_from_cache)(submission, cache_key, similar, start_time)
+        if cached is not None:
+            yield sse_event('analysis', await sync_to_async(_serialize)(cached))
+            return
+
+        provider = get_provider()
+        call_info = {}
+        stream = await provider.astream_completion(call_info, **services.completion_kwargs(submission, similar))
+        parser = IncrementalAnalysisParser()
+        token_usage = None
+        async for chunk in stream:
+            token_usage = chunk.usage or token_usage
+            if not chunk.text:
+                continue
+            yield sse_event('token', {'text': chunk.text})
+            for name, value in parser.feed(chunk.text):
+                yield sse_event('field', {'name': name, 'value': value})
+
+        processing_time = time.time() - start_time
+        ai_data = services.parse_ai_response(parser.text)
+        analysis = await sync_to_async(services.save_analysis)(
+            submission, cache_key, similar, ai_data, processing_time,
+            token_usage=token_usage, retries=call_info['retries']
+        )
+        yield sse_event('analysis', await sync_to_async(_serialize)(analysis))
+
+    except services.PROVIDER_ERRORS as e:
+        message, error_status = services.describe_provider_error(e)
+        logger.error(f"Streaming AI analysis failed for submission {submission.id}: {e}")
+        yield sse_event('error', {'error': message, 'status': error_status})
+    except Exception as e:
+        logger.exception(f"Unexpected error in streaming AI analysis for submission {submission.id}")
+        yield sse_event('error', {'error': f"Processing error: {str(e)}", 'status': status.HTTP_500_INTERNAL_SERVER_ERROR})
+
+
+@csrf_exempt  # JWT in the Authorization header, not a cookie
+@require_POST
+async def stream_submission_ai(request, submission_id):
+    """
+    Analyze a submission and stream the result as Server-Sent Events (admin only).
+
+    Events: `status` (sent immediately), `token` (raw model output), `field`
+    (a verdict, confidence score or evidence item parsed from the partial
+    answer), then `analysis` (the saved AIAnalysis) or `error`.
+    A submission that already has an analysis gets its `analysis` event at once,
+    and while another request is analyzing it the stream sends `status: waiting`
+    and then that request's `analysis`, so only one provider call is paid for.
+
+    Browsers' EventSource can't send an Authorization header, so read the
+    stream with fetch() and a ReadableStream.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+    if not user.is_staff:
+        return JsonResponse({"detail": "You do not have permission to perform this action."}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        submission = await Submission.objects.aget(id=submission_id)
+    except Submission.DoesNotExist:
+        return JsonResponse({"error": "Submission not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    existing_analysis = await AIAnalysis.objects.select_related('submission').filter(submission=submission).afirst()
+    if existing_analysis:
+        events = _existing_analysis_events(existing_analysis)
+    elif await sync_to_async(concurrency.flight_in_progress)(submission.id):
+        events = _waiting_events(submission)
+    else:
+        wait = await sync_to_async(concurrency.check_rate_limits)(user)
+        if wait:
+            response = JsonResponse(
+                {"error": "Too many AI analysis requests. Please try again later.", "retry_after": round(wait, 1)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = concurrency.retry_after_header(wait)
+            return response
+        flight_token = await sync_to_async(concurrency.acquire_flight)(submission.id)
+        if flight_token is None:
+            events = _waiting_events(submission)  # Lost the race to a concurrent request
+        else:
+            events = _analysis_events(submission, flight_token)
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
@@ -0,0 +1,71 @@
+# ai_factcheck/streaming.py
+import json
+import re
+
+CONFIDENCE_RE = re.compile(r'"confidence_score"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\s]')
+VERDICT_RE = re.compile(r'"suggested_verdict"\s*:\s*"([a-z]+)"')
+EVIDENCE_RE = re.compile(r'"evidence"\s*:\s*\[')
+
+_decoder = json.JSONDecoder()
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class IncrementalAnalysisParser:
+    """
+    Pulls the analysis fields out of the model's JSON answer while it streams in,
+    so the UI can show the verdict and evidence before the answer is complete.
+
+    feed() returns the fields that became available with the new text, e.g.
+    [('suggested_verdict', 'false'), ('evidence', 'Source 1')]; each evidence
+    item is reported once, as soon as its string is complete.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.fields = {}
+        self.evidence = []
+
+    def feed(self, chunk):
+        self.text += chunk
+        updates = []
+
+        if 'confidence_score' not in self.fields:
+            match = CONFIDENCE_RE.search(self.text)
+            if match:
+                self.fields['confidence_score'] = float(match.group(1))
+                updates.append(('confidence_score', self.fields['confidence_score']))
+
+        if 'suggested_verdict' not in self.fields:
+            match = VERDICT_RE.search(self.text)
+            if match:
+                self.fields['suggested_verdict'] = match.group(1)
+                updates.append(('suggested_verdict', match.group(1)))
+
+        for item in self._evidence_items()[len(self.evidence):]:
+            self.evidence.append(item)
+            updates.append(('evidence', item))
+
+        return updates
+
+    def _evidence_items(self):
+        """The evidence strings that are complete so far"""
+        match = EVIDENCE_RE.search(self.text)
+        if not match:
+            return []
+        items = []
+        position = match.end()
+        while True:
+            while position < len(self.text) and self.text[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(self.text) or self.text[position] == ']':
+                return items
+            try:
+                item, position = _decoder.raw_decode(self.text, position)
+            except ValueError:
+                return items  # The next item is still streaming in
+            if isinstance(item, str):
+                items.append(item)
@@ -0,0 +1,137 @@
+# ai_factcheck/stub_server.py
+"""
+A tiny OpenAI-compatible server that stands in for the AI provider in tests and
+local runs. Point OPENAI_BASE_URL at it, e.g. http://127.0.0.1:8089/v1
+
+It answers POST .../chat/completions with a valid analysis derived from a hash
+of the prompt (the same prompt always gets the same verdict, the same one the
+LocalProvider backend gives), after an optional
+delay, streamed in small chunks when the request asks for `stream`, and can fail a share of the calls with a 500 to exercise retries and
+the circuit breaker.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .providers.local import local_analysis as stub_analysis
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real provider
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server = self.server
+        server.record_request(self.client_address)
+        if server.latency:
+            time.sleep(server.latency)
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self.reply(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+        if server.should_fail():
+            return self.reply(500, {"error": {"message": "Stub provider failure", "type": "server_error"}})
+
+        request = json.loads(body or b'{}')
+        prompt = ''.join(message.get('content', '') for message in request.get('messages', []))
+        if request.get('stream'):
+            return self.stream(request, json.dumps(stub_analysis(prompt)))
+        self.reply(200, {
+            "id": f"chatcmpl-stub-{server.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'stub'),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(stub_analysis(prompt))},
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 60, "total_tokens": len(prompt) // 4 + 60},
+        })
+
+    def stream(self, request, content, piece_size=8):
+        """Send the answer as chat.completion.chunk events, a few characters at a time"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')  # No Content-Length: the stream ends when the connection closes
+        self.end_headers()
+        self.close_connection = True
+        for start in range(0, len(content), piece_size):
+            chunk = {
+                "id": f"chatcmpl-stub-{self.server.request_count}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get('model', 'stub'),
+                "choices": [{"index": 0, "delta": {"content": content[start:start + piece_size]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        if (request.get('stream_options') or {}).get('include_usage'):
+            prompt_tokens = sum(len(message.get('content', '')) for message in request.get('messages', [])) // 4
+            chunk = {
+                "id": f"chatcmpl-stub-{self.server.request_count}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get('model', 'stub'),
+                "choices": [],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60, "total_tokens": prompt_tokens + 60},
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def reply(self, status_code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, failure_rate=0.0, token_delay=0.0, seed=None, verbose=False):
+        super().__init__(address, StubProviderHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.verbose = verbose
+        self.request_count = 0
+        self.connections = set()  # Distinct client sockets seen, to check connection reuse
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def record_request(self, client_address):
+        with self._lock:
+            self.request_count += 1
+            self.connections.add(client_address)
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def handle_error(self, request, client_address):
+        # A client that gave up on a slow answer (timeout, cancelled stream) isn't an error here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """Start a stub server on a background thread; port 0 picks a free port. Call .shutdown() to stop it."""
+    server = StubProviderServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
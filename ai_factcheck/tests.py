@@ -1,3 +1,439 @@
-from django.test import TestCase
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from factchecks.models import FactCheck, StatsRollup, Submission
+from . import concurrency, services, similarity
+from .client import CircuitBreaker, CircuitOpenError, ProviderClient, use_backend
+from .models import AIAnalysis, AnalysisJob
+from .providers.base import ProviderTimeoutError, ProviderUnavailableError
+from .providers.local import LocalProvider
+from .providers.openai_provider import OpenAIProvider
+from .stub_server import start_stub_server
+from .worker import claim_jobs, run_job
+
+
+class AITestCase(TestCase):
+    """
+    Runs AI calls through an instant LocalProvider, with a fresh similarity
+    index and empty rate limit buckets for every test.
+    """
+
+    def setUp(self):
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self.enterContext(override_settings(AI_SIMILARITY_INDEX_DIR=index_dir, AI_PROVIDER_RETRY_BASE=0))
+        similarity._index = None
+        self.addCleanup(setattr, similarity, '_index', None)
+        cache.clear()
+
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def use_local_provider(self, **options):
+        return self.enterContext(use_backend(LocalProvider(**{'latency': 0, 'seed': 1, **options})))
+
+    def create_submissions(self, count):
+        return [Submission.objects.create(claim_text=f"Claim number {i} about the price of rice") for i in range(count)]
+
+
+class AnalysisJobQueueTests(AITestCase):
+
+    def test_enqueue_returns_202_and_reuses_the_active_job(self):
+        submission, = self.create_submissions(1)
+        url = reverse('process-submission-ai', args=[submission.id])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 202)
+        job = AnalysisJob.objects.get()
+        self.assertEqual((response.data['id'], response.data['status']), (job.id, 'queued'))
+        self.assertTrue(response.data['status_url'].endswith(reverse('get-ai-job', args=[job.id])))
+
+        # A second request while the job is active gets the same job
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['id'], job.id)
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+        # The database refuses a second active job, whatever the view does
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnalysisJob.objects.create(submission=submission)
+
+    def test_claims_are_exclusive(self):
+        for submission in self.create_submissions(3):
+            AnalysisJob.objects.create(submission=submission)
+        first = claim_jobs('worker-1', 2)
+        second = claim_jobs('worker-2', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.id for job in first} & {job.id for job in second})
+        self.assertEqual(claim_jobs('worker-3', 2), [])
+
+        # A job whose worker died becomes claimable once its lock expires
+        AnalysisJob.objects.filter(pk=first[0].pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed, = claim_jobs('worker-3', 2)
+        self.assertEqual((reclaimed.id, reclaimed.locked_by, reclaimed.attempts), (first[0].id, 'worker-3', 2))
+
+    def test_claims_can_be_limited_to_given_jobs(self):
+        jobs = [AnalysisJob.objects.create(submission=submission) for submission in self.create_submissions(3)]
+        claimed = claim_jobs('benchmark', 3, job_ids=[jobs[1].id, jobs[2].id])
+        self.assertEqual([job.id for job in claimed], [jobs[1].id, jobs[2].id])
+        self.assertEqual(AnalysisJob.objects.get(pk=jobs[0].pk).status, 'queued')
+
+    def test_job_runs_and_the_worker_records_the_analysis(self):
+        self.use_local_provider()
+        submission, = self.create_submissions(1)
+        response = self.client.post(reverse('process-submission-ai', args=[submission.id]))
+        job, = claim_jobs('worker-1', 1)
+        run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.analysis, AIAnalysis.objects.get(submission=submission))
+        response = self.client.get(response.data['status_url'])
+        self.assertEqual(response.data['status'], 'succeeded')
+        # Asking again answers with the analysis
+        response = self.client.post(reverse('process-submission-ai', args=[submission.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], job.analysis.id)
+
+    @override_settings(AI_JOB_RETRY_BACKOFF=10, AI_JOB_MAX_ATTEMPTS=2, AI_PROVIDER_MAX_RETRIES=0,
+                       AI_CIRCUIT_FAILURE_THRESHOLD=100)
+    def test_failed_job_backs_off_then_fails(self):
+        self.use_local_provider(failure_rate=1)
+        submission, = self.create_submissions(1)
+        self.client.post(reverse('process-submission-ai', args=[submission.id]))
+
+        job, = claim_jobs('worker-1', 1)
+        before = timezone.now()
+        with self.assertLogs('ai_factcheck.worker', 'WARNING'):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertEqual(job.last_error, "AI service error")
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=10))
+        self.assertEqual(claim_jobs('worker-1', 1), [])  # Not due yet
+
+        AnalysisJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job, = claim_jobs('worker-1', 1)
+        with self.assertLogs('ai_factcheck.worker', 'ERROR'):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertFalse(AIAnalysis.objects.exists())
+
+        # A failed job isn't active: the submission can be queued again
+        response = self.client.post(reverse('process-submission-ai', args=[submission.id]))
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data['id'], job.id)
+
+
+class BatchAnalysisTests(AITestCase):
+
+    def test_batch_queues_one_job_per_submission(self):
+        self.use_local_provider()
+        submissions = self.create_submissions(4)
+        AIAnalysis.objects.create(submission=submissions[3], claim_extracted="Already analyzed")
+        active = AnalysisJob.objects.create(submission=submissions[2])
+        ids = [submission.id for submission in submissions] + [0]
+
+        response = self.client.post(reverse('process-batch-ai'), {'submission_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']], ['queued', 'queued', 'queued', 'skipped', 'not_found']
+        )
+        jobs = {job.submission_id: job.id for job in AnalysisJob.objects.all()}
+        self.assertEqual(response.data['job_ids'], [jobs[submission.id] for submission in submissions[:3]])
+        self.assertEqual(jobs[submissions[2].id], active.id)  # Shared with the job already active
+        self.assertEqual(AIAnalysis.objects.count(), 1)  # Nothing analyzed in the request
+
+    @override_settings(AI_RATE_LIMIT_USER='2/min')
+    def test_batch_stops_at_the_rate_limit(self):
+        submissions = self.create_submissions(3)
+        response = self.client.post(reverse('process-batch-ai'), {'status': 'new'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['summary'], {'queued': 2, 'rate_limited': 1})
+        self.assertEqual(response.data['results'][2]['submission_id'], submissions[2].id)
+
+        # The queued ones are shared, the rest is still refused
+        response = self.client.post(reverse('process-batch-ai'), {'status': 'new'}, format='json')
+        self.assertEqual(response.data['summary'], {'queued': 2, 'rate_limited': 1})
+        response = self.client.post(reverse('process-batch-ai'), {'submission_ids': [submissions[2].id]}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+
+class AnalyzeBatchTests(AITestCase):
+    """In-process batches (analyze_submissions) share the guards of the API's jobs"""
+
+    @override_settings(AI_RATE_LIMIT_GLOBAL='2/min')
+    def test_calls_take_from_the_global_rate_limit(self):
+        self.use_local_provider()
+        submissions = self.create_submissions(3)
+        results = services.run_batch([submission.id for submission in submissions])
+        self.assertEqual([result['status'] for result in results], ['analyzed', 'analyzed', 'rate_limited'])
+        self.assertGreater(results[2]['retry_after'], 0)
+        self.assertEqual(AIAnalysis.objects.count(), 2)
+
+        # The API's requests draw from the same bucket
+        response = self.client.post(reverse('process-submission-ai', args=[submissions[2].id]))
+        self.assertEqual(response.status_code, 429)
+
+    def test_submissions_being_analyzed_are_left_alone(self):
+        provider = self.use_local_provider()
+        submissions = self.create_submissions(2)
+        token = concurrency.acquire_flight(submissions[0].id)  # A job or a stream is analyzing it
+        results = services.run_batch([submission.id for submission in submissions])
+        self.assertEqual([result['status'] for result in results], ['in_progress', 'analyzed'])
+        self.assertEqual(provider.metrics()['calls'], 1)
+        self.assertFalse(concurrency.flight_in_progress(submissions[1].id))  # Released after the batch
+        concurrency.release_flight(submissions[0].id, token)
+
+
+
+class NearDuplicatePrescreenTests(AITestCase):
+    """Every analysis path answers a near-duplicate of a published fact-check with it, without an AI call"""
+    CLAIM = "The ministry of health says the cholera vaccine campaign has ended in the north"
+
+    def setUp(self):
+        super().setUp()
+        self.provider = self.use_local_provider()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fact_check = FactCheck.objects.create(title=self.CLAIM, verdict='Mostly False', summary="Summary")
+
+    def near_duplicate(self):
+        return Submission.objects.create(claim_text=self.CLAIM.lower() + '!')
+
+    def assertNearDuplicateAnalysis(self, analysis):
+        self.assertEqual((analysis.ai_model_used, analysis.suggested_verdict), (services.NEAR_DUPLICATE_MODEL, 'false'))
+        self.assertTrue(analysis.from_cache)
+        self.assertIn(f"fact-check #{self.fact_check.id}", analysis.similar_claims[0])
+
+    def test_run_analysis_and_jobs(self):
+        self.assertNearDuplicateAnalysis(services.run_analysis(self.near_duplicate()))
+
+        job = AnalysisJob.objects.create(submission=self.near_duplicate())
+        job, = claim_jobs('worker-1', 1)
+        run_job(job)
+        job.refresh_from_db()
+        self.assertNearDuplicateAnalysis(job.analysis)
+        self.assertEqual(self.provider.metrics()['calls'], 0)
+
+        # force=true skips the pre-screen, in the view and in the job
+        submission = self.near_duplicate()
+        response = self.client.post(reverse('process-submission-ai', args=[submission.id]), {'force': True}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job, = claim_jobs('worker-1', 1)
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.analysis.ai_model_used, self.provider.model)
+        self.assertEqual(self.provider.metrics()['calls'], 1)
+
+    def test_batch(self):
+        submissions = [self.near_duplicate(), *self.create_submissions(1)]
+        results = services.run_batch([submission.id for submission in submissions])
+        self.assertEqual([result['status'] for result in results], ['analyzed', 'analyzed'])
+        self.assertEqual(results[0]['near_duplicate_of'], self.fact_check.id)
+        self.assertNearDuplicateAnalysis(AIAnalysis.objects.get(pk=results[0]['analysis_id']))
+        self.assertEqual(self.provider.metrics()['calls'], 1)  # For the other claim only
+
+    def test_stream(self):
+        submission = self.near_duplicate()
+        token = RefreshToken.for_user(self.admin).access_token
+        response = self.client.post(
+            reverse('stream-submission-ai', args=[submission.id]), HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+        async def read():
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        body = async_to_sync(read)()
+        self.assertIn('event: analysis', body)
+        self.assertNotIn('event: token', body)
+        self.assertNearDuplicateAnalysis(AIAnalysis.objects.get(submission=submission))
+        self.assertEqual(self.provider.metrics()['calls'], 0)
+
+class SimilarityIndexTests(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+
+    def open_index(self):
+        return similarity.SimilarityIndex(self.path, 256)
+
+    def test_tests_never_use_the_real_index(self):
+        self.assertFalse(Path(settings.AI_SIMILARITY_INDEX_DIR).is_relative_to(settings.BASE_DIR))
+
+    def test_rebuild_swaps_in_new_files_under_other_instances(self):
+        builder, reader = self.open_index(), self.open_index()
+        builder.rebuild([(1, "Rice prices double in Port-au-Prince")])
+        self.assertEqual(reader.search("rice prices")[0][0], 1)
+        header = os.stat(os.path.join(self.path, 'header.i64')).st_ino
+
+        builder.rebuild([(2, "Fuel shortage closes schools in Cap-Haitien")])
+        self.assertNotEqual(os.stat(os.path.join(self.path, 'header.i64')).st_ino, header)
+        self.assertFalse([name for name in os.listdir(self.path) if name.startswith('.rebuild-')])
+        self.assertNotIn(1, [factcheck_id for factcheck_id, _ in reader.search("rice prices")])
+        self.assertEqual(reader.search("fuel shortage")[0][0], 2)
+
+        reader.upsert(3, "Rice harvest falls in the Artibonite valley")
+        self.assertEqual(builder.search("rice harvest")[0][0], 3)
+        self.assertEqual(len(builder), 2)
+
+
+class SimilaritySearchTests(AITestCase):
+
+    def test_nothing_is_found_until_the_index_is_built(self):
+        fact_check = FactCheck.objects.create(
+            title="Rice prices double in Port-au-Prince", summary="Market prices checked", verdict='True',
+        )
+        with self.assertLogs('ai_factcheck.similarity', 'WARNING'):
+            self.assertEqual(similarity.find_similar_factchecks("rice prices double"), [])
+        self.assertFalse(similarity.get_index().exists())
+
+        call_command('rebuild_similarity_index', stdout=StringIO())
+        self.assertEqual(similarity.find_similar_factchecks("rice prices double"), [fact_check])
+
+
+class BenchmarkTests(AITestCase):
+
+    def test_benchmark_leaves_the_stats_as_it_found_them(self):
+        self.create_submissions(2)
+        before = StatsRollup.load().as_dict()
+        call_command('benchmark_ai', '--local', '--latency', '0', '--mode', 'batch', '--count', '5', stdout=StringIO())
+        self.assertEqual(Submission.objects.count(), 2)
+        self.assertEqual(StatsRollup.load().as_dict(), before)
+        self.assertEqual(before, StatsRollup.compute_counts())
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(
+    OPENAI_API_KEY='test', AI_PROVIDER_TIMEOUT=2, AI_PROVIDER_MAX_RETRIES=2, AI_PROVIDER_RETRY_BASE=0,
+    AI_CIRCUIT_FAILURE_THRESHOLD=2, AI_CIRCUIT_RECOVERY_TIMEOUT=30,
+)
+class ProviderClientTests(TestCase):
+    """Retries, timeouts and the circuit breaker, against the OpenAI backend talking to the stub server"""
+    MESSAGES = [{'role': 'user', 'content': "Is the bridge in Jacmel closed?"}]
+    SEED = 1  # With a failure rate of 0.5, the first call fails and the second succeeds
+
+    def setUp(self):
+        self.server = start_stub_server(seed=self.SEED)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.enterContext(override_settings(OPENAI_BASE_URL=self.server.base_url))
+        # The retry and breaker warnings are expected here
+        logger = logging.getLogger('ai_factcheck.client')
+        self.addCleanup(setattr, logger, 'disabled', logger.disabled)
+        logger.disabled = True
+
+    def make_client(self):
+        client = ProviderClient(OpenAIProvider())
+        client.breaker.clock = self.clock = FakeClock()
+        self.addCleanup(client.backend.close)
+        return client
+
+    def test_retries_until_a_call_succeeds(self):
+        server = self.server
+        server.failure_rate = 0.5
+        client = self.make_client()
+        call_info = {}
+        completion = client.create_completion(call_info=call_info, messages=self.MESSAGES)
+        self.assertIn('suggested_verdict', completion.content)
+        self.assertEqual(call_info['retries'], 1)
+        self.assertEqual(server.request_count, 2)
+        self.assertEqual(len(server.connections), 1)  # The pooled connection was kept alive
+        self.assertEqual(client.metrics()['circuit']['state'], CircuitBreaker.CLOSED)
+
+    @override_settings(AI_CIRCUIT_FAILURE_THRESHOLD=10)
+    def test_gives_up_after_max_retries(self):
+        server = self.server
+        server.failure_rate = 1
+        client = self.make_client()
+        with self.assertRaises(ProviderUnavailableError):
+            client.create_completion(messages=self.MESSAGES)
+        self.assertEqual(server.request_count, 3)
+        self.assertEqual(client.metrics()['retries'], 2)
+
+    @override_settings(AI_PROVIDER_TIMEOUT=0.2, AI_PROVIDER_MAX_RETRIES=0)
+    def test_slow_call_times_out(self):
+        self.server.latency = 1
+        client = self.make_client()
+        with self.assertRaises(ProviderTimeoutError):
+            client.create_completion(messages=self.MESSAGES)
+
+    @override_settings(AI_PROVIDER_MAX_RETRIES=0)
+    def test_breaker_opens_then_probes(self):
+        server = self.server
+        server.failure_rate = 1
+        client = self.make_client()
+        for _ in range(2):
+            with self.assertRaises(ProviderUnavailableError):
+                client.create_completion(messages=self.MESSAGES)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        # Open: fails fast without calling the provider
+        with self.assertRaises(CircuitOpenError):
+            client.create_completion(messages=self.MESSAGES)
+        self.assertEqual(server.request_count, 2)
+
+        # After the recovery timeout, a failed probe opens it again...
+        self.clock.now += 30
+        with self.assertRaises(ProviderUnavailableError):
+            client.create_completion(messages=self.MESSAGES)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        # ...and a successful one closes it
+        server.failure_rate = 0
+        self.clock.now += 30
+        client.create_completion(messages=self.MESSAGES)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(client.metrics()['rejected'], 1)
+
+    @override_settings(AI_PROVIDER_MAX_RETRIES=0)
+    def test_cancelled_probe_lets_the_next_call_probe(self):
+        server = self.server
+        server.failure_rate = 1
+        client = self.make_client()
+        for _ in range(2):
+            with self.assertRaises(ProviderUnavailableError):
+                client.create_completion(messages=self.MESSAGES)
+        server.failure_rate, server.latency = 0, 1
+        self.clock.now += 30
+
+        async def cancel_probe():
+            try:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.acreate_completion(messages=self.MESSAGES), 0.1)
+            finally:
+                await client.aclose()
+
+        asyncio.run(cancel_probe())
+        self.assertEqual(client.breaker.state, CircuitBreaker.HALF_OPEN)
+        server.latency = 0
+        client.create_completion(messages=self.MESSAGES)  # Not refused as if a probe were still running
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
@@ -1,7 +1,13 @@
 from django.urls import path
-from . import views
+from . import views, stream_views
 
 urlpatterns = [
     path('api/ai/process-submission/<int:submission_id>/', views.process_submission_ai, name='process-submission-ai'),
+    path('api/ai/stream-submission/<int:submission_id>/', stream_views.stream_submission_ai, name='stream-submission-ai'),
     path('api/ai/analysis/<int:submission_id>/', views.get_ai_analysis, name='get-ai-analysis'),
+    path('api/ai/jobs/<int:job_id>/', views.get_ai_job, name='get-ai-job'),
+    path('api/ai/batch/', views.process_batch_ai, name='process-batch-ai'),
+    path('api/ai/cache-stats/', views.get_ai_cache_stats, name='get-ai-cache-stats'),
+    path('api/ai/provider-metrics/', views.get_ai_provider_metrics, name='get-ai-provider-metrics'),
+    path('api/ai/usage/', views.get_ai_usage, name='get-ai-usage'),
 ]
\ No newline at end of file
@@ -0,0 +1,219 @@
+# ai_factcheck/usage.py
+"""
+Token, cost and latency accounting for AI analyses.
+
+Every saved analysis is added to its hour's AIUsageRollup row (per model).
+Rows are updated with a conditional UPDATE on their version, retried on
+conflict, so concurrent workers never lose an increment and SQLite never has
+to upgrade a read transaction to a write one.
+"""
+import bisect
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIAnalysis, AIUsageRollup
+
+logger = logging.getLogger(__name__)
+
+MAX_UPDATE_ATTEMPTS = 10
+PERCENTILES = (50, 95, 99)
+
+
+def compute_cost(model, prompt_tokens, completion_tokens):
+    """Cost in USD from settings.AI_MODEL_PRICING (USD per million tokens); 0 for unknown models"""
+    pricing = settings.AI_MODEL_PRICING.get(model)
+    if not pricing:
+        return Decimal(0)
+    cost = (
+        Decimal(prompt_tokens) * Decimal(str(pricing['prompt'])) +
+        Decimal(completion_tokens) * Decimal(str(pricing['completion']))
+    ) / 1_000_000
+    return cost.quantize(Decimal('0.000001'))
+
+
+def apply_usage(analysis, usage, retries=0, queue_wait=None):
+    """Copy a provider response's token usage (may be None) and the call stats onto an unsaved analysis"""
+    analysis.prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    analysis.completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    analysis.cost_usd = compute_cost(analysis.ai_model_used, analysis.prompt_tokens, analysis.completion_tokens)
+    analysis.retries = retries
+    analysis.queue_wait = queue_wait
+    return analysis
+
+
+def latency_bucket(seconds):
+    return bisect.bisect_left(AIUsageRollup.LATENCY_BUCKETS, seconds)
+
+
+def empty_histogram():
+    return [0] * (len(AIUsageRollup.LATENCY_BUCKETS) + 1)
+
+
+def _totals(analyses):
+    """Sum analyses into the fields of one rollup row"""
+    totals = {
+        'calls': 0, 'cache_hits': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+        'cost_usd': Decimal(0), 'retries': 0, 'total_latency': 0.0,
+        'queued_calls': 0, 'total_queue_wait': 0.0,
+    }
+    histogram = empty_histogram()
+    for analysis in analyses:
+        if analysis.from_cache:
+            totals['cache_hits'] += 1
+            continue
+        totals['calls'] += 1
+        totals['prompt_tokens'] += analysis.prompt_tokens
+        totals['completion_tokens'] += analysis.completion_tokens
+        totals['cost_usd'] += Decimal(analysis.cost_usd)
+        totals['retries'] += analysis.retries
+        totals['total_latency'] += analysis.processing_time
+        histogram[latency_bucket(analysis.processing_time)] += 1
+        if analysis.queue_wait is not None:
+            totals['queued_calls'] += 1
+            totals['total_queue_wait'] += analysis.queue_wait
+    return totals, histogram
+
+
+def _add_to_rollup(hour, model, totals, histogram):
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        rollup = AIUsageRollup.objects.filter(hour=hour, ai_model_used=model).first()
+        if rollup is None:
+            try:
+                AIUsageRollup.objects.create(hour=hour, ai_model_used=model, latency_histogram=histogram, **totals)
+                return
+            except IntegrityError:
+                continue  # Created concurrently; add to it instead
+
+        stored = rollup.latency_histogram or empty_histogram()
+        merged = [a + b for a, b in zip(stored + [0] * (len(histogram) - len(stored)), histogram)]
+        updated = AIUsageRollup.objects.filter(pk=rollup.pk, version=rollup.version).update(
+            latency_histogram=merged,
+            version=F('version') + 1,
+            **{field: F(field) + value for field, value in totals.items()}
+        )
+        if updated:
+            return
+    logger.error(f"Could not update AI usage rollup {hour} {model} after {MAX_UPDATE_ATTEMPTS} attempts")
+
+
+def record_usage(analyses):
+    """Add saved analyses to their hourly rollups"""
+    groups = defaultdict(list)
+    for analysis in analyses:
+        created = analysis.created_at or timezone.now()
+        hour = created.replace(minute=0, second=0, microsecond=0)
+        groups[hour, analysis.ai_model_used].append(analysis)
+    for (hour, model), group in groups.items():
+        _add_to_rollup(hour, model, *_totals(group))
+
+
+def rebuild_rollups(since=None):
+    """Recompute the rollups from the analyses (all of them, or those created since `since`)"""
+    rollups = AIUsageRollup.objects.all()
+    analyses = AIAnalysis.objects.only(
+        'created_at', 'ai_model_used', 'from_cache', 'prompt_tokens', 'completion_tokens',
+        'cost_usd', 'retries', 'processing_time', 'queue_wait',
+    )
+    if since is not None:
+        since = since.replace(minute=0, second=0, microsecond=0)
+        rollups = rollups.filter(hour__gte=since)
+        analyses = analyses.filter(created_at__gte=since)
+    rollups.delete()
+
+    batch = []
+    for analysis in analyses.order_by('created_at').iterator(chunk_size=2000):
+        batch.append(analysis)
+        if len(batch) >= 2000:
+            record_usage(batch)
+            batch = []
+    record_usage(batch)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list of measurements; None when empty"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(1, -(-len(sorted_values) * p // 100)) - 1]
+
+
+def estimate_percentile(histogram, percentile):
+    """
+    Estimate a latency percentile from histogram counts, interpolating linearly
+    inside the bucket it falls in. None when the histogram is empty.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    bounds = [0.0] + AIUsageRollup.LATENCY_BUCKETS
+    rank = total * percentile / 100
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            if index >= len(AIUsageRollup.LATENCY_BUCKETS):
+                return float(bounds[-1])  # Overflow bucket: report its lower bound
+            low, high = bounds[index], bounds[index + 1]
+            return round(low + (high - low) * (rank - seen) / count, 3)
+        seen += count
+    return float(bounds[-1])
+
+
+def _summarize(rollups):
+    totals, histogram = None, empty_histogram()
+    for rollup in rollups:
+        if totals is None:
+            totals = dict.fromkeys(
+                ['calls', 'cache_hits', 'prompt_tokens', 'completion_tokens', 'retries', 'queued_calls'], 0
+            )
+            totals.update(cost_usd=Decimal(0), total_latency=0.0, total_queue_wait=0.0)
+        for field in totals:
+            totals[field] += getattr(rollup, field)
+        for index, count in enumerate(rollup.latency_histogram or []):
+            histogram[index] += count
+    totals = totals or {}
+    calls = totals.get('calls', 0)
+    return {
+        'calls': calls,
+        'cache_hits': totals.get('cache_hits', 0),
+        'prompt_tokens': totals.get('prompt_tokens', 0),
+        'completion_tokens': totals.get('completion_tokens', 0),
+        'tokens_per_call': round((totals['prompt_tokens'] + totals['completion_tokens']) / calls, 1) if calls else None,
+        'cost_usd': str(totals.get('cost_usd', Decimal(0))),
+        'retries': totals.get('retries', 0),
+        'latency': {
+            'mean': round(totals['total_latency'] / calls, 3) if calls else None,
+            **{f'p{p}': estimate_percentile(histogram, p) for p in PERCENTILES},
+        },
+        'queue_wait_mean': (
+            round(totals['total_queue_wait'] / totals['queued_calls'], 3) if totals.get('queued_calls') else None
+        ),
+    }
+
+
+def usage_report(days=7):
+    """Totals, per-day-and-model and per-model usage over the last `days` days"""
+    since = (timezone.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+    rollups = list(AIUsageRollup.objects.filter(hour__gte=since).order_by('hour'))
+
+    by_day = defaultdict(list)
+    by_model = defaultdict(list)
+    for rollup in rollups:
+        day = timezone.localtime(rollup.hour).date().isoformat()
+        by_day[day, rollup.ai_model_used].append(rollup)
+        by_model[rollup.ai_model_used].append(rollup)
+
+    return {
+        'since': since,
+        'totals': _summarize(rollups),
+        'by_day': [
+            {'date': day, 'model': model, **_summarize(group)}
+            for (day, model), group in sorted(by_day.items())
+        ],
+        'by_model': [{'model': model, **_summarize(group)} for model, group in sorted(by_model.items())],
+    }
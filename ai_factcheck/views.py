@@ -1,188 +1,201 @@
 # ai_factcheck/views.py
-import json
-import time
 import logging
+from collections import Counter
 from django.conf import settings
-from django.core.cache import cache
+from django.urls import reverse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from factchecks.models import Submission
-from .models import AIAnalysis
-from .serializers import AIAnalysisSerializer
-from django.core.cache import cache
+from factchecks.serializers import FactCheckSerializer
+from .models import AIAnalysis, AnalysisJob
+from . import analysis_cache, concurrency, services, usage
+from .client import provider_metrics
+from .serializers import AIAnalysisSerializer, AnalysisJobSerializer
+from .worker import queue_analysis
 
+logger = logging.getLogger(__name__)
 
-# Import the OpenAI library
-from openai import OpenAI
-from openai import APITimeoutError, APIError  # For specific error handling
 
-logger = logging.getLogger(__name__)
+def rate_limited_response(wait):
+    """429 telling the client when it may try again"""
+    return Response(
+        {"error": "Too many AI analysis requests. Please try again later.", "retry_after": round(wait, 1)},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': concurrency.retry_after_header(wait)}
+    )
+
+
+def job_data(request, job):
+    """A job as the API shows it, with the URL to poll"""
+    data = AnalysisJobSerializer(job).data
+    data['status_url'] = request.build_absolute_uri(reverse('get-ai-job', args=[job.id]))
+    return data
 
-def validate_ai_response(ai_data):
-    """Validate the structure of the AI response"""
-    if not isinstance(ai_data, dict):
-        return False
-    
-    required_fields = ['confidence_score', 'suggested_verdict', 'evidence', 'similar_claims']
-    if not all(field in ai_data for field in required_fields):
-        return False
-    
-    # Validate verdict options
-    valid_verdicts = ['true', 'false', 'misleading', 'unverifiable']
-    if ai_data.get('suggested_verdict') not in valid_verdicts:
-        return False
-    
-    # Validate confidence score
-    confidence = ai_data.get('confidence_score', 0)
-    if not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
-        return False
-    
-    return True
 
+def near_duplicate_response(request, match):
+    """200 with the published fact-check that a claim nearly duplicates"""
+    fact_check = FactCheckSerializer(match.fact_check).data
+    fact_check['detail_url'] = request.build_absolute_uri(reverse('admin-factcheck-detail', args=[match.fact_check.id]))
+    return Response({
+        "status": "near_duplicate",
+        "similarity": match.similarity,
+        "matched_field": match.field,
+        "fact_check": fact_check,
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAdminUser])
 def process_submission_ai(request, submission_id):
-    """Process a submission with AI"""
+    """
+    Queue a submission for AI analysis.
+    Returns 202 with the job to poll; the analysis itself runs in `run_ai_worker`.
+
+    A claim that nearly duplicates a published fact-check is answered right away
+    with that fact-check (status "near_duplicate") and no AI call; send
+    {"force": true} to analyze it anyway.
+    """
     try:
         submission = Submission.objects.get(id=submission_id)
-        
-        # Check if we already have an analysis for this submission
-        existing_analysis = AIAnalysis.objects.filter(submission=submission).first()
-        if existing_analysis:
-            return Response(
-                AIAnalysisSerializer(existing_analysis).data,
-                status=status.HTTP_200_OK
-            )
-        
-        logger.info(f"Starting AI analysis for submission {submission_id}")
-        
-        # Call AI service using OpenAI API
-        start_time = time.time()
-        
-        # Prepare the prompt for fact-checking - handle null context
-        context_text = submission.context if submission.context else 'No additional context provided'
-        
-        prompt = f"""
-As a fact-checking assistant for Ayiti Vérité, analyze this claim about Haiti:
-
-CLAIM: "{submission.claim_text}"
-
-CONTEXT: {context_text}
-
-Please provide a JSON response with this exact structure:
-{{
-    "confidence_score": 0.85,  # Number between 0-1
-    "suggested_verdict": "true",  # One of: "true", "false", "misleading", "unverifiable"
-    "evidence": [
-        "Source or reasoning 1",
-        "Source or reasoning 2"
-    ],
-    "similar_claims": [
-        "Brief description of similar claim 1",
-        "Brief description of similar claim 2"
-    ]
-}}
-
-Focus on Haitian context and available evidence. If uncertain, use "unverifiable".
-"""
-        
-        # Initialize the OpenAI client with the API key from settings
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        try:
-            # Use GPT-4o which is available and more powerful than GPT-4
-            response = client.chat.completions.create(
-                model="gpt-4o",  # Using GPT-4o
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,  # Low temperature for more factual responses
-                max_tokens=1000,
-                timeout=30  # 30 second timeout
-            )
-            
-            processing_time = time.time() - start_time
-            
-            # Extract the response content directly from the structured object
-            ai_response = response.choices[0].message.content
-            
-            # Parse the AI response
-            try:
-                # Extract JSON from the response (AI might add text around JSON)
-                json_start = ai_response.find('{')
-                json_end = ai_response.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = ai_response[json_start:json_end]
-                    ai_data = json.loads(json_str)
-                else:
-                    raise json.JSONDecodeError("No JSON found", ai_response, 0)
-                    
-                # Validate the response structure
-                if not validate_ai_response(ai_data):
-                    raise ValueError("Invalid AI response structure")
-                    
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Failed to parse AI response: {e}")
-                # Fallback response
-                ai_data = {
-                    "confidence_score": 0.5,
-                    "suggested_verdict": "unverifiable",
-                    "evidence": ["Could not parse AI response properly"],
-                    "similar_claims": []
-                }
-            
-            # Save AI analysis
-            ai_analysis = AIAnalysis.objects.create(
-                submission=submission,
-                claim_extracted=submission.claim_text,
-                confidence_score=ai_data.get('confidence_score', 0.5),
-                suggested_verdict=ai_data.get('suggested_verdict', 'unverifiable'),
-                evidence_sources=ai_data.get('evidence', []),
-                similar_claims=ai_data.get('similar_claims', []),
-                processing_time=processing_time,
-                ai_model_used="gpt-4o"  # Updated model name
-            )
-            
-            logger.info(f"AI analysis completed in {processing_time:.2f}s with confidence {ai_data.get('confidence_score', 0)}")
-            
-            # Set rate limit cache
-            cache.set(cache_key, True, timeout=30)
-            
-            return Response(AIAnalysisSerializer(ai_analysis).data)
-        
-        except APITimeoutError:
-            logger.error("AI API request timed out")
-            return Response(
-                {"error": "AI service timeout"}, 
-                status=status.HTTP_504_GATEWAY_TIMEOUT
-            )
-        except APIError as e:
-            logger.error(f"OpenAI API error: {e}")
-            
-            # Handle specific error types
-            error_message = "AI service error"
-            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-            
-            if "insufficient_quota" in str(e):
-                error_message = "AI service quota exceeded. Please check your OpenAI billing."
-                status_code = status.HTTP_402_PAYMENT_REQUIRED
-            elif "model_not_found" in str(e):
-                error_message = "AI model not available. Please check your OpenAI account settings."
-            
-            return Response(
-                {"error": error_message}, 
-                status=status_code
-            )
-            
     except Submission.DoesNotExist:
         return Response(
             {"error": "Submission not found"}, 
             status=status.HTTP_404_NOT_FOUND
         )
+        
+    # Check if we already have an analysis for this submission
+    existing_analysis = AIAnalysis.objects.filter(submission=submission).first()
+    if existing_analysis:
+        return Response(
+            AIAnalysisSerializer(existing_analysis).data,
+            status=status.HTTP_200_OK
+        )
+    
+    force = str(request.data.get('force', '')).lower() == 'true'
+    if not force:
+        # Answered right away; the job would save the same match as its analysis
+        match = services.find_near_duplicate(submission)
+        if match:
+            logger.info(
+                f"Submission {submission_id} nearly duplicates fact-check {match.fact_check.id} "
+                f"({match.similarity:.2f}); no AI call"
+            )
+            return near_duplicate_response(request, match)
+
+    job, wait = queue_analysis(submission, request.user, force=force)
+    if job is None:
+        return rate_limited_response(wait)
+    return Response(job_data(request, job), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_ai_job(request, job_id):
+    """Get the status of an AI analysis job (with the analysis once it succeeded)"""
+    try:
+        job = AnalysisJob.objects.select_related('submission', 'analysis__submission').get(id=job_id)
+    except AnalysisJob.DoesNotExist:
+        return Response(
+            {"error": "AI job not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(AnalysisJobSerializer(job).data)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def process_batch_ai(request):
+    """
+    Queue several submissions for AI analysis, one job each (shared with any
+    job already active for a submission), and return 202 with the jobs.
+    The `run_ai_worker` pool analyzes them with bounded concurrency.
+    Body: {"submission_ids": [1, 2, 3]} or {"status": "new", "limit": 50}.
+
+    Each submission gets a result: "queued"/"running" with its job, "skipped"
+    (already analyzed), "not_found", or "rate_limited" once the AI rate limits
+    refuse new jobs (429 when they refused all of them).
+    """
+    submission_ids = request.data.get('submission_ids')
+    status_filter = request.data.get('status')
+    max_size = settings.AI_BATCH_MAX_SIZE
     
+    if submission_ids is None and not status_filter:
+        return Response(
+            {"error": "Provide submission_ids or a status filter"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        if submission_ids is not None:
+            submission_ids = [int(submission_id) for submission_id in submission_ids]
+        limit = int(request.data.get('limit', max_size))
+    except (TypeError, ValueError):
+        return Response(
+            {"error": "submission_ids and limit must be integers"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if (submission_ids is not None and len(submission_ids) > max_size) or not 0 < limit <= max_size:
+        return Response(
+            {"error": f"A batch can contain at most {max_size} submissions"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    results = []
+    wait = 0
+    for submission in services.batch_submissions(submission_ids, status_filter, limit):
+        job = None
+        if not wait:
+            job, wait = queue_analysis(submission, request.user)
+        if job is None:
+            # Stop queueing once a rate limit refuses; the caller retries the rest later
+            results.append({'submission_id': submission.id, 'status': 'rate_limited', 'retry_after': round(wait, 1)})
+            continue
+        results.append({'submission_id': submission.id, 'status': job.status, 'job': job_data(request, job)})
+    if submission_ids is not None:
+        results = services.report_requested(submission_ids, results)
+
+    job_ids = [result['job']['id'] for result in results if 'job' in result]
+    if wait and not job_ids:
+        return rate_limited_response(wait)
+    return Response({
+        'job_ids': job_ids,
+        'results': results,
+        'summary': dict(Counter(result['status'] for result in results)),
+    }, status=status.HTTP_202_ACCEPTED if job_ids else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_ai_cache_stats(request):
+    """Hit ratio of the analysis cache and the AI time it saved"""
+    return Response(analysis_cache.cache_stats())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_ai_provider_metrics(request):
+    """Circuit breaker state and call/retry counters of this process's AI provider client"""
+    return Response(provider_metrics())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_ai_usage(request):
+    """
+    AI usage over the last ?days= days (default 7): latency percentiles,
+    tokens per call and spend, in total, per day and model, and per model.
+    """
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        days = 0
+    if not 0 < days <= 366:
+        return Response(
+            {"error": "days must be an integer between 1 and 366"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(usage.usage_report(days))
+
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
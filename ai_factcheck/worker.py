@@ -0,0 +1,136 @@
+# ai_factcheck/worker.py
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import AIAnalysis, AnalysisJob
+from . import concurrency, services
+
+logger = logging.getLogger(__name__)
+
+
+def make_worker_id():
+    """Identify this worker thread in AnalysisJob.locked_by"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def queue_analysis(submission, requested_by=None, force=False):
+    """
+    The active job analyzing the submission, queueing one when there's none.
+    Requests for the same submission share one job, and so one provider call;
+    only a new job takes from the AI rate limits. With `force`, the job skips
+    the near-duplicate pre-screen.
+
+    Returns (job, 0), or (None, seconds to wait) when a rate limit refused a new job.
+    """
+    job = AnalysisJob.objects.filter(submission=submission, status__in=AnalysisJob.ACTIVE_STATUSES).first()
+    if job is not None:
+        if force and not job.force:
+            AnalysisJob.objects.filter(pk=job.pk).update(force=True)
+            job.force = True
+        return job, 0
+    wait = concurrency.check_rate_limits(requested_by)
+    if wait:
+        return None, wait
+    try:
+        with transaction.atomic():
+            job = AnalysisJob.objects.create(
+                submission=submission,
+                requested_by=requested_by,
+                force=force,
+                max_attempts=settings.AI_JOB_MAX_ATTEMPTS,
+            )
+        logger.info(f"Queued AI analysis job {job.id} for submission {submission.id}")
+    except IntegrityError:
+        # A concurrent request queued it first (one active job per submission)
+        job = AnalysisJob.objects.filter(submission=submission).order_by('-created_at').first()
+    return job, 0
+
+
+def _claimable(now):
+    """Jobs that are due, plus running jobs whose visibility timeout expired (their worker died)"""
+    return (
+        Q(status='queued', run_after__lte=now) |
+        Q(status='running', locked_until__lt=now)
+    )
+
+
+def claim_jobs(worker_id, limit, job_ids=None):
+    """
+    Claim up to `limit` jobs for this worker, only among `job_ids` when given.
+
+    Each job is claimed with a conditional UPDATE, so when several workers race
+    for the same row only one of them gets it. A claimed job stays invisible to
+    other workers until its visibility timeout expires.
+    """
+    now = timezone.now()
+    claimable = AnalysisJob.objects.filter(_claimable(now))
+    if job_ids is not None:
+        claimable = claimable.filter(id__in=job_ids)
+    candidates = list(claimable.order_by('run_after', 'id').values_list('id', flat=True)[:limit * 2])
+
+    claimed = []
+    for job_id in candidates:
+        if len(claimed) >= limit:
+            break
+        updated = AnalysisJob.objects.filter(_claimable(now), pk=job_id).update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.AI_JOB_VISIBILITY_TIMEOUT),
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+        if updated:
+            claimed.append(AnalysisJob.objects.select_related('submission').get(pk=job_id))
+    return claimed
+
+
+def _finish(job, **fields):
+    """
+    Record the outcome of a job, unless another worker re-claimed it after our lock expired.
+    """
+    return AnalysisJob.objects.filter(
+        pk=job.pk, locked_by=job.locked_by, attempts=job.attempts
+    ).update(locked_until=None, **fields)
+
+
+def run_job(job):
+    """
+    Run one claimed job and record whether it succeeded, will be retried, or failed.
+    """
+    try:
+        with concurrency.single_flight(job.submission_id) as owner:
+            if not owner:
+                # Another request (e.g. a stream) is analyzing this submission right now;
+                # check back later without using up an attempt
+                _finish(job, status='queued', attempts=F('attempts') - 1,
+                        run_after=timezone.now() + timedelta(seconds=settings.AI_JOB_RETRY_BACKOFF))
+                logger.info(f"AI job {job.id} postponed: submission {job.submission_id} is already being analyzed")
+                return
+            # A previous attempt (or a concurrent stream) may have saved the analysis already
+            analysis = AIAnalysis.objects.filter(submission=job.submission).first()
+            if analysis is None:
+                queue_wait = (job.started_at - job.created_at).total_seconds()
+                analysis = services.run_analysis(job.submission, queue_wait=queue_wait, prescreen=not job.force)
+        _finish(job, status='succeeded', analysis=analysis, last_error='', finished_at=timezone.now())
+        logger.info(f"AI job {job.id} succeeded")
+
+    except Exception as e:
+        retryable = services.is_retryable_error(e)
+        message = services.describe_provider_error(e)[0] if isinstance(e, services.PROVIDER_ERRORS) else str(e)
+        if retryable and job.attempts < job.max_attempts:
+            # Exponential backoff before the next attempt
+            delay = settings.AI_JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            _finish(job, status='queued', run_after=timezone.now() + timedelta(seconds=delay), last_error=message)
+            logger.warning(f"AI job {job.id} failed (attempt {job.attempts}), retrying in {delay}s: {e}")
+        else:
+            _finish(job, status='failed', last_error=message, finished_at=timezone.now())
+            logger.error(f"AI job {job.id} failed permanently after {job.attempts} attempt(s): {e}")
+
+    finally:
+        close_old_connections()
@@ -18,6 +18,9 @@ from dotenv import load_dotenv
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Before any os.getenv() below, so every setting can come from .env
+load_dotenv(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -45,7 +48,6 @@ INSTALLED_APPS = [
     'corsheaders',
     'factchecks',
     'ai_factcheck',
-    'openai',
 ]
 
 MIDDLEWARE = [
@@ -128,6 +130,35 @@ STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Seconds an unreferenced content-addressed file is kept before `collect_media_garbage` deletes it
+# (see factchecks/storage.py); covers uploads written to disk whose model save hasn't committed yet
+MEDIA_GC_GRACE_PERIOD = int(os.getenv('MEDIA_GC_GRACE_PERIOD', 3600))
+# Media serving (see factchecks/media_views.py). Content-addressed files are cached for a year;
+# MEDIA_CACHE_MAX_AGE (seconds) applies to the rest. MEDIA_SENDFILE hands the bytes to the front
+# server: 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to
+# MEDIA_ROOT), 'x-sendfile' (Apache mod_xsendfile, lighttpd), or '' to stream them from Django
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', 3600))
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '').lower()
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Responsive derivatives of uploaded PositiveContent images, built by `run_image_worker` (see factchecks/images.py)
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 960, 1280, 1920]
+IMAGE_DERIVATIVE_FORMATS = ['avif', 'webp']  # Formats this Pillow build can't encode are skipped
+IMAGE_WEBP_QUALITY = int(os.getenv('IMAGE_WEBP_QUALITY', 80))
+IMAGE_AVIF_QUALITY = int(os.getenv('IMAGE_AVIF_QUALITY', 60))
+IMAGE_WORKER_CONCURRENCY = int(os.getenv('IMAGE_WORKER_CONCURRENCY', 2))
+
+# Local copies of external PositiveContent.image_url images, fetched and refreshed by `run_image_worker`
+# (see factchecks/remote_images.py). Intervals are in seconds; the origin's Cache-Control max-age is used
+# when it sends one, clamped to the min/max refresh intervals
+IMAGE_PROXY_TIMEOUT = float(os.getenv('IMAGE_PROXY_TIMEOUT', 10))
+IMAGE_PROXY_MAX_BYTES = int(os.getenv('IMAGE_PROXY_MAX_BYTES', 15 * 1024 * 1024))
+IMAGE_PROXY_REFRESH_INTERVAL = int(os.getenv('IMAGE_PROXY_REFRESH_INTERVAL', 24 * 3600))
+IMAGE_PROXY_MIN_REFRESH_INTERVAL = int(os.getenv('IMAGE_PROXY_MIN_REFRESH_INTERVAL', 3600))
+IMAGE_PROXY_MAX_REFRESH_INTERVAL = int(os.getenv('IMAGE_PROXY_MAX_REFRESH_INTERVAL', 7 * 24 * 3600))
+IMAGE_PROXY_RETRY_DELAY = int(os.getenv('IMAGE_PROXY_RETRY_DELAY', 300))  # Doubled after each consecutive failure
+# Fetching from private/loopback addresses lets anyone who can set image_url probe the internal network
+IMAGE_PROXY_ALLOW_PRIVATE_HOSTS = os.getenv('IMAGE_PROXY_ALLOW_PRIVATE_HOSTS', 'false').lower() == 'true'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -143,6 +174,31 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Caches. Set REDIS_URL in production so every worker process shares one cache
+# (response cache versions, AI rate limits and single-flight locks); the local-memory
+# default is per process.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Page size for the cursor-paginated list endpoints (see factchecks/pagination.py)
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 20))
+
+# Versioned response cache for the public read endpoints (see factchecks/caching.py).
+# Uses whichever backend is configured in CACHES under this alias; it's off while that
+# backend is local to each process (the local-memory default)
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 15))  # seconds, 0 disables body caching
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -166,5 +222,81 @@ CORS_ALLOWED_ORIGINS = [
      "https://ayitipamnan.onrender.com",
 ]
 
-load_dotenv(BASE_DIR / '.env')
+# Outgoing email (Django's SMTP backend by default). `run_notification_worker` sends submitter
+# notifications from the outbox over one connection per batch (see factchecks/notifications.py)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'false').lower() == 'true'
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 30))
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'AyitiPam <no-reply@ayitipamnan.onrender.com>')
+SITE_URL = os.getenv('SITE_URL', 'https://ayitipamnan.onrender.com')  # Linked from notification emails
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 50))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 5))
+NOTIFICATION_RETRY_BACKOFF = int(os.getenv('NOTIFICATION_RETRY_BACKOFF', 60))  # Seconds, doubled after each failed attempt
+NOTIFICATION_VISIBILITY_TIMEOUT = int(os.getenv('NOTIFICATION_VISIBILITY_TIMEOUT', 300))  # Seconds before a stuck batch is retried
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # Point at an OpenAI-compatible server (e.g. a local mock); None uses api.openai.com
+
+# AI provider backend (see ai_factcheck/providers). Use 'ai_factcheck.providers.local.LocalProvider'
+# to run the AI features offline, e.g. in CI or load tests
+AI_PROVIDER_BACKEND = os.getenv('AI_PROVIDER_BACKEND', 'ai_factcheck.providers.openai_provider.OpenAIProvider')
+AI_MODEL = os.getenv('AI_MODEL', 'gpt-4o')  # Model used by the OpenAI backend
+
+# Local backend: deterministic answers after AI_LOCAL_PROVIDER_LATENCY seconds (plus up to JITTER),
+# failing a share (FAILURE_RATE, 0-1) of the calls; SEED makes the injected delays and failures repeatable
+AI_LOCAL_PROVIDER_MODEL = os.getenv('AI_LOCAL_PROVIDER_MODEL', 'local')
+AI_LOCAL_PROVIDER_LATENCY = float(os.getenv('AI_LOCAL_PROVIDER_LATENCY', 0.5))
+AI_LOCAL_PROVIDER_JITTER = float(os.getenv('AI_LOCAL_PROVIDER_JITTER', 0))
+AI_LOCAL_PROVIDER_FAILURE_RATE = float(os.getenv('AI_LOCAL_PROVIDER_FAILURE_RATE', 0))
+AI_LOCAL_PROVIDER_TOKEN_DELAY = float(os.getenv('AI_LOCAL_PROVIDER_TOKEN_DELAY', 0))  # seconds between streamed chunks
+AI_LOCAL_PROVIDER_SEED = int(os.environ['AI_LOCAL_PROVIDER_SEED']) if os.getenv('AI_LOCAL_PROVIDER_SEED') else None
+
+# Shared AI provider client: timeouts, retries and circuit breaker (see ai_factcheck/client.py)
+AI_PROVIDER_TIMEOUT = float(os.getenv('AI_PROVIDER_TIMEOUT', 30))
+AI_PROVIDER_CONNECT_TIMEOUT = float(os.getenv('AI_PROVIDER_CONNECT_TIMEOUT', 5))
+AI_PROVIDER_MAX_RETRIES = int(os.getenv('AI_PROVIDER_MAX_RETRIES', 2))
+AI_PROVIDER_RETRY_BASE = float(os.getenv('AI_PROVIDER_RETRY_BASE', 0.5))  # seconds, doubled per retry (with full jitter)
+AI_PROVIDER_RETRY_MAX_DELAY = float(os.getenv('AI_PROVIDER_RETRY_MAX_DELAY', 8))
+AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('AI_CIRCUIT_FAILURE_THRESHOLD', 5))  # consecutive failures that open the breaker
+AI_CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv('AI_CIRCUIT_RECOVERY_TIMEOUT', 30))  # seconds before a probe call is let through
+
+# Background AI analysis jobs, drained by `python manage.py run_ai_worker` (see ai_factcheck/worker.py)
+AI_WORKER_CONCURRENCY = int(os.getenv('AI_WORKER_CONCURRENCY', 4))
+AI_JOB_MAX_ATTEMPTS = int(os.getenv('AI_JOB_MAX_ATTEMPTS', 3))
+AI_JOB_VISIBILITY_TIMEOUT = int(os.getenv('AI_JOB_VISIBILITY_TIMEOUT', 120))  # seconds a claimed job is hidden from other workers
+AI_JOB_RETRY_BACKOFF = int(os.getenv('AI_JOB_RETRY_BACKOFF', 10))  # seconds before the first retry, doubled each time
+
+# Batch AI analysis (see ai_factcheck.services.analyze_batch)
+AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', 8))  # Max provider calls in flight per batch
+AI_BATCH_MAX_SIZE = int(os.getenv('AI_BATCH_MAX_SIZE', 100))  # Max submissions per batch request
+
+# Answers reused for duplicate claims (see ai_factcheck/analysis_cache.py)
+AI_ANALYSIS_CACHE_TTL = int(os.getenv('AI_ANALYSIS_CACHE_TTL', 7 * 24 * 3600))  # seconds a cached answer is served
+
+# Similarity index of published fact-checks, used for AIAnalysis.similar_claims (see ai_factcheck/similarity.py)
+AI_SIMILARITY_INDEX_DIR = os.getenv('AI_SIMILARITY_INDEX_DIR', os.path.join(BASE_DIR, 'var', 'similarity_index'))
+TEST_RUNNER = 'backend.test_runner.TestRunner'  # Tests use a temporary AI_SIMILARITY_INDEX_DIR
+AI_SIMILARITY_DIMENSIONS = int(os.getenv('AI_SIMILARITY_DIMENSIONS', 2048))  # Changing this requires rebuild_similarity_index
+AI_SIMILARITY_TOP_K = int(os.getenv('AI_SIMILARITY_TOP_K', 5))
+AI_SIMILARITY_MIN_SCORE = float(os.getenv('AI_SIMILARITY_MIN_SCORE', 0.15))
+
+# Near-duplicate pre-screen: a claim whose text is this similar (estimated Jaccard of character
+# shingles, 0-1) to a published fact-check's title or summary gets that verdict without an AI call
+# (see ai_factcheck/near_duplicates.py)
+AI_NEAR_DUPLICATE_PRESCREEN = os.getenv('AI_NEAR_DUPLICATE_PRESCREEN', 'true').lower() == 'true'
+AI_NEAR_DUPLICATE_THRESHOLD = float(os.getenv('AI_NEAR_DUPLICATE_THRESHOLD', 0.7))
+
+# Limits on new AI analyses, as "count/period" (s, min, hour, day); empty disables a limit.
+# Kept in the shared cache (see ai_factcheck/concurrency.py)
+AI_RATE_LIMIT_CACHE_ALIAS = os.getenv('AI_RATE_LIMIT_CACHE_ALIAS', 'default')
+AI_RATE_LIMIT_USER = os.getenv('AI_RATE_LIMIT_USER', '10/min')
+AI_RATE_LIMIT_GLOBAL = os.getenv('AI_RATE_LIMIT_GLOBAL', '60/min')
+AI_SINGLE_FLIGHT_TIMEOUT = int(os.getenv('AI_SINGLE_FLIGHT_TIMEOUT', 120))  # seconds before an abandoned in-flight claim expires
+
+# Provider prices in USD per million tokens, used for AIAnalysis.cost_usd (see ai_factcheck/usage.py)
+AI_MODEL_PRICING = {
+    'gpt-4o': {'prompt': '2.50', 'completion': '10.00'},
+}
@@ -0,0 +1,25 @@
+# backend/test_runner.py
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Points AI_SIMILARITY_INDEX_DIR at a temporary directory for the whole run,
+    so fact-checks saved by any test (the index is updated on commit) never
+    touch the real index under var/.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.similarity_index_dir = tempfile.mkdtemp(prefix='similarity-index-')
+        self.similarity_index_override = override_settings(AI_SIMILARITY_INDEX_DIR=self.similarity_index_dir)
+        self.similarity_index_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.similarity_index_override.disable()
+        shutil.rmtree(self.similarity_index_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
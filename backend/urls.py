@@ -14,10 +14,12 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static 
+from factchecks.media_views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,5 +27,9 @@ urlpatterns = [
      path('', include('ai_factcheck.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Media is served in every environment (ETag, Range, optional X-Sendfile offload), unless
+# MEDIA_URL points at another host such as a CDN
+if not settings.MEDIA_URL.startswith(('http://', 'https://', '//')):
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', serve_media, name='media'),
+    ]
\ No newline at end of file
@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.safestring import mark_safe
-from .models import FactCheck,Submission,PositiveContent # Import our model
+from .models import FactCheck,Submission,PositiveContent,NotificationOutbox # Import our model
+from . import search
 # Register your models here.
 @admin.register(FactCheck)
 class FactCheckAdmin(admin.ModelAdmin):
@@ -14,6 +16,12 @@ class FactCheckAdmin(admin.ModelAdmin):
     # This adds a search box, allowing you to search by the 'title' field
     search_fields = ('title',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index (title and summary) instead of a LIKE '%term%' scan
+        if search_term and search.is_supported():
+            return queryset.filter(id__in=search.search_factchecks(search_term).values('id')), False
+        return super().get_search_results(request, queryset, search_term)
+
 
 
 
@@ -29,6 +37,7 @@ class SubmissionAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'status', 'date_submitted')
     list_filter = ('status', 'date_submitted')
     search_fields = ('claim_text', 'url_submitted', 'submitter_name')
+    raw_id_fields = ('submitter',)  # Avoid rendering every user in a select box
 
 
 
@@ -40,6 +49,7 @@ class PositiveContentAdmin(admin.ModelAdmin):
     list_editable = ('is_published',)  # Quick publish/unpublish from list view
     search_fields = ('title', 'description')
     readonly_fields = ('image_preview',)  # Make the preview read-only in detail view
+    list_select_related = ('remote_image',)  # Read by image_preview
     
     # Fields to display in the detail/edit form
     fieldsets = (
@@ -61,7 +71,15 @@ class PositiveContentAdmin(admin.ModelAdmin):
         Display a thumbnail preview of the image in the admin list view.
         """
         if obj.image:
-            return mark_safe(f'<img src="{obj.image.url}" style="width: 50px; height: 50px; object-fit: cover;" />')
+            # The narrowest resized copy when it's been built, rather than the full upload
+            webp = (obj.image_derivatives or {}).get('webp') or {}
+            url = default_storage.url(webp[min(webp, key=int)]) if webp else obj.image.url
+            return mark_safe(f'<img src="{url}" style="width: 50px; height: 50px; object-fit: cover;" />')
+        elif obj.remote_image and obj.remote_image.file and obj.remote_image.url == obj.image_url:
+            # Our downloaded copy of the external image (see factchecks/remote_images.py)
+            webp = obj.remote_image.derivatives.get('webp') or {}
+            url = default_storage.url(webp[min(webp, key=int)]) if webp else obj.remote_image.file.url
+            return mark_safe(f'<img src="{url}" style="width: 50px; height: 50px; object-fit: cover;" />')
         elif obj.image_url:
             return mark_safe(f'<img src="{obj.image_url}" style="width: 50px; height: 50px; object-fit: cover;" onerror="this.style.display=\'none\'" />')
         return "No image"
@@ -73,4 +91,13 @@ class PositiveContentAdmin(admin.ModelAdmin):
         form = super().get_form(request, obj, **kwargs)
         form.base_fields['image_url'].help_text = 'Optional: URL to an external image if you don\'t want to upload one'
         form.base_fields['source_url'].help_text = 'Optional: URL to the original source/article'
-        return form
\ No newline at end of file
+        return form
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'recipient', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind', 'created_at')
+    search_fields = ('recipient', 'subject')
+    raw_id_fields = ('submission',)
+    readonly_fields = ('created_at', 'sent_at', 'locked_by', 'locked_until')
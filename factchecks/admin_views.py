@@ -1,11 +1,14 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from django.contrib.auth.models import User
-from .models import FactCheck, Submission, PositiveContent
+from .models import FactCheck, Submission, PositiveContent, StatsRollup
 from .serializers import FactCheckSerializer, SubmissionSerializer, PositiveContentSerializer,AdminFactCheckSerializer,AdminSubmissionSerializer,AdminPositiveContentSerializer
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from .pagination import DateCreatedCursorPagination, SubmissionCursorPagination
+from .fieldsets import SparseFieldsetMixin
+from .notifications import queue_factcheck_notification
+from django.db import transaction
 
 
 @api_view(['POST'])
@@ -30,20 +33,16 @@ def create_factcheck_from_submission(request, submission_id):
     # Create the fact-check
     factcheck_serializer = AdminFactCheckSerializer(data=factcheck_data)
     if factcheck_serializer.is_valid():
-        factcheck = factcheck_serializer.save()
-        
-        # Update submission status to completed
-        submission.status = 'completed'
-        submission.user_notified = False  # Reset for new notification
-        submission.save()
-        
-        # Send notification
-        try:
-            # Reuse the notification method from earlier
-            from .admin_views import AdminSubmissionDetailView
-            AdminSubmissionDetailView()._send_notification_email(submission)
-        except Exception as e:
-            print(f"Notification failed: {e}")
+        # The notification is queued with the status change and sent by `run_notification_worker`
+        with transaction.atomic():
+            factcheck = factcheck_serializer.save()
+
+            # Update submission status to completed
+            submission.status = 'completed'
+            submission.user_notified = False  # Reset for new notification
+            submission.date_notified = None
+            submission.save()
+            queue_factcheck_notification(submission, factcheck)
         
         return Response({
             'message': 'Fact-check created successfully',
@@ -53,7 +52,7 @@ def create_factcheck_from_submission(request, submission_id):
     
     return Response(factcheck_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class AdminFactCheckListCreateView(generics.ListCreateAPIView):
+class AdminFactCheckListCreateView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     Admin view to list all fact-checks and create new ones.
     Only accessible by admin users.
@@ -61,6 +60,8 @@ class AdminFactCheckListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAdminUser]
     queryset = FactCheck.objects.all().order_by('-date_created')
     serializer_class = AdminFactCheckSerializer  # Use the enhanced serializer
+    pagination_class = DateCreatedCursorPagination
+    deferrable_fields = ('summary',)  # Skipped when ?fields=/?omit= leave it out
 
 class AdminFactCheckDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -71,14 +72,16 @@ class AdminFactCheckDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = FactCheck.objects.all()
     serializer_class = AdminFactCheckSerializer  # Use the enhanced serializer
 
-class AdminSubmissionListView(generics.ListAPIView):
+class AdminSubmissionListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Admin view to list all user submissions.
     Only accessible by admin users.
     """
     permission_classes = [IsAdminUser]
-    queryset = Submission.objects.all().order_by('-date_submitted')
+    queryset = Submission.objects.prefetch_related('fact_checks').order_by('-date_submitted')
     serializer_class = AdminSubmissionSerializer  # Use the enhanced serializer
+    pagination_class = SubmissionCursorPagination
+    deferrable_fields = ('claim_text', 'context')
 
 class AdminSubmissionDetailView(generics.RetrieveUpdateAPIView):
     """
@@ -86,19 +89,21 @@ class AdminSubmissionDetailView(generics.RetrieveUpdateAPIView):
     Only accessible by admin users.
     """
     permission_classes = [IsAdminUser]
-    queryset = Submission.objects.all()
+    queryset = Submission.objects.prefetch_related('fact_checks')
     serializer_class = AdminSubmissionSerializer  # Use the enhanced serializer
 
 
 
-class AdminPositiveContentListCreateView(generics.ListCreateAPIView):
+class AdminPositiveContentListCreateView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     Admin view to list all positive content and create new ones.
     Only accessible by admin users.
     """
     permission_classes = [IsAdminUser]
-    queryset = PositiveContent.objects.all().order_by('-date_created')
+    queryset = PositiveContent.objects.select_related('remote_image').order_by('-date_created')
     serializer_class = AdminPositiveContentSerializer
+    pagination_class = DateCreatedCursorPagination
+    deferrable_fields = ('description', 'image_derivatives')
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -111,7 +116,7 @@ class AdminPositiveContentDetailView(generics.RetrieveUpdateDestroyAPIView):
     Only accessible by admin users.
     """
     permission_classes = [IsAdminUser]
-    queryset = PositiveContent.objects.all()
+    queryset = PositiveContent.objects.select_related('remote_image')
     serializer_class = AdminPositiveContentSerializer
     
     def get_serializer_context(self):
@@ -127,13 +132,5 @@ class AdminStatsView(generics.GenericAPIView):
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        stats = {
-            'total_factchecks': FactCheck.objects.count(),
-            'total_submissions': Submission.objects.count(),
-            'pending_submissions': Submission.objects.filter(status='new').count(),
-            'total_positive_content': PositiveContent.objects.count(),
-            'published_positive_content': PositiveContent.objects.filter(is_published=True).count(),
-            'total_users': User.objects.count(),
-            'staff_users': User.objects.filter(is_staff=True).count(),
-        }
-        return Response(stats)
\ No newline at end of file
+        # Single-row read of the counters maintained by factchecks/signals.py
+        return Response(StatsRollup.load().as_dict())
\ No newline at end of file
@@ -0,0 +1,160 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# Backends whose entries only the current process sees
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_response_cache():
+    """
+    The cache backend used for response bodies and model versions.
+    Uses whatever backend is configured under settings.RESPONSE_CACHE_ALIAS.
+    """
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def response_cache_is_shared():
+    """
+    Whether every process sees the same model versions. A bump in one process
+    of a local-memory cache leaves the others serving old bodies and answering
+    304 to old ETags, so VersionedCacheMixin turns itself off on such a backend.
+    """
+    return settings.CACHES[settings.RESPONSE_CACHE_ALIAS]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_response_cache_shared(app_configs, **kwargs):
+    if response_cache_is_shared():
+        return []
+    return [checks.Warning(
+        f"The response cache ({settings.RESPONSE_CACHE_ALIAS!r}) is local to each process, so the public "
+        "list endpoints are served uncached.",
+        hint="Set REDIS_URL, or point RESPONSE_CACHE_ALIAS at a shared cache.",
+        id='factchecks.W001',
+    )]
+
+
+def _version_keys(model):
+    label = model._meta.label_lower
+    return f'response-cache:version:{label}', f'response-cache:modified:{label}'
+
+
+def get_model_versions(models):
+    """
+    Return ({model label: version}, last modified timestamp) for the given models.
+    Missing versions are seeded from the clock, so a cache flush can never
+    bring back a version number (and ETag) that clients have already seen.
+    """
+    cache = get_response_cache()
+    keys = [key for model in models for key in _version_keys(model)]
+    stored = cache.get_many(keys)
+
+    versions = {}
+    last_modified = 0
+    for model in models:
+        version_key, modified_key = _version_keys(model)
+        if version_key not in stored or modified_key not in stored:
+            now = time.time()
+            cache.add(version_key, time.time_ns(), timeout=None)
+            cache.add(modified_key, now, timeout=None)
+            stored[version_key] = cache.get(version_key, time.time_ns())
+            stored[modified_key] = cache.get(modified_key, now)
+        versions[model._meta.label_lower] = stored[version_key]
+        last_modified = max(last_modified, stored[modified_key])
+    return versions, last_modified
+
+
+def bump_model_version(model):
+    """
+    Invalidate every cached response that depends on this model.
+    Called from the save/delete signal handlers in factchecks/signals.py.
+    """
+    cache = get_response_cache()
+    version_key, modified_key = _version_keys(model)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.add(version_key, time.time_ns(), timeout=None)
+    cache.set(modified_key, time.time(), timeout=None)
+
+
+class VersionedCacheMixin:
+    """
+    Cache GET responses of a read-only view under the version of the models it reads.
+
+    Every response carries a strong ETag and a Last-Modified header. Revalidating
+    clients get a 304 without touching the database, and other requests are served
+    from the cache until one of `response_cache_models` is saved or deleted.
+    Set `response_cache_timeout = 0` on a view to keep the validators but skip
+    caching the body. Nothing is cached, and no validators are sent, unless the
+    cache is shared between processes (see response_cache_is_shared()).
+    """
+    response_cache_models = ()
+    response_cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def get(self, request, *args, **kwargs):
+        if not self.response_cache_models or not response_cache_is_shared():
+            return super().get(request, *args, **kwargs)
+
+        versions, last_modified = get_model_versions(self.response_cache_models)
+        etag = self.get_response_etag(request, versions)
+
+        if self._is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self._get_cached_response(request, etag, *args, **kwargs)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Let clients keep the body but revalidate it on every use
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def get_response_etag(self, request, versions):
+        """
+        Build a strong ETag from the model versions and everything else that changes the body.
+        """
+        parts = [
+            f'{type(self).__module__}.{type(self).__name__}',
+            request.build_absolute_uri(),  # Host (for absolute image URLs), path and query string
+            request.accepted_media_type or '',
+        ]
+        parts += [f'{label}={version}' for label, version in sorted(versions.items())]
+        digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def _is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+    def _get_cached_response(self, request, etag, *args, **kwargs):
+        if not self.response_cache_timeout:
+            return super().get(request, *args, **kwargs)
+
+        cache = get_response_cache()
+        cache_key = 'response-cache:body:' + etag.strip('"')
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, self.response_cache_timeout)
+        return response
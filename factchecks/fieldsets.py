@@ -0,0 +1,89 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _parse_field_list(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer side of sparse fieldsets: only renders the fields the view put in
+    context['sparse_fields'] (all fields when it's missing).
+
+    Method fields read model attributes the generic code can't see, so list the
+    columns they need in `method_field_sources` to keep them from being deferred.
+    """
+    method_field_sources = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('sparse_fields')
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+class SparseFieldsetMixin:
+    """
+    View side of sparse fieldsets: adds `?fields=a,b` and `?omit=c` to GET requests.
+
+    The selection trims the serializer output and also defers the view's
+    `deferrable_fields` (large text columns) that no selected field needs, so the
+    database never reads columns the client didn't ask for.
+    """
+    deferrable_fields = ()
+
+    def get_sparse_fields(self):
+        """
+        Names of the serializer fields to render, or None to render all of them.
+        """
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        requested = _parse_field_list(self.request.query_params.get('fields'))
+        omitted = _parse_field_list(self.request.query_params.get('omit'))
+        if not requested and not omitted:
+            return None
+
+        available = list(self.get_serializer_class()().fields)
+        unknown = (requested | omitted) - set(available)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+
+        self._sparse_fields = [
+            name for name in available
+            if (not requested or name in requested) and name not in omitted
+        ]
+        return self._sparse_fields
+
+    def get_deferred_columns(self):
+        """
+        The deferrable columns that none of the selected fields read.
+        """
+        selected = self.get_sparse_fields()
+        if selected is None:
+            return []
+
+        serializer = self.get_serializer_class()()
+        needed = set()
+        for name in selected:
+            field = serializer.fields[name]
+            if field.source == '*':
+                needed.update(serializer.method_field_sources.get(name, ()))
+            else:
+                needed.add(field.source.split('.')[0])
+        return [column for column in self.deferrable_fields if column not in needed]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        deferred = self.get_deferred_columns()
+        return queryset.defer(*deferred) if deferred else queryset
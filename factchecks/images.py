@@ -0,0 +1,134 @@
+# factchecks/images.py
+"""
+Responsive derivatives of uploaded PositiveContent images.
+
+Each upload is resized to the IMAGE_DERIVATIVE_WIDTHS narrower than the
+original (plus the original width, capped at the widest size) and encoded in
+every IMAGE_DERIVATIVE_FORMATS format this Pillow build supports. Files are
+stored under derivatives/<sha256 of the original>/, so identical uploads share
+one set and re-processing an image only writes what is missing.
+
+Saving an instance with a new image clears image_hash and image_derivatives
+(see signals.py); `python manage.py run_image_worker` then picks it up.
+`backfill_image_derivatives` processes the existing media.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps, features
+
+from .caching import bump_model_version
+from .models import PositiveContent
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+ENCODER_OPTIONS = {
+    'webp': lambda: {'quality': settings.IMAGE_WEBP_QUALITY, 'method': 4},
+    'avif': lambda: {'quality': settings.IMAGE_AVIF_QUALITY, 'speed': 6},
+}
+# Errors that mean the file itself is unusable (retrying won't help)
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def supported_formats():
+    """IMAGE_DERIVATIVE_FORMATS that this Pillow build can encode"""
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if fmt in ENCODER_OPTIONS and features.check(fmt)]
+
+
+def content_hash(file, chunk_size=64 * 1024):
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def target_widths(original_width):
+    """The derivative widths for an image: never upscaled, at most the widest configured width"""
+    widths = sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+    return [width for width in widths if width < original_width] + [min(original_width, widths[-1])]
+
+
+def derivative_name(image_hash, width, fmt):
+    return f"{DERIVATIVES_DIR}/{image_hash[:2]}/{image_hash}/{width}w.{fmt}"
+
+
+def _prepare(image):
+    """Apply the EXIF orientation and convert to a mode both encoders accept"""
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def build_derivatives(file):
+    """
+    Write the derivatives of an image file (missing ones only) and return the
+    image_derivatives map: {'hash', 'width', 'height', '<format>': {'<width>': storage name}}.
+    """
+    image_hash = content_hash(file)
+    with Image.open(file) as original:
+        image = _prepare(original)
+    result = {'hash': image_hash, 'width': image.width, 'height': image.height}
+    formats = supported_formats()
+
+    # Widest first, each size resized from the previous one: far cheaper than
+    # resizing the full-size original every time
+    current = image
+    for width in reversed(target_widths(image.width)):
+        if width != current.width:
+            current = current.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        for fmt in formats:
+            name = derivative_name(image_hash, width, fmt)
+            if not default_storage.exists(name):
+                buffer = BytesIO()
+                current.save(buffer, format=fmt.upper(), **ENCODER_OPTIONS[fmt]())
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            result.setdefault(fmt, {})[str(width)] = name
+    return result
+
+
+def pending_images():
+    """Content with an uploaded image that has no derivatives yet (and didn't fail)"""
+    return (
+        PositiveContent.objects
+        .exclude(Q(image='') | Q(image__isnull=True))
+        .filter(image_hash='')
+        .exclude(image_derivatives__has_key='error')
+    )
+
+
+def process_content(content_id):
+    """
+    Build the derivatives of one item's image and record them, unless the image
+    was replaced in the meantime (the new one is then still pending).
+    Returns True when derivatives were recorded.
+    """
+    content = PositiveContent.objects.only('id', 'image').filter(pk=content_id).first()
+    if content is None or not content.image:
+        return False
+    image_name = content.image.name
+    try:
+        with content.image.open('rb') as file:
+            derivatives = build_derivatives(file)
+    except IMAGE_ERRORS as e:
+        logger.warning(f"Could not build image derivatives for positive content {content_id} ({image_name}): {e}")
+        PositiveContent.objects.filter(pk=content_id, image=image_name).update(image_derivatives={'error': str(e)})
+        return False
+
+    updated = PositiveContent.objects.filter(pk=content_id, image=image_name).update(
+        image_hash=derivatives['hash'], image_derivatives=derivatives
+    )
+    if updated:
+        # A queryset update sends no signals; cached responses must pick up the new srcset
+        bump_model_version(PositiveContent)
+        logger.info(f"Built image derivatives for positive content {content_id} ({image_name})")
+    return bool(updated)
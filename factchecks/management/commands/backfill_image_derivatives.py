@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from factchecks.images import pending_images, process_content
+from factchecks.models import PositiveContent
+
+
+def process(content_id):
+    try:
+        return process_content(content_id)
+    finally:
+        close_old_connections()
+
+
+def stored_size(name):
+    try:
+        return default_storage.size(name)
+    except OSError:
+        return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the WebP/AVIF derivatives of existing positive content images "
+        "(those still pending, or all of them with --force)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Reprocess every image, including failed ones.")
+        parser.add_argument('--concurrency', type=int, default=settings.IMAGE_WORKER_CONCURRENCY)
+
+    def handle(self, *args, **options):
+        if options['force']:
+            # Derivative files are keyed by content hash, so existing ones are reused
+            PositiveContent.objects.exclude(image='').exclude(image__isnull=True).update(
+                image_hash='', image_derivatives={}
+            )
+        content_ids = list(pending_images().order_by('id').values_list('id', flat=True))
+        self.stdout.write(f"Processing {len(content_ids)} image(s)...")
+
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='image-backfill') as pool:
+            results = list(pool.map(process, content_ids))
+
+        original_bytes = derivative_bytes = 0
+        for content in PositiveContent.objects.filter(id__in=content_ids, image_hash__gt=''):
+            original_bytes += stored_size(content.image.name)
+            widest = max(content.image_derivatives.get('webp', {}).items(), key=lambda item: int(item[0]), default=None)
+            if widest:
+                derivative_bytes += stored_size(widest[1])
+
+        failed = len(results) - sum(results)
+        self.stdout.write(self.style.SUCCESS(f"Built derivatives for {sum(results)} image(s), {failed} failed."))
+        if original_bytes:
+            self.stdout.write(
+                f"Originals: {original_bytes / 1024:.0f} KiB; widest WebP derivatives: {derivative_bytes / 1024:.0f} KiB "
+                f"({derivative_bytes / original_bytes:.0%} of the originals)."
+            )
@@ -0,0 +1,155 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+from factchecks.models import FactCheck, Submission, PositiveContent
+from factchecks.search import search_factchecks
+from ai_factcheck.models import AIAnalysis
+
+# Depths (rows from the newest) and user percentiles (by submission count) timed by --scaling
+SCALING_DEPTHS = (0, 1_000, 10_000, 100_000, 1_000_000)
+SCALING_PERCENTILES = (0, 50, 90, 99, 100)
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN output and timings for the queries behind each list endpoint. "
+        "Seed data first with seed_benchmark_data. To compare before/after the list "
+        "indexes, also run it on a copy of the database with those indexes dropped "
+        "(migrating back would drop newer columns the queries read too). --scaling also shows how page latency changes with "
+        "the page depth and with a user's submission count (seed with --user-skew for a "
+        "wide spread of counts)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--depth', type=int, default=100_000, help="Row offset used for the 'deep page' queries.")
+        parser.add_argument('--search', default='election hurricane', help="Search text for the full-text benchmark.")
+        parser.add_argument('--no-explain', action='store_true')
+        parser.add_argument('--scaling', action='store_true', help="Also time pages by depth and by user size.")
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.explain = not options['no_explain']
+        page = settings.API_PAGE_SIZE + 1  # Cursor pagination fetches one extra row
+        depth = options['depth']
+
+        submission = Submission.objects.exclude(submitter=None).order_by('-id').first()
+        if submission is None:
+            raise CommandError("No data to benchmark; run seed_benchmark_data first.")
+        user = submission.submitter
+
+        factcheck_cursor = self.value_at(FactCheck.objects.order_by('-date_created', '-id'), 'date_created', depth)
+        submission_cursor = self.value_at(Submission.objects.order_by('-date_submitted', '-id'), 'date_submitted', depth)
+        content_cursor = self.value_at(PositiveContent.objects.order_by('-date_created', '-id'), 'date_created', depth)
+
+        benchmarks = [
+            ("factcheck-list, first page", lambda: FactCheck.objects.order_by('-date_created', '-id')[:page]),
+            ("factcheck-list, deep page", lambda: FactCheck.objects.filter(
+                date_created__lt=factcheck_cursor).order_by('-date_created', '-id')[:page]),
+            ("admin-submission-list, first page", lambda: Submission.objects.order_by('-date_submitted', '-id')[:page]),
+            ("admin-submission-list, deep page", lambda: Submission.objects.filter(
+                date_submitted__lt=submission_cursor).order_by('-date_submitted', '-id')[:page]),
+            ("admin-submission-list, status filter", lambda: Submission.objects.filter(
+                status='new').order_by('-date_submitted')[:page]),
+            ("user-submissions", lambda: Submission.objects.for_user(user).with_related_factcheck()
+                .order_by('-date_submitted')[:page]),
+            ("user-dashboard stats", lambda: Submission.objects.for_user(user).values('submitter').annotate(
+                total=Count('id', distinct=True),
+                completed=Count('id', filter=Q(status='completed'), distinct=True),
+                published=Count('fact_checks', distinct=True),
+            )),
+            ("positive-content (public)", lambda: PositiveContent.objects.filter(
+                is_published=True).order_by('-date_created')),
+            ("admin-positive-content-list, first page", lambda: PositiveContent.objects.order_by('-date_created', '-id')[:page]),
+            ("admin-positive-content-list, deep page", lambda: PositiveContent.objects.filter(
+                date_created__lt=content_cursor).order_by('-date_created', '-id')[:page]),
+            ("ai-analysis, latest for submission", lambda: AIAnalysis.objects.filter(
+                submission=submission).order_by('-created_at')[:1]),
+            ("factcheck-search, full-text", lambda: search_factchecks(options['search'])[:page]),
+            ("factcheck-search, icontains baseline", lambda: FactCheck.objects.filter(
+                Q(title__icontains=options['search']) | Q(summary__icontains=options['search'])
+            ).order_by('-date_created', '-id')[:page]),
+        ]
+
+        self.stdout.write(f"Database: {connection.vendor}, {self.repeat} runs per query\n")
+        for name, build in benchmarks:
+            self.run(name, build)
+        if options['scaling']:
+            self.run_depth_scaling(page)
+            self.run_user_scaling()
+
+    def value_at(self, queryset, field, offset):
+        """
+        The ordering value `offset` rows deep, i.e. the position a cursor would encode.
+        Falls back to the last row on tables smaller than the offset.
+        """
+        values = queryset.values_list(field, flat=True)
+        row = values[offset:offset + 1]
+        return row[0] if row else values.last()
+
+    def time(self, build):
+        """Sorted timings in ms of `repeat` evaluations of the queryset"""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def run(self, name, build):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        if self.explain:
+            self.stdout.write(build().explain())
+
+        timings = self.time(build)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"  min {timings[0]:.2f} ms, median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms\n"
+        )
+
+    def run_depth_scaling(self, page):
+        """admin-submission-list pages at growing depths, by cursor and by OFFSET"""
+        self.stdout.write(self.style.MIGRATE_HEADING("admin-submission-list page by depth (median ms)"))
+        ordered = Submission.objects.order_by('-date_submitted', '-id')
+        total = ordered.count()
+        for depth in SCALING_DEPTHS:
+            if depth >= total:
+                break
+            cursor = self.value_at(ordered, 'date_submitted', depth)
+            by_cursor = self.time(lambda: ordered.filter(date_submitted__lt=cursor)[:page])
+            by_offset = self.time(lambda: ordered[depth:depth + page])
+            self.stdout.write(
+                f"  depth {depth:>9,}: cursor {statistics.median(by_cursor):7.2f}, "
+                f"offset {statistics.median(by_offset):7.2f}"
+            )
+        self.stdout.write('')
+
+    def run_user_scaling(self):
+        """user-submissions and the dashboard's recent list for users with more and more submissions"""
+        self.stdout.write(self.style.MIGRATE_HEADING("user-submissions by the user's submission count (median ms)"))
+        counts = list(
+            User.objects.annotate(submission_count=Count('submissions')).filter(submission_count__gt=0)
+            .order_by('submission_count').values_list('id', 'submission_count')
+        )
+        if not counts:
+            self.stdout.write("  No submissions with a submitter.\n")
+            return
+        picked = dict(counts[min(len(counts) - 1, len(counts) * percentile // 100)] for percentile in SCALING_PERCENTILES)
+        for user_id, submission_count in sorted(picked.items(), key=lambda item: item[1]):
+            submissions = Submission.objects.filter(submitter_id=user_id).with_related_factcheck().order_by('-date_submitted')
+            with CaptureQueriesContext(connection) as queries:
+                list(submissions.all())
+            whole_list = statistics.median(self.time(submissions.all))
+            recent = statistics.median(self.time(lambda: submissions[:5]))
+            self.stdout.write(
+                f"  {submission_count:>6,} submissions: list {whole_list:7.2f} "
+                f"({whole_list * 1000 / submission_count:5.1f} us/row, {len(queries)} query), "
+                f"dashboard recent {recent:5.2f}"
+            )
+        self.stdout.write('')
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from factchecks import storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed media files (and their image derivatives) that no "
+        "row has referenced for the grace period. Run it periodically, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int, default=settings.MEDIA_GC_GRACE_PERIOD,
+            help="Seconds a file must have been unreferenced before it's deleted.",
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help="Recompute the reference counts from the database first (after restoring a backup, say).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f"Fixed the reference count of {storage.recount_references()} file(s).")
+
+        deleted, freed = storage.collect_garbage(options['grace_period'], dry_run=options['dry_run'])
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced file(s), {freed / 1024:.0f} KiB."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from factchecks import search
+
+
+class Command(BaseCommand):
+    help = "Re-create the fact-check full-text search table and triggers, and re-index every row."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Full-text search needs SQLite with FTS5; other databases use the icontains fallback.")
+
+        # Dropping first also repairs an index left stale by a table rebuild that dropped the triggers
+        with transaction.atomic(), connection.cursor() as cursor:
+            search.drop_search_index(cursor)
+            search.create_search_index(cursor)
+
+        self.stdout.write(self.style.SUCCESS("Rebuilt the fact-check search index."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from factchecks.models import StatsRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the admin stats rollup from full-table counts and report any drift. "
+        "Run it periodically: queryset updates and bulk inserts send no signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report drift, don't rewrite the rollup. Exits with an error if drift is found.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Lock the row so signal updates can't interleave with the recount
+            rollup = StatsRollup.objects.select_for_update().get(pk=StatsRollup.load().pk)
+            expected = StatsRollup.compute_counts()
+
+            drift = {
+                field: (getattr(rollup, field), value)
+                for field, value in expected.items()
+                if getattr(rollup, field) != value
+            }
+            for field, (stored, actual) in drift.items():
+                self.stdout.write(f"{field}: rollup={stored} actual={actual} (drift {stored - actual:+d})")
+
+            if options['check']:
+                if drift:
+                    raise CommandError(f"Stats rollup has drifted on {len(drift)} counter(s).")
+                self.stdout.write(self.style.SUCCESS("Stats rollup is in sync."))
+                return
+
+            StatsRollup.objects.filter(pk=rollup.pk).update(**expected)
+
+        if drift:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt stats rollup, fixed {len(drift)} counter(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Rebuilt stats rollup, no drift found."))
@@ -0,0 +1,44 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Sum
+from django.utils import timezone
+from factchecks import remote_images
+from factchecks.models import CachedRemoteImage
+
+
+def refresh(image_id):
+    try:
+        return remote_images.refresh(image_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Download local copies of external positive content images that don't have one yet, "
+        "and re-validate the copies that are due (or all of them with --all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-validate every cached image, not only the due ones.")
+        parser.add_argument('--concurrency', type=int, default=settings.IMAGE_WORKER_CONCURRENCY)
+
+    def handle(self, *args, **options):
+        linked = remote_images.link_pending()
+        if options['all']:
+            CachedRemoteImage.objects.update(next_check_at=timezone.now())
+        image_ids = list(remote_images.due_images().order_by('next_check_at').values_list('id', flat=True))
+        self.stdout.write(f"Linked {linked} item(s); checking {len(image_ids)} image(s)...")
+
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='remote-images') as pool:
+            results = Counter(pool.map(refresh, image_ids))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['updated']} downloaded, {results['not_modified']} not modified, {results['failed']} failed."
+        ))
+        cached = CachedRemoteImage.objects.exclude(file='').aggregate(size=Sum('size'))['size']
+        if cached:
+            self.stdout.write(f"Cached originals: {cached / 1024:.0f} KiB.")
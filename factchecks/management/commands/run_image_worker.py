@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from factchecks import remote_images
+from factchecks.images import pending_images, process_content
+
+
+def process(content_id):
+    try:
+        return process_content(content_id)
+    finally:
+        close_old_connections()
+
+
+def refresh(image_id):
+    try:
+        return remote_images.refresh(image_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the WebP/AVIF derivatives of newly uploaded positive content images, "
+        "and download and re-validate local copies of external images."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.IMAGE_WORKER_CONCURRENCY,
+            help="Number of images processed in parallel.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=5.0,
+            help="Seconds to wait before polling again when nothing is pending.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit as soon as nothing is pending instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        self.stdout.write(f"Image worker started with {concurrency} thread(s).")
+
+        processed = 0
+        running = {}  # future -> ('upload', content id) or ('remote', cached image id)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='image-worker') as pool:
+            try:
+                while True:
+                    free = concurrency - len(running)
+                    if free:
+                        remote_images.link_pending(limit=100)
+                        busy = {kind: [key for k, key in running.values() if k == kind] for kind in ('upload', 'remote')}
+                        pending = pending_images().exclude(id__in=busy['upload']).order_by('id')
+                        for content_id in pending.values_list('id', flat=True)[:free]:
+                            running[pool.submit(process, content_id)] = ('upload', content_id)
+                        free = concurrency - len(running)
+                        due = remote_images.due_images().exclude(id__in=busy['remote']).order_by('next_check_at')
+                        for image_id in due.values_list('id', flat=True)[:free]:
+                            running[pool.submit(refresh, image_id)] = ('remote', image_id)
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+                    processed += len(done)
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running images to finish...")
+
+        processed += len(running)
+        self.stdout.write(self.style.SUCCESS(f"Image worker stopped after {processed} image(s)."))
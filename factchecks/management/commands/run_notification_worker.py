@@ -0,0 +1,45 @@
+import os
+import socket
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from factchecks.notifications import claim_batch, send_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued submitter notification emails in batches, one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.NOTIFICATION_BATCH_SIZE,
+            help="Emails sent over one SMTP connection.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=5.0,
+            help="Seconds to wait before polling again when the outbox is empty.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit as soon as nothing is due instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Notification worker {worker_id} started.")
+
+        sent = failed = 0
+        try:
+            while True:
+                batch = claim_batch(worker_id, options['batch_size'])
+                if not batch:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                batch_sent, batch_failed = send_batch(batch)
+                sent += batch_sent
+                failed += batch_failed
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping...")
+
+        self.stdout.write(self.style.SUCCESS(f"Notification worker stopped: {sent} sent, {failed} failed."))
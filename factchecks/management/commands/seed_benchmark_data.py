@@ -0,0 +1,137 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from factchecks.caching import bump_model_version
+from factchecks.models import FactCheck, Submission, PositiveContent, StatsRollup
+
+WORDS = (
+    "Haiti Port-au-Prince Cap-Haitien Jacmel election government president minister "
+    "hurricane earthquake cholera vaccine school market price fuel gourde dollar "
+    "police gang road bridge hospital water electricity report video photo rumor "
+    "claim official statement aid donation border Dominican Republic parliament"
+).split()
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Temporarily turn off auto_now_add so seeded rows keep the dates we generate.
+    """
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a large synthetic dataset for benchmarking the list endpoints. "
+        "Rows are inserted with bulk_create in batches; the stats rollup and "
+        "response cache versions are refreshed at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factchecks', type=int, default=1_000_000)
+        parser.add_argument('--submissions', type=int, default=2_000_000)
+        parser.add_argument('--positive-content', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--days', type=int, default=3 * 365, help="Spread the row dates over this many days.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--user-skew', type=float, default=1.0,
+            help="Above 1, a few users get most submissions (1 spreads them evenly).",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+        self.batch_size = options['batch_size']
+        self.user_skew = options['user_skew']
+
+        user_ids = self.seed_users(options['users'])
+        submission_ids = self.seed_submissions(options['submissions'], user_ids)
+        self.seed_factchecks(options['factchecks'], submission_ids)
+        self.seed_positive_content(options['positive_content'])
+
+        # bulk_create skips the signal handlers, so refresh the derived data once
+        StatsRollup.objects.update_or_create(pk=StatsRollup.SINGLETON_PK, defaults=StatsRollup.compute_counts())
+        bump_model_version(FactCheck)
+        bump_model_version(PositiveContent)
+        self.stdout.write(self.style.SUCCESS("Seeding complete."))
+
+    def random_date(self):
+        return self.now - timedelta(seconds=self.rng.random() * self.span)
+
+    def pick_user(self, user_ids):
+        if not user_ids:
+            return None
+        return user_ids[int(len(user_ids) * self.rng.random() ** self.user_skew)]
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def insert(self, model, total, build):
+        """
+        Insert `total` rows built by `build(index)` in batches, one transaction per batch.
+        """
+        done = 0
+        while done < total:
+            count = min(self.batch_size, total - done)
+            with transaction.atomic():
+                model.objects.bulk_create([build(done + i) for i in range(count)], batch_size=self.batch_size)
+            done += count
+            self.stdout.write(f"  {model.__name__}: {done}/{total}", ending='\r')
+        self.stdout.write(f"  {model.__name__}: {total} rows")
+
+    def seed_users(self, total):
+        start = User.objects.count()
+        self.insert(User, total, lambda i: User(
+            username=f'bench_user_{start + i}',
+            email=f'bench_user_{start + i}@example.com',
+            password='!',  # Unusable password
+            date_joined=self.random_date(),
+        ))
+        return list(User.objects.filter(username__startswith='bench_user_').values_list('id', flat=True))
+
+    def seed_submissions(self, total, user_ids):
+        with explicit_dates(Submission._meta.get_field('date_submitted')):
+            self.insert(Submission, total, lambda i: Submission(
+                submitter_id=self.pick_user(user_ids),
+                claim_text=self.sentence(40),
+                context=self.sentence(20),
+                status=self.rng.choice(('new', 'in_review', 'completed')),
+                date_submitted=self.random_date(),
+            ))
+        return list(Submission.objects.values_list('id', flat=True)[:total])
+
+    def seed_factchecks(self, total, submission_ids):
+        verdicts = [choice for choice, _ in FactCheck.VERDICT_CHOICES]
+        with explicit_dates(FactCheck._meta.get_field('date_created')):
+            self.insert(FactCheck, total, lambda i: FactCheck(
+                title=self.sentence(8)[:200],
+                submission_id=self.rng.choice(submission_ids) if submission_ids and self.rng.random() < 0.5 else None,
+                verdict=self.rng.choice(verdicts),
+                summary=self.sentence(120),
+                date_created=self.random_date(),
+            ))
+
+    def seed_positive_content(self, total):
+        content_types = [choice for choice, _ in PositiveContent.CONTENT_TYPES]
+        with explicit_dates(PositiveContent._meta.get_field('date_created')):
+            self.insert(PositiveContent, total, lambda i: PositiveContent(
+                title=self.sentence(6)[:200],
+                content_type=self.rng.choice(content_types),
+                description=self.sentence(150),
+                is_published=self.rng.random() < 0.9,
+                date_created=self.random_date(),
+            ))
@@ -0,0 +1,155 @@
+# factchecks/media_views.py
+"""
+Production serving of user media (MEDIA_ROOT under MEDIA_URL).
+
+django.views.static.serve is meant for development: no validators, no range
+support. serve_media sends a strong ETag and Last-Modified, answers
+conditional requests with 304 (or 412), honors single Range requests (with
+If-Range), and marks content-addressed files (see storage.py and images.py:
+their path holds the sha256 of the content, so it never changes) as
+immutable for a year.
+
+With MEDIA_SENDFILE set, the response only carries headers plus X-Sendfile
+(Apache mod_xsendfile, lighttpd) or X-Accel-Redirect (nginx, an `internal`
+location aliased to MEDIA_ROOT at MEDIA_ACCEL_REDIRECT_PREFIX), and the front
+server sends the bytes and handles Range itself, so no worker thread copies
+file data.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .images import MIME_TYPES
+
+HASHED_NAME_RE = re.compile(r'(?:^|/)([0-9a-f]{64})(?:[./]|$)')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, or None to send the
+    whole file (no header, several ranges or a syntax we ignore).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    match = RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:  # bytes=-N: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _file_chunks(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _if_range_passes(request, etag, last_modified):
+    """Whether a Range may be applied: no If-Range, or it names the current version"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # A strong comparison: weak validators never match
+        return not if_range.startswith('W/') and parse_etags(if_range) == [etag]
+    return parse_http_date_safe(if_range) == last_modified
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT (see the module docstring)"""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    # Dotfiles include storage's in-flight uploads and files being garbage-collected
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404("Not found")
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    hashed = HASHED_NAME_RE.search(path)
+    # The content hash when the name has one; otherwise mtime and size, as front servers do
+    etag = f'"{hashed.group(1)}"' if hashed else f'"{stat.st_mtime_ns:x}-{size:x}"'
+    content_type = mimetypes.guess_type(full_path)[0] or MIME_TYPES.get(
+        os.path.splitext(full_path)[1].lstrip('.').lower(), 'application/octet-stream'
+    )
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if hashed else f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+        'Accept-Ranges': 'bytes',
+        'X-Content-Type-Options': 'nosniff',
+    }
+    # get_conditional_response copies these validators onto its 304
+    base = HttpResponse(headers=headers)
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified, response=base)
+    if conditional is not base:
+        return conditional
+
+    if settings.MEDIA_SENDFILE:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path)
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range and not _if_range_passes(request, etag, last_modified):
+        byte_range = None
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, headers=headers)
+    else:
+        response = StreamingHttpResponse(_file_chunks(full_path, start, length), content_type=content_type, headers=headers)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    return response
@@ -0,0 +1,56 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations
+
+# Rows are updated in primary-key batches so the backfill never holds a long lock
+BATCH_SIZE = 1000
+
+
+def backfill_submitter(apps, schema_editor):
+    """
+    Link existing submissions to their user by matching the normalized
+    (trimmed, lower-cased) submitter email.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Submission = apps.get_model('factchecks', 'Submission')
+
+    # If several accounts share an email (only possible with different casing), keep the oldest one
+    user_ids_by_email = {}
+    for user_id, email in User.objects.exclude(email='').order_by('id').values_list('id', 'email').iterator():
+        user_ids_by_email.setdefault(email.strip().lower(), user_id)
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Submission.objects.filter(pk__gt=last_pk, submitter__isnull=True)
+            .exclude(submitter_email='')
+            .order_by('pk')
+            .values_list('pk', 'submitter_email')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        pks_by_user = defaultdict(list)
+        for pk, email in batch:
+            user_id = user_ids_by_email.get(email.strip().lower())
+            if user_id:
+                pks_by_user[user_id].append(pk)
+
+        for user_id, pks in pks_by_user.items():
+            Submission.objects.filter(pk__in=pks).update(submitter_id=user_id)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own instead of one transaction over the whole table
+    atomic = False
+
+    dependencies = [
+        ('factchecks', '0008_submission_submitter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_submitter, migrations.RunPython.noop),
+    ]
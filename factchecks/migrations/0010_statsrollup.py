@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_rollup(apps, schema_editor):
+    """
+    Create the single rollup row from a full count of the existing tables.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    FactCheck = apps.get_model('factchecks', 'FactCheck')
+    Submission = apps.get_model('factchecks', 'Submission')
+    PositiveContent = apps.get_model('factchecks', 'PositiveContent')
+    StatsRollup = apps.get_model('factchecks', 'StatsRollup')
+    StatsRollup.objects.create(
+        pk=1,
+        total_factchecks=FactCheck.objects.count(),
+        total_submissions=Submission.objects.count(),
+        pending_submissions=Submission.objects.filter(status='new').count(),
+        total_positive_content=PositiveContent.objects.count(),
+        published_positive_content=PositiveContent.objects.filter(is_published=True).count(),
+        total_users=User.objects.count(),
+        staff_users=User.objects.filter(is_staff=True).count(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factchecks', '0009_backfill_submission_submitter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_factchecks', models.IntegerField(default=0)),
+                ('total_submissions', models.IntegerField(default=0)),
+                ('pending_submissions', models.IntegerField(default=0)),
+                ('total_positive_content', models.IntegerField(default=0)),
+                ('published_positive_content', models.IntegerField(default=0)),
+                ('total_users', models.IntegerField(default=0)),
+                ('staff_users', models.IntegerField(default=0)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# The SQL is copied from factchecks/search.py as it was when this migration was
+# written, so later changes to that module can't change what this migration does.
+FTS_TABLE = 'factchecks_factcheck_fts'
+
+CREATE_INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, summary,
+        content='factchecks_factcheck', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON factchecks_factcheck BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON factchecks_factcheck BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, summary ON factchecks_factcheck BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    # Index the rows that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_INDEX_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite-specific; other databases use the icontains fallback in factchecks/search.py
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factchecks', '0010_statsrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_INDEX_SQL), run(DROP_INDEX_SQL)),
+    ]
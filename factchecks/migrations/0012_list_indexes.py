@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factchecks', '0011_factcheck_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factcheck',
+            index=models.Index(fields=['date_created', 'id'], name='factcheck_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='positivecontent',
+            index=models.Index(fields=['date_created', 'id'], name='positive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='positivecontent',
+            index=models.Index(fields=['is_published', 'date_created'], name='positive_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['date_submitted', 'id'], name='submission_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['status', 'date_submitted'], name='submission_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['submitter', 'date_submitted'], name='submission_submitter_idx'),
+        ),
+    ]
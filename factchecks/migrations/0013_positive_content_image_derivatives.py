@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factchecks', '0012_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='positivecontent',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='positivecontent',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
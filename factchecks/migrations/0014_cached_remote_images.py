@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factchecks', '0013_positive_content_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedRemoteImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('file', models.FileField(blank=True, max_length=255, upload_to='')),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('derivatives', models.JSONField(blank=True, default=dict)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('checked_at', models.DateTimeField(blank=True, null=True)),
+                ('next_check_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='positivecontent',
+            name='remote_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='factchecks.cachedremoteimage'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:23
+
+import django.utils.timezone
+import factchecks.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factchecks', '0014_cached_remote_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('touched_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='cachedremoteimage',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, storage=factchecks.storage.ContentAddressedStorage(), upload_to='remote/'),
+        ),
+        migrations.AlterField(
+            model_name='positivecontent',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=factchecks.storage.ContentAddressedStorage(), upload_to='positive_content/'),
+        ),
+    ]
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
 
 # Create your models here.
 
@@ -34,6 +39,12 @@ class FactCheck(models.Model):
     # Database fields to automatically track when a record is created or updated
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first cursor pagination (FactCheckListView, AdminFactCheckListCreateView)
+            models.Index(fields=['date_created', 'id'], name='factcheck_created_idx'),
+        ]
     
     # This will make it easier to identify objects in the Django admin later
     def __str__(self):
@@ -43,7 +54,38 @@ class FactCheck(models.Model):
 
 
 # factchecks/models.py
+class SubmissionQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """
+        Submissions owned by the given user (uses the indexed submitter foreign key).
+        """
+        return self.filter(submitter=user)
+
+    def with_related_factcheck(self):
+        """
+        Annotate each submission with its first related fact-check in the same query,
+        so serializers can read the values instead of querying once per row.
+        """
+        fact_checks = FactCheck.objects.filter(submission=models.OuterRef('pk')).order_by('pk')
+        return self.annotate(
+            has_related_factcheck=models.Exists(fact_checks),
+            related_factcheck_id=models.Subquery(fact_checks.values('id')[:1]),
+            related_factcheck_title=models.Subquery(fact_checks.values('title')[:1]),
+        )
+
+
 class Submission(models.Model):
+    # The logged-in user who submitted the claim. Not indexed on its own: the
+    # submission_submitter_idx index leads on it and serves every lookup by submitter
+    submitter = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='submissions',
+        db_index=False,
+    )
+
     # Database field for the user's name (optional)
     submitter_name = models.CharField(max_length=100, blank=True)
     
@@ -74,6 +116,18 @@ class Submission(models.Model):
     user_notified = models.BooleanField(default=False)
     date_notified = models.DateTimeField(blank=True, null=True)
 
+    objects = SubmissionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Newest-first cursor pagination (AdminSubmissionListView)
+            models.Index(fields=['date_submitted', 'id'], name='submission_submitted_idx'),
+            # Status filters, newest first (pending counts, status-filtered admin work)
+            models.Index(fields=['status', 'date_submitted'], name='submission_status_idx'),
+            # A user's own submissions, newest first (user dashboard and submission list)
+            models.Index(fields=['submitter', 'date_submitted'], name='submission_submitter_idx'),
+        ]
+
     # String representation for the admin panel
     def __str__(self):
         source = self.url_submitted if self.url_submitted else self.claim_text[:50] + "..."
@@ -85,6 +139,47 @@ class Submission(models.Model):
 
 
 
+class NotificationOutbox(models.Model):
+    """
+    An email to a submitter, written in the same transaction as the change it
+    reports, so it's sent if and only if that change commits. Drained in
+    batches by `python manage.py run_notification_worker` (see factchecks/notifications.py).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    KIND_CHOICES = [
+        ('factcheck_completed', 'Fact-check completed'),
+    ]
+
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)  # Not picked up before this time (retry backoff)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Visibility timeout of a batch being sent
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker looks for queued emails that are due, or batches whose lock expired
+            models.Index(fields=['status', 'run_after'], name='outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.recipient} ({self.status})"
+
+
 class PositiveContent(models.Model):
     # Database field for the title of the positive story
     title = models.CharField(max_length=200)
@@ -102,10 +197,22 @@ class PositiveContent(models.Model):
     # Database field for the main content
     description = models.TextField()
 
-    image = models.ImageField(upload_to='positive_content/', blank=True, null=True)
+    # Stored once per distinct content, whatever the upload's name (see factchecks/storage.py)
+    image = models.ImageField(upload_to='positive_content/', storage=ContentAddressedStorage(), blank=True, null=True)
+
+    # Resized WebP/AVIF copies of the uploaded image, built by `run_image_worker` (see factchecks/images.py).
+    # Both are cleared when a new image is saved; a blank hash means the derivatives are pending
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)  # sha256 of the uploaded file
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     # Database field for an optional image URL
     image_url = models.URLField(max_length=500, blank=True)
+
+    # Our cached copy of image_url, set by `run_image_worker` (see factchecks/remote_images.py);
+    # cleared when image_url changes
+    remote_image = models.ForeignKey(
+        'CachedRemoteImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
     
     # Database field for an optional source URL
     source_url = models.URLField(max_length=500, blank=True)
@@ -116,6 +223,118 @@ class PositiveContent(models.Model):
     
     # Field to control visibility/publishing
     is_published = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first cursor pagination (AdminPositiveContentListCreateView)
+            models.Index(fields=['date_created', 'id'], name='positive_created_idx'),
+            # Published content for the public PositiveContentView
+            models.Index(fields=['is_published', 'date_created'], name='positive_published_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.title} ({self.get_content_type_display()})"
\ No newline at end of file
+        return f"{self.title} ({self.get_content_type_display()})"
+
+
+
+class CachedRemoteImage(models.Model):
+    """
+    A downloaded copy of an external image (PositiveContent.image_url), stored
+    content-addressed with the same derivatives as uploads and re-validated with
+    conditional GETs (see factchecks/remote_images.py).
+    """
+    url = models.URLField(max_length=500, unique=True)
+    # remote/<sha256>.<ext>; blank until the first download
+    file = models.FileField(upload_to='remote/', storage=ContentAddressedStorage(), max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveIntegerField(default=0)
+    derivatives = models.JSONField(default=dict, blank=True)  # Same shape as PositiveContent.image_derivatives
+    # Validators from the last 200 response, sent back as If-None-Match / If-Modified-Since
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)  # Last time the content was downloaded
+    checked_at = models.DateTimeField(null=True, blank=True)  # Last request, including 304s and failures
+    next_check_at = models.DateTimeField(default=timezone.now, db_index=True)
+    failures = models.PositiveIntegerField(default=0)  # Consecutive failed requests
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.url
+
+
+class StoredBlob(models.Model):
+    """
+    A file in content-addressed media storage (see factchecks/storage.py), shared
+    by every row that stores the same content. ref_count is the number of rows
+    whose file field names it; `collect_media_garbage` deletes unreferenced ones.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)  # sha256, also the key of its image derivatives
+    size = models.PositiveBigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last write or reference change: garbage collection waits out a grace period after it
+    touched_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} reference(s))"
+
+
+class StatsRollup(models.Model):
+    """
+    Single-row table of counters for the admin dashboard.
+    Kept up to date by the signal handlers in factchecks/signals.py, and rebuilt
+    from scratch with `python manage.py rebuild_stats`.
+    """
+    SINGLETON_PK = 1
+    COUNTER_FIELDS = (
+        'total_factchecks',
+        'total_submissions',
+        'pending_submissions',
+        'total_positive_content',
+        'published_positive_content',
+        'total_users',
+        'staff_users',
+    )
+
+    total_factchecks = models.IntegerField(default=0)
+    total_submissions = models.IntegerField(default=0)
+    pending_submissions = models.IntegerField(default=0)
+    total_positive_content = models.IntegerField(default=0)
+    published_positive_content = models.IntegerField(default=0)
+    total_users = models.IntegerField(default=0)
+    staff_users = models.IntegerField(default=0)
+
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats rollup (updated {self.date_updated})"
+
+    @classmethod
+    def compute_counts(cls):
+        """
+        Count everything with full-table queries (used for seeding and drift checks).
+        """
+        return {
+            'total_factchecks': FactCheck.objects.count(),
+            'total_submissions': Submission.objects.count(),
+            'pending_submissions': Submission.objects.filter(status='new').count(),
+            'total_positive_content': PositiveContent.objects.count(),
+            'published_positive_content': PositiveContent.objects.filter(is_published=True).count(),
+            'total_users': User.objects.count(),
+            'staff_users': User.objects.filter(is_staff=True).count(),
+        }
+
+    @classmethod
+    def load(cls):
+        """
+        Return the rollup row, seeding it from a full count the first time.
+        """
+        rollup = cls.objects.filter(pk=cls.SINGLETON_PK).first()
+        if rollup is None:
+            rollup, _ = cls.objects.get_or_create(pk=cls.SINGLETON_PK, defaults=cls.compute_counts())
+        return rollup
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.COUNTER_FIELDS}
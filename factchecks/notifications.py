@@ -0,0 +1,152 @@
+# factchecks/notifications.py
+"""
+Submitter notifications through a transactional outbox.
+
+Views never talk to the mail server: they call queue_* inside the transaction
+that changes the submission, which writes a NotificationOutbox row. A rolled
+back change leaves no email behind, and a committed one can't lose its email
+to a mail server hiccup.
+
+`python manage.py run_notification_worker` claims due emails in batches,
+sends each batch over a single SMTP connection, then records the outcome
+with a few bulk UPDATEs, including Submission.user_notified/date_notified.
+Failed emails are retried with an exponential backoff, up to
+NOTIFICATION_MAX_ATTEMPTS attempts.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import NotificationOutbox, Submission
+
+logger = logging.getLogger(__name__)
+
+
+def recipient_for(submission):
+    """The address to notify about a submission, or '' when the submitter left none"""
+    if submission.submitter_email:
+        return submission.submitter_email
+    if submission.submitter_id and submission.submitter.email:
+        return submission.submitter.email
+    return ''
+
+
+def queue_factcheck_notification(submission, factcheck):
+    """
+    Queue the "your submission was fact-checked" email. Call it inside the
+    transaction that completes the submission. Returns the outbox row, or None
+    when there's nobody to notify.
+    """
+    recipient = recipient_for(submission)
+    if not recipient:
+        return None
+    claim = submission.claim_text or submission.url_submitted
+    summary = (factcheck.summary or '').strip()
+    greeting = f"Hello {submission.submitter_name}," if submission.submitter_name else "Hello,"
+    body = (
+        f"{greeting}\n\n"
+        + f"Thank you for your submission:\n\n    {claim}\n\n"
+        + f"Our team has published a fact-check: {factcheck.title}\n"
+        + f"Verdict: {factcheck.get_verdict_display()}\n"
+        + (f"\n{summary[:1000]}\n" if summary else '')
+        + f"\nRead more at {settings.SITE_URL}\n\nThe AyitiPam team\n"
+    )
+    return NotificationOutbox.objects.create(
+        submission=submission,
+        kind='factcheck_completed',
+        recipient=recipient,
+        subject=f"Your submission has been fact-checked: {factcheck.get_verdict_display()}",
+        body=body,
+    )
+
+
+def _claimable(now):
+    """Due queued emails, plus batches whose visibility timeout expired (their worker died)"""
+    return (
+        Q(status='queued', run_after__lte=now) |
+        Q(status='sending', locked_until__lt=now)
+    )
+
+
+def claim_batch(worker_id, limit):
+    """
+    Claim up to `limit` emails for this worker with one conditional UPDATE, so
+    concurrent workers never claim the same row.
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.NOTIFICATION_VISIBILITY_TIMEOUT)
+    candidates = list(
+        NotificationOutbox.objects.filter(_claimable(now)).order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    )
+    if not candidates:
+        return []
+    NotificationOutbox.objects.filter(_claimable(now), id__in=candidates).update(
+        status='sending', locked_by=worker_id, locked_until=locked_until, attempts=F('attempts') + 1,
+    )
+    return list(
+        NotificationOutbox.objects.filter(id__in=candidates, locked_by=worker_id, locked_until=locked_until).order_by('id')
+    )
+
+
+def _deliver(messages):
+    """
+    Send the messages over one connection. Returns (sent, failed) with failed
+    as [(message, error)]; a lost connection fails the rest of the batch.
+    """
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for i, message in enumerate(messages):
+            email = EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.recipient],
+                                 connection=connection)
+            try:
+                email.send()
+                sent.append(message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException, ValueError) as e:
+                # This message was refused; the connection is still usable
+                failed.append((message, str(e)))
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                failed += [(rest, f"Connection lost: {e}") for rest in messages[i:]]
+                break
+    except OSError as e:
+        failed += [(message, f"Cannot connect to the mail server: {e}") for message in messages[len(sent) + len(failed):]]
+    finally:
+        try:
+            connection.close()
+        except OSError:
+            pass
+    return sent, failed
+
+
+def send_batch(messages):
+    """Send claimed emails and record the outcome; returns (number sent, number failed)"""
+    sent, failed = _deliver(messages)
+    now = timezone.now()
+    worker_id = messages[0].locked_by if messages else ''
+
+    if sent:
+        # Unless another worker re-claimed them after our lock expired
+        NotificationOutbox.objects.filter(id__in=[m.id for m in sent], locked_by=worker_id).update(
+            status='sent', sent_at=now, locked_until=None, last_error=''
+        )
+        Submission.objects.filter(id__in={m.submission_id for m in sent}).update(user_notified=True, date_notified=now)
+
+    for message, error in failed:
+        if message.attempts < settings.NOTIFICATION_MAX_ATTEMPTS:
+            delay = settings.NOTIFICATION_RETRY_BACKOFF * 2 ** (message.attempts - 1)
+            fields = {'status': 'queued', 'run_after': now + timedelta(seconds=delay)}
+            logger.warning(f"Notification {message.id} to {message.recipient} failed (attempt {message.attempts}), "
+                           f"retrying in {delay}s: {error}")
+        else:
+            fields = {'status': 'failed'}
+            logger.error(f"Notification {message.id} to {message.recipient} failed permanently: {error}")
+        NotificationOutbox.objects.filter(pk=message.pk, locked_by=worker_id, attempts=message.attempts).update(
+            locked_until=None, last_error=error, **fields
+        )
+    return len(sent), len(failed)
@@ -0,0 +1,39 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DateCreatedCursorPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination for lists ordered by newest first.
+    The cursor encodes the position in the ordering instead of an OFFSET,
+    so deep pages cost the same as the first one. The 'id' tie-breaker
+    keeps the ordering stable when two rows share a timestamp.
+    """
+    ordering = ('-date_created', '-id')
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'  # Let clients ask for smaller/larger pages
+    max_page_size = 100
+
+
+class SubmissionCursorPagination(DateCreatedCursorPagination):
+    """
+    Cursor pagination for submissions, newest submission first.
+    """
+    ordering = ('-date_submitted', '-id')
+
+
+class UserCursorPagination(DateCreatedCursorPagination):
+    """
+    Cursor pagination for users, most recently joined first.
+    """
+    ordering = ('-date_joined', '-id')
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """
+    Page-number pagination for search results, which are ordered by relevance
+    rather than by a column a cursor could key on.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
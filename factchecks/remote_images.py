@@ -0,0 +1,323 @@
+# factchecks/remote_images.py
+"""
+Local copies of external PositiveContent images (image_url).
+
+Hot-linking makes every page view depend on the other site being up and fast,
+and serves its full-size original to every phone. Instead, each distinct URL
+gets a CachedRemoteImage: the image is downloaded once, stored under
+remote/<sha256>.<ext> (so identical images share one file), and gets the same
+derivatives as uploads (see images.py). The serializers then return our copy.
+
+Copies are re-validated with conditional GETs (If-None-Match /
+If-Modified-Since) on the origin's Cache-Control max-age, clamped to
+IMAGE_PROXY_MIN/MAX_REFRESH_INTERVAL; a 304 costs no download. Failed requests
+are retried with an exponential backoff, and the last good copy keeps being
+served meanwhile.
+
+Only http(s) URLs on public addresses are fetched, redirects included, unless
+IMAGE_PROXY_ALLOW_PRIVATE_HOSTS is set. Addresses are checked as the connection
+is made, to the address it uses, so DNS rebinding can't slip past the check
+(TLS still verifies the hostname). Downloads are capped at
+IMAGE_PROXY_MAX_BYTES and must be an image/* type.
+
+`python manage.py run_image_worker` links new content and refreshes due copies;
+`refresh_remote_images` does it all at once.
+"""
+import hashlib
+import http.client
+import ipaddress
+import logging
+import re
+import socket
+import tempfile
+from collections import namedtuple
+from datetime import timedelta
+from urllib.parse import urlsplit
+from urllib.request import HTTPHandler, HTTPRedirectHandler, HTTPSHandler, ProxyHandler, Request, build_opener
+from urllib.error import HTTPError
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import storage
+from .caching import bump_model_version
+from .images import IMAGE_ERRORS, build_derivatives
+from .models import CachedRemoteImage, PositiveContent
+
+logger = logging.getLogger(__name__)
+
+REMOTE_DIR = 'remote'
+USER_AGENT = 'AyitiPam-ImageProxy/1.0'
+EXTENSIONS = {
+    'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif',
+    'image/webp': '.webp', 'image/avif': '.avif', 'image/bmp': '.bmp', 'image/tiff': '.tiff',
+}
+CHUNK_SIZE = 64 * 1024
+MAX_AGE_RE = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)', re.IGNORECASE)
+
+FetchedImage = namedtuple('FetchedImage', ['file', 'hash', 'size', 'content_type', 'etag', 'last_modified', 'max_age'])
+
+
+class RemoteImageError(Exception):
+    """The URL can't or mustn't be fetched, or the response isn't a usable image"""
+
+
+def public_addresses(host, port):
+    """
+    getaddrinfo() results for the host. Raises RemoteImageError when it can't be
+    resolved or when any of its addresses isn't public (unless
+    IMAGE_PROXY_ALLOW_PRIVATE_HOSTS is set).
+    """
+    try:
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise RemoteImageError(f"Cannot resolve {host}: {e}")
+    if not settings.IMAGE_PROXY_ALLOW_PRIVATE_HOSTS:
+        for *_, sockaddr in addresses:
+            address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+            if not address.is_global:
+                raise RemoteImageError(f"{host} resolves to a non-public address ({address})")
+    return addresses
+
+
+def check_url(url):
+    """Raise RemoteImageError unless the URL is http(s); addresses are checked when connecting"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise RemoteImageError(f"Not an http(s) URL: {url}")
+
+
+def _connect_public(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    """
+    socket.create_connection() that connects to the very addresses
+    public_addresses() checked, so a DNS answer that changes between the check
+    and the connection (DNS rebinding) can't reach an internal host
+    """
+    host, port = address
+    error = RemoteImageError(f"No address for {host}")
+    for *_, sockaddr in public_addresses(host, port):
+        try:
+            return socket.create_connection(sockaddr[:2], timeout, source_address)
+        except OSError as e:
+            error = e
+    raise error
+
+
+class _PublicConnectionMixin:
+    """
+    Opens the socket with _connect_public. The connection keeps the hostname
+    for the Host header and, over TLS, for SNI and certificate verification.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPConnection(_PublicConnectionMixin, http.client.HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicConnectionMixin, http.client.HTTPSConnection):
+    pass
+
+
+class _PublicHTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(HTTPRedirectHandler):
+    """Applies check_url to every redirect target (its connection checks the address like any other)"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def build_checked_opener():
+    """
+    A urllib opener whose every connection, redirects included, goes to a
+    checked public address. Proxies from the environment are ignored: through
+    a proxy, it would be the proxy's address that gets checked.
+    """
+    return build_opener(ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _CheckedRedirectHandler)
+
+
+def parse_max_age(cache_control):
+    """Seconds from a Cache-Control header: 0 for no-cache/no-store, None when it doesn't say"""
+    if not cache_control:
+        return None
+    if re.search(r'\bno-(?:cache|store)\b', cache_control, re.IGNORECASE):
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+def refresh_interval(max_age):
+    """Time until the next re-validation"""
+    seconds = settings.IMAGE_PROXY_REFRESH_INTERVAL if max_age is None else max_age
+    seconds = min(max(seconds, settings.IMAGE_PROXY_MIN_REFRESH_INTERVAL), settings.IMAGE_PROXY_MAX_REFRESH_INTERVAL)
+    return timedelta(seconds=seconds)
+
+
+def retry_delay(failures):
+    """Backoff after `failures` consecutive failures"""
+    seconds = settings.IMAGE_PROXY_RETRY_DELAY * 2 ** min(failures - 1, 20)
+    return timedelta(seconds=min(seconds, settings.IMAGE_PROXY_MAX_REFRESH_INTERVAL))
+
+
+def fetch(url, etag='', last_modified=''):
+    """
+    GET the image, conditionally when validators are given. Returns a
+    FetchedImage whose `file` is a temporary file holding the body (the caller
+    closes it); its `file` is None when the origin answered 304 Not Modified.
+    """
+    check_url(url)
+    headers = {'User-Agent': USER_AGENT, 'Accept': 'image/avif,image/webp,image/*;q=0.8'}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    opener = build_checked_opener()
+    try:
+        response = opener.open(Request(url, headers=headers), timeout=settings.IMAGE_PROXY_TIMEOUT)
+    except HTTPError as e:
+        e.close()
+        if e.code == 304:
+            return FetchedImage(None, '', 0, '', '', '', parse_max_age(e.headers.get('Cache-Control')))
+        raise RemoteImageError(f"HTTP {e.code} from {url}")
+
+    with response:
+        content_type = response.headers.get_content_type()
+        if not content_type.startswith('image/'):
+            raise RemoteImageError(f"Not an image: {content_type}")
+        max_bytes = settings.IMAGE_PROXY_MAX_BYTES
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise RemoteImageError(f"Image too large: {length} bytes")
+
+        # Hashed while streaming to disk, so large images never sit in memory whole
+        file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        digest, size = hashlib.sha256(), 0
+        try:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise RemoteImageError(f"Image larger than {max_bytes} bytes")
+                digest.update(chunk)
+                file.write(chunk)
+        except BaseException:
+            file.close()
+            raise
+        file.seek(0)
+        return FetchedImage(
+            file, digest.hexdigest(), size, content_type,
+            response.headers.get('ETag', ''), response.headers.get('Last-Modified', ''),
+            parse_max_age(response.headers.get('Cache-Control')),
+        )
+
+
+def _store_original(fetched):
+    # Content-addressed storage picks the name (remote/<sha256>.<ext>) and keeps one copy per content
+    fetched.file.seek(0)
+    name = f"{REMOTE_DIR}/original{EXTENSIONS.get(fetched.content_type, '')}"
+    return CachedRemoteImage._meta.get_field('file').storage.save(name, File(fetched.file, name))
+
+
+def refresh(image_id):
+    """
+    Download or re-validate one CachedRemoteImage.
+    Returns 'updated', 'not_modified' or 'failed'.
+    """
+    cached = CachedRemoteImage.objects.filter(pk=image_id).first()
+    if cached is None:
+        return 'failed'
+    rows = CachedRemoteImage.objects.filter(pk=image_id)
+    now = timezone.now()
+    try:
+        # Only conditional when we hold a copy to fall back on
+        fetched = fetch(cached.url, *((cached.etag, cached.last_modified) if cached.file else ()))
+        if fetched.file is None:
+            rows.update(checked_at=now, next_check_at=now + refresh_interval(fetched.max_age), failures=0, last_error='')
+            return 'not_modified'
+        with fetched.file:
+            validators = {
+                'etag': fetched.etag[:255], 'last_modified': fetched.last_modified[:100],
+                'checked_at': now, 'next_check_at': now + refresh_interval(fetched.max_age),
+                'failures': 0, 'last_error': '',
+            }
+            if cached.file and fetched.hash == cached.content_hash:
+                # The origin doesn't do conditional requests, but nothing changed
+                rows.update(**validators)
+                return 'not_modified'
+            name = _store_original(fetched)
+            fetched.file.seek(0)
+            derivatives = build_derivatives(fetched.file)
+    except (RemoteImageError, http.client.HTTPException, *IMAGE_ERRORS) as e:
+        failures = cached.failures + 1
+        rows.update(checked_at=now, next_check_at=now + retry_delay(failures), failures=failures, last_error=str(e))
+        logger.warning(f"Could not fetch remote image {cached.url} (attempt {failures}): {e}")
+        return 'failed'
+
+    # Unless another worker replaced the file since we read the row; our copy
+    # then stays unreferenced until collect_media_garbage deletes it
+    updated = rows.filter(file=cached.file.name).update(
+        file=name, content_hash=fetched.hash, content_type=fetched.content_type, size=fetched.size,
+        derivatives=derivatives, fetched_at=now, **validators
+    )
+    if updated != 1:
+        logger.info(f"Remote image {cached.url} was refreshed by another worker meanwhile")
+        return 'not_modified'
+    # A queryset update sends no signals: count the file references, and make
+    # cached responses pick up the local URL
+    if name != cached.file.name:
+        storage.retain(name)
+        storage.release(cached.file.name)
+    bump_model_version(PositiveContent)
+    logger.info(f"Cached remote image {cached.url} as {name}")
+    return 'updated'
+
+
+def pending_links():
+    """Content with an external image URL (and no upload) that isn't linked to its cached copy yet"""
+    return (
+        PositiveContent.objects
+        .filter(remote_image__isnull=True)
+        .exclude(image_url='')
+        .filter(Q(image='') | Q(image__isnull=True))
+    )
+
+
+def link_pending(limit=None):
+    """
+    Point pending content at the CachedRemoteImage for its URL, creating it
+    (due at once) when the URL is new. Returns the number of items linked.
+    """
+    pending = pending_links().order_by('id').values_list('id', 'image_url')
+    linked = 0
+    for content_id, url in pending[:limit] if limit else pending:
+        cached, _ = CachedRemoteImage.objects.get_or_create(url=url)
+        # Unless image_url changed in the meantime
+        linked += PositiveContent.objects.filter(pk=content_id, image_url=url, remote_image__isnull=True).update(
+            remote_image=cached
+        )
+    if linked:
+        bump_model_version(PositiveContent)  # The URL may already have a downloaded copy
+    return linked
+
+
+def due_images():
+    """Cached images still in use whose re-validation (or first download, or retry) is due"""
+    return CachedRemoteImage.objects.filter(
+        Exists(PositiveContent.objects.filter(remote_image=OuterRef('pk'))),
+        next_check_at__lte=timezone.now(),
+    )
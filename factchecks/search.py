@@ -0,0 +1,124 @@
+import re
+
+from django.db import connection
+from django.db.models import F, Q, Value
+from .models import FactCheck
+
+# FTS5 index over FactCheck.title and FactCheck.summary (SQLite only).
+# It is an external-content table: the text lives in factchecks_factcheck and the
+# triggers below keep the index in sync on every insert, update and delete.
+FTS_TABLE = 'factchecks_factcheck_fts'
+
+# Markers placed around matches by highlight()/snippet(). They are swapped for
+# <mark> tags after HTML-escaping the text (see FactCheckSearchSerializer).
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# BM25 column weights: a match in the title counts more than one in the summary
+TITLE_WEIGHT = 5.0
+SUMMARY_WEIGHT = 1.0
+
+CREATE_INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, summary,
+        content='factchecks_factcheck', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON factchecks_factcheck BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON factchecks_factcheck BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, summary ON factchecks_factcheck BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    # Index the rows that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_INDEX_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def create_search_index(cursor):
+    """
+    Create (or re-create) the FTS table and its sync triggers, then rebuild it.
+    Safe to run again, e.g. after a migration that rebuilt factchecks_factcheck
+    and dropped the triggers with it.
+    """
+    for sql in CREATE_INDEX_SQL:
+        cursor.execute(sql)
+
+
+def drop_search_index(cursor):
+    for sql in DROP_INDEX_SQL:
+        cursor.execute(sql)
+
+
+def build_match_expression(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the last
+    one also matches as a prefix so results appear while the user is typing.
+    Quoting each word keeps FTS5 operators in user input from being interpreted.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_factchecks(text):
+    """
+    Return fact-checks matching `text`, best BM25 match first. Each row is annotated
+    with `rank`, `title_highlight` and `summary_snippet`.
+    Falls back to a plain icontains filter on databases without FTS5.
+    """
+    match = build_match_expression(text)
+    if match is None:
+        return FactCheck.objects.none()
+
+    if not is_supported():
+        return FactCheck.objects.filter(
+            Q(title__icontains=text) | Q(summary__icontains=text)
+        ).annotate(
+            rank=Value(0.0),
+            title_highlight=F('title'),
+            summary_snippet=F('summary'),
+        ).order_by('-date_created', '-id')
+
+    return FactCheck.objects.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = factchecks_factcheck.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+        select={
+            'rank': f'bm25({FTS_TABLE}, %s, %s)',
+            'title_highlight': f"highlight({FTS_TABLE}, 0, %s, %s)",
+            'summary_snippet': f"snippet({FTS_TABLE}, 1, %s, %s, '…', 32)",
+        },
+        select_params=[
+            TITLE_WEIGHT, SUMMARY_WEIGHT,
+            HIGHLIGHT_START, HIGHLIGHT_END,
+            HIGHLIGHT_START, HIGHLIGHT_END,
+        ],
+        order_by=['rank', '-id'],
+    )
@@ -3,9 +3,12 @@ from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from .models import FactCheck,Submission, PositiveContent
 from django.conf import settings
+from django.core.files.storage import default_storage
+from .fieldsets import SparseFieldsetSerializerMixin
+from .images import MIME_TYPES
 
 
-class FactCheckSerializer(serializers.ModelSerializer):
+class FactCheckSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     This serializer translates the FactCheck model into JSON format.
     It will also handle validating any data we want to send back to the model.
@@ -18,7 +21,30 @@ class FactCheckSerializer(serializers.ModelSerializer):
 
 
 
-class AdminFactCheckSerializer(serializers.ModelSerializer):
+class FactCheckSearchSerializer(FactCheckSerializer):
+    """
+    Fact-check search result with its BM25 rank and highlighted matches.
+    Matches are wrapped in <mark> tags; the rest of the text is HTML-escaped.
+    """
+    rank = serializers.FloatField(read_only=True)
+    title_highlight = serializers.SerializerMethodField()
+    summary_snippet = serializers.SerializerMethodField()
+
+    def get_title_highlight(self, obj):
+        return self._mark(obj.title_highlight)
+
+    def get_summary_snippet(self, obj):
+        return self._mark(obj.summary_snippet)
+
+    def _mark(self, text):
+        from django.utils.html import escape
+        from .search import HIGHLIGHT_START, HIGHLIGHT_END
+        return escape(text or '').replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+
+
+class AdminFactCheckSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Enhanced serializer for admin interface with additional computed fields.
     """
@@ -44,9 +70,9 @@ class SubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Submission
         fields = '__all__'
-        read_only_fields = ('status', 'date_submitted')
+        read_only_fields = ('status', 'date_submitted', 'submitter')
 
-class AdminSubmissionSerializer(serializers.ModelSerializer):
+class AdminSubmissionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Enhanced serializer for admin interface with additional computed fields.
     """
@@ -55,6 +81,7 @@ class AdminSubmissionSerializer(serializers.ModelSerializer):
     has_url = serializers.SerializerMethodField()
     has_text = serializers.SerializerMethodField()
     fact_checks = serializers.SerializerMethodField()
+    method_field_sources = {'has_url': ('url_submitted',), 'has_text': ('claim_text',)}
     
     class Meta:
         model = Submission
@@ -76,9 +103,8 @@ class AdminSubmissionSerializer(serializers.ModelSerializer):
         return bool(obj.claim_text)
     
     def get_fact_checks(self, obj):
-        """Get related fact-checks for this submission"""
-        from .models import FactCheck
-        fact_checks = FactCheck.objects.filter(submission=obj)
+        """Get related fact-checks for this submission (reads the prefetched relation)"""
+        fact_checks = obj.fact_checks.all()
         return [
             {
                 'id': fc.id,
@@ -90,58 +116,113 @@ class AdminSubmissionSerializer(serializers.ModelSerializer):
         ]
 
 
-class PositiveContentSerializer(serializers.ModelSerializer):
+class ResponsiveImageMixin:
+    """
+    `image_srcset` for PositiveContent: {MIME type: srcset} for the resized
+    copies of the uploaded image (see factchecks/images.py), or of our cached
+    copy of image_url (see factchecks/remote_images.py), best format first,
+    ready for <picture><source type=... srcset=...>. None while they're pending.
+    """
+
+    def absolute_media_url(self, url):
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return f"http://localhost:8000{url}"
+
+    def cached_remote_image(self, obj):
+        """The downloaded copy of obj.image_url, or None (also when an upload takes precedence)"""
+        if obj.image or not obj.image_url or obj.remote_image_id is None:
+            return None
+        remote = obj.remote_image
+        return remote if remote.file and remote.url == obj.image_url else None
+
+    def derivative_urls(self, obj, fmt):
+        """[(width, absolute URL)] of the image's derivatives in one format, narrowest first"""
+        if obj.image:
+            derivatives = obj.image_derivatives
+        else:
+            remote = self.cached_remote_image(obj)
+            derivatives = remote.derivatives if remote else None
+        sizes = (derivatives or {}).get(fmt) or {}
+        return [
+            (int(width), self.absolute_media_url(default_storage.url(name)))
+            for width, name in sorted(sizes.items(), key=lambda item: int(item[0]))
+        ]
+
+    def get_image_srcset(self, obj):
+        srcset = {
+            mime_type: ', '.join(f"{url} {width}w" for width, url in self.derivative_urls(obj, fmt))
+            for fmt, mime_type in MIME_TYPES.items()
+        }
+        return {mime_type: value for mime_type, value in srcset.items() if value} or None
+
+
+class PositiveContentSerializer(ResponsiveImageMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the PositiveContent model.
     """
     content_type_display = serializers.CharField(source='get_content_type_display', read_only=True)
     image_url_full = serializers.SerializerMethodField()  # Add this field
+    image_srcset = serializers.SerializerMethodField()
+    method_field_sources = {
+        'image_url_full': ('image', 'image_url', 'image_derivatives', 'remote_image'),
+        'image_srcset': ('image', 'image_url', 'image_derivatives', 'remote_image'),
+    }
     
     class Meta:
         model = PositiveContent
-        fields = '__all__'
+        exclude = ['image_hash', 'image_derivatives', 'remote_image']  # Exposed as image_srcset
     
     def get_image_url_full(self, obj):
         """
         Return the full URL for the image, whether it's uploaded or from image_url field.
+        Images are served as their widest WebP copy once that exists, and external
+        images from our cached copy once it's been downloaded.
         """
+        webp = self.derivative_urls(obj, 'webp')
+        if webp:
+            return webp[-1][1]
         if obj.image:
-            # Build absolute URL for uploaded image
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            # Fallback for cases where request is not available
-            return f"http://localhost:8000{obj.image.url}"  # Adjust if needed
+            return self.absolute_media_url(obj.image.url)
         elif obj.image_url:
-            # Return the external URL directly
+            remote = self.cached_remote_image(obj)
+            if remote:
+                return self.absolute_media_url(remote.file.url)
+            # Not downloaded (yet): return the external URL directly
             return obj.image_url
         return None
     
 
-class AdminPositiveContentSerializer(serializers.ModelSerializer):
+class AdminPositiveContentSerializer(ResponsiveImageMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Enhanced serializer for admin interface with additional computed fields.
     """
     content_type_display = serializers.CharField(source='get_content_type_display', read_only=True)
     image_url_full = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     is_recent = serializers.SerializerMethodField()
     has_image = serializers.SerializerMethodField()
+    method_field_sources = {
+        'image_url_full': ('image', 'image_url', 'remote_image'),
+        'image_srcset': ('image', 'image_url', 'image_derivatives', 'remote_image'),
+        'is_recent': ('date_created',),
+        'has_image': ('image', 'image_url'),
+    }
     
     class Meta:
         model = PositiveContent
-        fields = '__all__'
+        exclude = ['image_hash', 'image_derivatives', 'remote_image']
     
     def get_image_url_full(self, obj):
         """
-        Return the full URL for the image, whether it's uploaded or from image_url field.
+        Return the full URL for the image (the original upload, or our copy of the external image), whether it's uploaded or from image_url field.
         """
         if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return f"http://localhost:8000{obj.image.url}"
+            return self.absolute_media_url(obj.image.url)
         elif obj.image_url:
-            return obj.image_url
+            remote = self.cached_remote_image(obj)
+            return self.absolute_media_url(remote.file.url) if remote else obj.image_url
         return None
     
     def get_is_recent(self, obj):
@@ -235,15 +316,16 @@ class CreateUserSerializer(serializers.ModelSerializer):
 
 
 
-class UserSubmissionSerializer(serializers.ModelSerializer):
+class UserSubmissionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for user's own submissions with detailed status.
     """
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     days_since_submission = serializers.SerializerMethodField()
-    has_related_factcheck = serializers.SerializerMethodField()
-    related_factcheck_id = serializers.SerializerMethodField()  # Add this line
-    related_factcheck_title = serializers.SerializerMethodField()  # Add this line
+    # Read from the annotations added by Submission.objects.with_related_factcheck()
+    has_related_factcheck = serializers.BooleanField(read_only=True)
+    related_factcheck_id = serializers.IntegerField(read_only=True, allow_null=True)
+    related_factcheck_title = serializers.CharField(read_only=True, allow_null=True)
     
     class Meta:
         model = Submission
@@ -257,23 +339,6 @@ class UserSubmissionSerializer(serializers.ModelSerializer):
         if obj.date_submitted:
             return (now() - obj.date_submitted).days
         return None
-    
-    def get_has_related_factcheck(self, obj):
-        # Check if there's a fact-check that might be related to this submission
-        from .models import FactCheck
-        return FactCheck.objects.filter(submission=obj).exists()
-    
-    def get_related_factcheck_id(self, obj):
-        # Get the ID of the related fact-check
-        from .models import FactCheck
-        fact_check = FactCheck.objects.filter(submission=obj).first()
-        return fact_check.id if fact_check else None
-    
-    def get_related_factcheck_title(self, obj):
-        # Get the title of the related fact-check
-        from .models import FactCheck
-        fact_check = FactCheck.objects.filter(submission=obj).first()
-        return fact_check.title if fact_check else None
 
     
 
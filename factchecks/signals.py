@@ -0,0 +1,161 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from .models import FactCheck, Submission, PositiveContent, StatsRollup, CachedRemoteImage
+from .caching import bump_model_version
+from . import storage
+
+
+# Admin stats counters
+#
+# Each tracked model maps to the counter for its total row count and, optionally,
+# a flag (field, value, counter) that feeds a filtered counter. Flag changes are
+# detected by the database, not from values remembered in memory: saving an
+# existing row first moves the flag with a conditional UPDATE that only matches
+# when the stored value is on the other side, so of two concurrent saves making
+# the same change only one counts it. `rebuild_stats` repairs any drift left by
+# queryset updates and bulk inserts, which send no signals.
+TRACKED_COUNTERS = {
+    FactCheck: ('total_factchecks', None),
+    Submission: ('total_submissions', ('status', 'new', 'pending_submissions')),
+    PositiveContent: ('total_positive_content', ('is_published', True, 'published_positive_content')),
+    User: ('total_users', ('is_staff', True, 'staff_users')),
+}
+
+
+def _bump_counters(**deltas):
+    """
+    Apply counter deltas to the rollup row with a single atomic UPDATE.
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if updates:
+        StatsRollup.objects.filter(pk=StatsRollup.SINGLETON_PK).update(**updates)
+
+
+def count_flag_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    field, value, counter = TRACKED_COUNTERS[sender][1]
+    # A deferred field that isn't assigned isn't saved either
+    if field not in instance.__dict__ or (update_fields is not None and field not in update_fields):
+        return
+    new_value = instance.__dict__[field]
+    rows = sender._base_manager.filter(pk=instance.pk)
+    if new_value == value:
+        changed = rows.exclude(**{field: value}).update(**{field: new_value})
+        _bump_counters(**{counter: changed})
+    else:
+        changed = rows.filter(**{field: value}).update(**{field: new_value})
+        _bump_counters(**{counter: -changed})
+
+
+def count_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:  # Skip fixture loading; flag changes are counted before the save
+        return
+    total_field, flag = TRACKED_COUNTERS[sender]
+    deltas = {total_field: 1}
+    if flag and instance.__dict__.get(flag[0]) == flag[1]:
+        deltas[flag[2]] = 1
+    _bump_counters(**deltas)
+
+
+def count_deleted(sender, instance, **kwargs):
+    # pre_delete runs in the deletion's transaction: lock the row and count what's
+    # stored, and nothing when a concurrent delete already removed it
+    total_field, flag = TRACKED_COUNTERS[sender]
+    field = flag[0] if flag else 'pk'
+    stored = list(sender._base_manager.select_for_update().filter(pk=instance.pk).values_list(field, flat=True))
+    if not stored:
+        return
+    deltas = {total_field: -1}
+    if flag and stored[0] == flag[1]:
+        deltas[flag[2]] = -1
+    _bump_counters(**deltas)
+
+
+for model, (_, flag) in TRACKED_COUNTERS.items():
+    if flag:
+        pre_save.connect(count_flag_change, sender=model, dispatch_uid=f'stats_flag_{model.__name__}')
+    post_save.connect(count_saved, sender=model, dispatch_uid=f'stats_save_{model.__name__}')
+    pre_delete.connect(count_deleted, sender=model, dispatch_uid=f'stats_delete_{model.__name__}')
+
+
+
+# Response cache versions
+#
+# Cached public responses are keyed on a per-model version (see factchecks/caching.py).
+# The bump waits for the commit, so a concurrent request can't cache the old rows
+# under the new version.
+CACHED_MODELS = (FactCheck, PositiveContent)
+
+
+def bump_cache_version(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+for model in CACHED_MODELS:
+    post_save.connect(bump_cache_version, sender=model, dispatch_uid=f'cache_save_{model.__name__}')
+    post_delete.connect(bump_cache_version, sender=model, dispatch_uid=f'cache_delete_{model.__name__}')
+
+
+
+# Image derivatives
+#
+# A new (or removed) PositiveContent image invalidates its derivatives, and a
+# new image_url its link to the cached copy; the image worker builds the new
+# ones (see factchecks/images.py and factchecks/remote_images.py).
+
+def remember_image(sender, instance, **kwargs):
+    instance._saved_image = str(instance.__dict__.get('image') or '')
+    instance._saved_image_url = instance.__dict__.get('image_url')
+
+
+def reset_image_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or 'image' not in instance.__dict__:
+        return
+    image = str(instance.__dict__['image'] or '')
+    if instance._state.adding or image != getattr(instance, '_saved_image', None):
+        instance.image_hash = ''
+        instance.image_derivatives = {}
+
+
+def reset_remote_image(sender, instance, raw=False, **kwargs):
+    if raw or 'image_url' not in instance.__dict__:
+        return
+    if instance.image_url != getattr(instance, '_saved_image_url', None):
+        instance.remote_image = None
+
+
+def count_image_references(sender, instance, created, raw=False, **kwargs):
+    # Stored files are shared between rows and only deleted once unreferenced (see factchecks/storage.py)
+    if raw or 'image' not in instance.__dict__:
+        return
+    image = str(instance.__dict__['image'] or '')
+    previous = '' if created else getattr(instance, '_saved_image', '')
+    if image != previous:
+        storage.retain(image)
+        storage.release(previous)
+
+
+def release_image(sender, instance, **kwargs):
+    storage.release(getattr(instance, '_saved_image', ''))
+
+
+def update_saved_image(sender, instance, **kwargs):
+    remember_image(sender, instance)
+
+
+def release_remote_image_file(sender, instance, **kwargs):
+    storage.release(instance.file.name)
+
+
+post_init.connect(remember_image, sender=PositiveContent, dispatch_uid='image_init_PositiveContent')
+pre_save.connect(reset_image_derivatives, sender=PositiveContent, dispatch_uid='image_pre_save_PositiveContent')
+pre_save.connect(reset_remote_image, sender=PositiveContent, dispatch_uid='remote_image_pre_save_PositiveContent')
+post_save.connect(count_image_references, sender=PositiveContent, dispatch_uid='image_refs_save_PositiveContent')
+post_save.connect(update_saved_image, sender=PositiveContent, dispatch_uid='image_save_PositiveContent')
+post_delete.connect(release_image, sender=PositiveContent, dispatch_uid='image_delete_PositiveContent')
+post_delete.connect(release_remote_image_file, sender=CachedRemoteImage, dispatch_uid='image_delete_CachedRemoteImage')
@@ -0,0 +1,166 @@
+# factchecks/storage.py
+"""
+Content-addressed, deduplicating media storage.
+
+ContentAddressedStorage stores a file under <upload_to>/<sha256[:2]>/<sha256><ext>
+instead of its upload name. The upload is hashed while its chunks are copied
+to a temporary file next to the destination (never read into memory whole),
+then renamed into place; when that content is already stored, the copy is
+dropped and the existing name returned. So the same hero image uploaded for ten
+PositiveContent entries is one file.
+
+Each stored file has a StoredBlob row whose ref_count is the number of rows
+naming it. Signals (see signals.py) call retain() and release() when an image
+is saved, replaced or deleted; `python manage.py collect_media_garbage`
+deletes blobs that have been unreferenced for MEDIA_GC_GRACE_PERIOD, along with
+their image derivatives. The grace period covers an upload written to disk
+whose model save hasn't committed yet.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+
+def blob_name(directory, content_hash, extension):
+    return f"{directory}/{content_hash[:2]}/{content_hash}{extension}".lstrip('/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after their sha256 and stores each content once"""
+
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        upload_dir = self.path(directory)
+        os.makedirs(upload_dir, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+        try:
+            digest, size = hashlib.sha256(), 0
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            content_hash = digest.hexdigest()
+            name = blob_name(directory, content_hash, extension)
+            path = self.path(name)
+
+            # Touching the blob first keeps the garbage collector off it (see collect_garbage)
+            touched = StoredBlob.objects.filter(name=name).update(touched_at=timezone.now())
+            if not (touched and os.path.exists(path)):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, path)  # Atomic; a concurrent writer can only put the same bytes there
+                StoredBlob.objects.get_or_create(name=name, defaults={'content_hash': content_hash, 'size': size})
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+
+def retain(name):
+    """Count a new reference to a stored file (names outside content-addressed storage are ignored)"""
+    from .models import StoredBlob
+
+    if name:
+        StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1, touched_at=timezone.now())
+
+
+def release(name):
+    """Drop a reference to a stored file; it's collected once unreferenced for the grace period"""
+    from .models import StoredBlob
+
+    if name:
+        StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1, touched_at=timezone.now())
+
+
+def referenced_names():
+    """Every file name the file fields of content-addressed models currently point at, with its count"""
+    from .models import CachedRemoteImage, PositiveContent
+
+    counts = Counter(PositiveContent.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+    counts.update(CachedRemoteImage.objects.exclude(file='').values_list('file', flat=True))
+    return counts
+
+
+def recount_references():
+    """Recompute every ref_count from the database (repairs drift); returns the number of blobs fixed"""
+    from .models import StoredBlob
+
+    counts = referenced_names()
+    fixed = []
+    for blob in StoredBlob.objects.only('id', 'name', 'ref_count').iterator():
+        if blob.ref_count != counts.get(blob.name, 0):
+            blob.ref_count = counts.get(blob.name, 0)
+            fixed.append(blob)
+    StoredBlob.objects.bulk_update(fixed, ['ref_count'], batch_size=500)
+    return len(fixed)
+
+
+def _delete_derivatives(content_hash):
+    """Remove an image's derivatives unless another blob or upload with the same content still uses them"""
+    from .images import DERIVATIVES_DIR
+    from .models import PositiveContent, StoredBlob
+
+    if StoredBlob.objects.filter(content_hash=content_hash).exists():
+        return
+    if PositiveContent.objects.filter(image_hash=content_hash).exists():
+        return
+    shutil.rmtree(os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR, content_hash[:2], content_hash), ignore_errors=True)
+
+
+def collect_garbage(grace_period=None, dry_run=False):
+    """
+    Delete the files of blobs unreferenced for longer than the grace period
+    (settings.MEDIA_GC_GRACE_PERIOD seconds by default).
+    Returns (number of files, bytes) deleted, or that would be with dry_run.
+    """
+    from .models import StoredBlob
+
+    grace_period = settings.MEDIA_GC_GRACE_PERIOD if grace_period is None else grace_period
+    storage = ContentAddressedStorage()
+    deleted = freed = 0
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+    for blob in StoredBlob.objects.filter(ref_count__lte=0, touched_at__lt=cutoff).order_by('id').iterator():
+        if dry_run:
+            deleted, freed = deleted + 1, freed + blob.size
+            continue
+
+        # Move the file aside before deleting the row: an upload of the same
+        # content that touched the row in between makes the delete match nothing,
+        # and the file goes back; one after finds neither and writes it anew
+        path = storage.path(blob.name)
+        trash_path = f"{path}.{uuid.uuid4().hex}.deleted"
+        try:
+            os.replace(path, trash_path)
+        except FileNotFoundError:
+            trash_path = None
+        rows, _ = StoredBlob.objects.filter(pk=blob.pk, ref_count__lte=0, touched_at__lt=cutoff).delete()
+        if trash_path:
+            if rows:
+                os.remove(trash_path)
+            else:
+                os.replace(trash_path, path)
+        if rows:
+            deleted, freed = deleted + 1, freed + blob.size
+            _delete_derivatives(blob.content_hash)
+            logger.info(f"Deleted unreferenced media file {blob.name}")
+    return deleted, freed
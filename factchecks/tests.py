@@ -1,3 +1,444 @@
-from django.test import TestCase
+import hashlib
+import io
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import notifications, remote_images
+
+from .caching import check_response_cache_shared
+from .models import (
+    CachedRemoteImage, FactCheck, NotificationOutbox, PositiveContent, StatsRollup, StoredBlob, Submission,
+)
+
+
+class SubmissionListQueryCountTests(TestCase):
+    """
+    The submission lists read related fact-checks from a prefetch or an
+    annotation, so their query count doesn't grow with the number of rows.
+    """
+    ROWS = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.user = User.objects.create_user('user', 'user@example.com', 'password')
+        submissions = Submission.objects.bulk_create(
+            Submission(submitter=cls.user, claim_text=f"Claim {i}", context="Context")
+            for i in range(cls.ROWS)
+        )
+        FactCheck.objects.bulk_create(
+            FactCheck(submission=submission, title=f"Fact-check {i}", verdict='False', summary="Summary")
+            for i, submission in enumerate(submissions[::2])
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_admin_submission_list(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse('admin-submission-list')
+        # The page, then one prefetch of the page's fact-checks
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(len(results), 100)
+        self.assertEqual(sum(len(row['fact_checks']) for row in results), 50)
+
+        # A deeper page costs the same
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 100)
+
+    def test_user_submission_list(self):
+        self.client.force_authenticate(self.user)
+        # One query, with the related fact-check annotated on each row
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-submissions'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), self.ROWS)
+        self.assertEqual(sum(row['has_related_factcheck'] for row in response.data), self.ROWS // 2)
+        related = next(row for row in response.data if row['has_related_factcheck'])
+        self.assertEqual(
+            FactCheck.objects.get(pk=related['related_factcheck_id']).title, related['related_factcheck_title']
+        )
+
+
+class UserDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user', 'user@example.com', 'password')
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        statuses = ['new'] * 5 + ['in_review'] * 3 + ['completed'] * 4
+        submissions = Submission.objects.bulk_create(
+            Submission(submitter=cls.user, claim_text=f"Claim {i}", status=status) for i, status in enumerate(statuses)
+        )
+        Submission.objects.create(submitter=other, claim_text="Someone else's claim", status='completed')
+        # Two fact-checks on one submission: joined with the other counts, they must not multiply them
+        for submission in submissions[-4:]:
+            FactCheck.objects.create(submission=submission, title="Fact-check", verdict='False', summary="Summary")
+        FactCheck.objects.create(submission=submissions[-1], title="Follow-up", verdict='Mixture', summary="Summary")
+
+    def test_stats_and_query_count(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # Stats aggregate, recent submissions, recent fact-checks
+        with self.assertNumQueries(3):
+            response = client.get(reverse('user-dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stats'], {
+            'total_submissions': 12,
+            'submissions_last_30_days': 12,
+            'submissions_in_review': 3,
+            'submissions_completed': 4,
+            'submissions_published': 5,
+            'completion_rate': 33,
+        })
+        self.assertEqual(len(response.data['recent_submissions']), 5)
+        self.assertEqual(len(response.data['recent_fact_checks']), 3)
+
+
+class StatsRollupTests(TestCase):
+    def setUp(self):
+        StatsRollup.load()
+
+    def assertCounters(self, **expected):
+        rollup = StatsRollup.load().as_dict()
+        self.assertEqual({field: rollup[field] for field in expected}, expected)
+        self.assertEqual(rollup, StatsRollup.compute_counts())
+
+    def test_create_update_delete(self):
+        submission = Submission.objects.create(claim_text="Claim")
+        self.assertCounters(total_submissions=1, pending_submissions=1)
+        submission.status = 'in_review'
+        submission.save()
+        self.assertCounters(total_submissions=1, pending_submissions=0)
+        submission.status = 'new'
+        submission.save()
+        self.assertCounters(pending_submissions=1)
+        submission.delete()
+        self.assertCounters(total_submissions=0, pending_submissions=0)
+
+        content = PositiveContent.objects.create(title="Title", content_type='culture', is_published=False)
+        self.assertCounters(total_positive_content=1, published_positive_content=0)
+        content.is_published = True
+        content.save(update_fields=['is_published'])
+        self.assertCounters(published_positive_content=1)
+
+    def test_concurrent_changes_count_once(self):
+        submission = Submission.objects.create(claim_text="Claim")
+        # Two requests loaded the submission while it was new, and both move it on
+        first, second = Submission.objects.get(pk=submission.pk), Submission.objects.get(pk=submission.pk)
+        first.status = 'in_review'
+        first.save()
+        second.status = 'completed'
+        second.save()
+        self.assertCounters(pending_submissions=0)
+
+        # A stale copy still says 'completed', but the row is new again
+        fresh = Submission.objects.get(pk=submission.pk)
+        fresh.status = 'new'
+        fresh.save()
+        second.delete()
+        self.assertCounters(total_submissions=0, pending_submissions=0)
+
+        # Deleting an already deleted row counts nothing
+        first.delete()
+        self.assertCounters(total_submissions=0, pending_submissions=0)
+
+    def test_saves_without_the_flag_field(self):
+        user = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.assertCounters(total_users=1, staff_users=1)
+        User.objects.filter(pk=user.pk).update(is_staff=False)  # Sends no signals
+        user.save(update_fields=['last_login'])
+        deferred = User.objects.only('username').get(pk=user.pk)
+        deferred.username = 'renamed'
+        deferred.save()
+        self.assertEqual(StatsRollup.load().staff_users, 1)  # Left for rebuild_stats
+
+    def test_admin_stats_is_one_query(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        client = APIClient()
+        client.force_authenticate(admin)
+        with self.assertNumQueries(1):
+            response = client.get(reverse('admin-stats'))
+        self.assertEqual(response.data['staff_users'], 1)
+
+
+class VersionedCacheTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        FactCheck.objects.create(title="Fact-check", verdict='False', summary="Summary")
+
+    def shared_cache(self):
+        # The file-based cache is shared by every process on the host
+        return override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.cache_dir,
+        }})
+
+    def test_process_local_cache_is_not_used(self):
+        response = self.client.get(reverse('factcheck-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual([warning.id for warning in check_response_cache_shared(None)], ['factchecks.W001'])
+
+    def test_shared_cache_revalidation(self):
+        url = reverse('factcheck-list')
+        with self.shared_cache():
+            self.assertEqual(check_response_cache_shared(None), [])
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                FactCheck.objects.create(title="Another fact-check", verdict='True', summary="Summary")
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), 2)
+
+
+def jpeg(color, size=(64, 32)):
+    data = io.BytesIO()
+    Image.new('RGB', size, color).save(data, 'JPEG')
+    return data.getvalue()
+
+
+class ImageOriginHandler(BaseHTTPRequestHandler):
+    """Serves server.body as a JPEG with an ETag, answering If-None-Match with 304"""
+
+    def do_GET(self):
+        self.server.requests.append({'path': self.path, 'host': self.headers['Host'],
+                                     'if_none_match': self.headers['If-None-Match']})
+        etag = f'"{hashlib.md5(self.server.body).hexdigest()}"'
+        if self.headers['If-None-Match'] == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteImageTests(TestCase):
+    """Remote image copies, against a local origin server"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, IMAGE_PROXY_ALLOW_PRIVATE_HOSTS=True))
+        self.origin = ThreadingHTTPServer(('127.0.0.1', 0), ImageOriginHandler)
+        self.origin.body, self.origin.requests = jpeg('green'), []
+        threading.Thread(target=self.origin.serve_forever, daemon=True).start()
+        self.addCleanup(self.origin.server_close)
+        self.addCleanup(self.origin.shutdown)
+        self.port = self.origin.server_port
+        self.image = CachedRemoteImage.objects.create(url=f'http://127.0.0.1:{self.port}/photo.jpg')
+
+    def ref_count(self, name):
+        return StoredBlob.objects.get(name=name).ref_count
+
+    def resolve(self, hostnames):
+        """Make the given hostnames resolve to local addresses, counting the lookups"""
+        lookups = []
+        getaddrinfo = socket.getaddrinfo
+
+        def fake_getaddrinfo(host, *args, **kwargs):
+            lookups.append(host)
+            return getaddrinfo(hostnames.get(host, host), *args, **kwargs)
+
+        self.enterContext(mock.patch('socket.getaddrinfo', fake_getaddrinfo))
+        return lookups
+
+    def test_download_revalidate_and_replace(self):
+        self.assertEqual(remote_images.refresh(self.image.pk), 'updated')
+        self.image.refresh_from_db()
+        first = self.image.file.name
+        self.assertTrue(first.startswith('remote/'))
+        self.assertEqual(self.ref_count(first), 1)
+
+        self.assertEqual(remote_images.refresh(self.image.pk), 'not_modified')
+        self.assertEqual(self.origin.requests[-1]['if_none_match'], self.image.etag)
+
+        self.origin.body = jpeg('red')
+        self.assertEqual(remote_images.refresh(self.image.pk), 'updated')
+        self.image.refresh_from_db()
+        self.assertNotEqual(self.image.file.name, first)
+        self.assertEqual((self.ref_count(first), self.ref_count(self.image.file.name)), (0, 1))
+
+    def test_concurrent_refresh_keeps_the_other_workers_file(self):
+        remote_images.refresh(self.image.pk)
+        self.image.refresh_from_db()
+        first = self.image.file.name
+        self.origin.body = jpeg('red')
+
+        def replaced_meanwhile(file):
+            # Another worker stores its own copy while this one builds derivatives
+            CachedRemoteImage.objects.filter(pk=self.image.pk).update(file='remote/other.jpg')
+            return {}
+
+        with mock.patch.object(remote_images, 'build_derivatives', replaced_meanwhile):
+            self.assertEqual(remote_images.refresh(self.image.pk), 'not_modified')
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.file.name, 'remote/other.jpg')
+        # Ours is stored but unreferenced, and the reference counts are untouched
+        ours = StoredBlob.objects.exclude(name=first).get()
+        self.assertEqual((self.ref_count(first), ours.ref_count), (1, 0))
+
+    @override_settings(IMAGE_PROXY_ALLOW_PRIVATE_HOSTS=False)
+    def test_private_addresses_are_refused(self):
+        with self.assertLogs('factchecks.remote_images', 'WARNING'):
+            self.assertEqual(remote_images.refresh(self.image.pk), 'failed')
+        self.image.refresh_from_db()
+        self.assertIn('non-public address', self.image.last_error)
+        self.assertEqual(self.origin.requests, [])
+
+    def test_connection_uses_the_checked_address(self):
+        lookups = self.resolve({'images.example': '127.0.0.1'})
+        CachedRemoteImage.objects.filter(pk=self.image.pk).update(url=f'http://images.example:{self.port}/photo.jpg')
+        self.assertEqual(remote_images.refresh(self.image.pk), 'updated')
+        # One lookup, whose checked answer is the address connected to; Host still names the site
+        self.assertEqual(lookups.count('images.example'), 1)
+        self.assertEqual(self.origin.requests[-1]['host'], f'images.example:{self.port}')
+
+        with override_settings(IMAGE_PROXY_ALLOW_PRIVATE_HOSTS=False), self.assertLogs('factchecks.remote_images', 'WARNING'):
+            self.assertEqual(remote_images.refresh(self.image.pk), 'failed')
+        self.assertEqual(len(self.origin.requests), 1)
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    A minimal SMTP server that keeps the messages it accepts. It refuses
+    recipients whose address contains "refused", and hangs up on ones whose
+    address contains "hangup".
+    """
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 sink ready')
+        recipient = None
+        for line in self.rfile:
+            command = line.decode().strip().split(' ')[0].upper()
+            if command == 'RCPT':
+                recipient = line.decode().split(':', 1)[1].strip().strip('<>')
+                if 'hangup' in recipient:
+                    return
+                self.reply('550 No such user' if 'refused' in recipient else '250 OK')
+            elif command == 'DATA':
+                self.reply('354 Go ahead')
+                data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                self.server.messages.append((recipient, data.decode()))
+                self.reply('250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class NotificationTests(TestCase):
+    """The notification outbox and its worker, against a local SMTP sink"""
+
+    def setUp(self):
+        self.sink = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPSinkHandler)
+        self.sink.daemon_threads = True
+        self.sink.connections, self.sink.messages = 0, []
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+        self.addCleanup(self.sink.server_close)
+        self.addCleanup(self.sink.shutdown)
+        self.enterContext(override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.sink.server_address[1], EMAIL_USE_TLS=False, EMAIL_TIMEOUT=5,
+        ))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def complete(self, email):
+        """Fact-check a submission through the admin endpoint, which queues its notification"""
+        submission = Submission.objects.create(claim_text=f"Claim from {email or 'nobody'}", submitter_email=email)
+        response = self.client.post(
+            reverse('create-factcheck-from-submission', args=[submission.id]),
+            {'title': "Fact-check", 'verdict': 'False', 'summary': "Summary"}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return submission
+
+    def send(self):
+        return notifications.send_batch(notifications.claim_batch('worker-1', 50))
+
+    def test_batch_over_one_connection(self):
+        delivered = [self.complete(f'reader{i}@example.com') for i in range(3)]
+        refused = self.complete('refused@example.com')
+        self.complete('')  # Nobody to notify
+        self.assertEqual(NotificationOutbox.objects.count(), 4)
+        self.assertEqual(self.sink.messages, [])  # Nothing sent from the request
+
+        batch = notifications.claim_batch('worker-1', 50)
+        # One UPDATE for the sent emails, one for their submissions, one per failed email
+        with self.assertNumQueries(3), self.assertLogs('factchecks.notifications', 'WARNING'):
+            self.assertEqual(notifications.send_batch(batch), (3, 1))
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(len(self.sink.messages), 3)
+
+        notified = Submission.objects.filter(pk__in=[submission.pk for submission in delivered])
+        self.assertEqual(notified.filter(user_notified=True, date_notified__isnull=False).count(), 3)
+        self.assertEqual(NotificationOutbox.objects.filter(status='sent').count(), 3)
+
+        # The refused recipient is retried later; the others were still sent
+        outbox = NotificationOutbox.objects.get(submission=refused)
+        self.assertEqual((outbox.status, outbox.attempts), ('queued', 1))
+        self.assertIn('No such user', outbox.last_error)
+        self.assertGreater(outbox.run_after, timezone.now())
+        self.assertFalse(Submission.objects.get(pk=refused.pk).user_notified)
+
+    def test_lost_connection_retries_the_rest(self):
+        for email in ['first@example.com', 'hangup@example.com', 'third@example.com']:
+            self.complete(email)
+        with self.assertLogs('factchecks.notifications', 'WARNING'):
+            self.assertEqual(self.send(), (1, 2))
+        self.assertEqual([recipient for recipient, _ in self.sink.messages], ['first@example.com'])
+        retried = NotificationOutbox.objects.filter(status='queued').order_by('id')
+        self.assertEqual([outbox.recipient for outbox in retried], ['hangup@example.com', 'third@example.com'])
+        self.assertTrue(all('Connection lost' in outbox.last_error for outbox in retried))
+
+    def test_rolled_back_change_queues_nothing(self):
+        submission = Submission.objects.create(claim_text="Claim", submitter_email='reader@example.com')
+
+        def queue_then_fail(*args):
+            notifications.queue_factcheck_notification(*args)
+            raise RuntimeError("Failed after queueing")
+
+        with mock.patch('factchecks.admin_views.queue_factcheck_notification', queue_then_fail), \
+                self.assertRaises(RuntimeError):
+            self.client.post(
+                reverse('create-factcheck-from-submission', args=[submission.id]),
+                {'title': "Fact-check", 'verdict': 'False', 'summary': "Summary"}, format='json',
+            )
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(FactCheck.objects.exists())
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status, 'new')
+        self.assertEqual(notifications.claim_batch('worker-1', 50), [])
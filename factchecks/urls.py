@@ -6,6 +6,7 @@ from .admin_views import create_factcheck_from_submission
 urlpatterns = [
     # This defines the endpoint 'api/factchecks/' and maps it to our view
     path('api/factchecks/', views.FactCheckListView.as_view(), name='factcheck-list'),
+    path('api/factchecks/search/', views.FactCheckSearchView.as_view(), name='factcheck-search'),
     path('api/submit-claim/', views.SubmitClaimView.as_view(), name='submit-claim'),
     path('api/positive-content/', views.PositiveContentView.as_view(), name='positive-content'), 
 
@@ -5,6 +5,7 @@ from django.utils import timezone
 from datetime import timedelta
 from .models import Submission, FactCheck
 from .serializers import UserSubmissionSerializer, UserFactCheckSerializer
+from .fieldsets import SparseFieldsetMixin
 
 class UserDashboardView(generics.RetrieveAPIView):
     """
@@ -17,34 +18,32 @@ class UserDashboardView(generics.RetrieveAPIView):
         thirty_days_ago = timezone.now() - timedelta(days=30)
         
         # Get user's submissions
-        user_submissions = Submission.objects.filter(
-            Q(submitter_email=user.email) | Q(submitter_email__iexact=user.email)
-        )
+        user_submissions = Submission.objects.for_user(user)
         
-        # Get fact-checks that might be related to user's submissions
-        # This is approximate - we look for fact-checks with similar text/URLs
-        user_fact_checks = FactCheck.objects.filter(
-            Q(url_submitted__in=user_submissions.values('url_submitted')) |
-            Q(title__icontains=user_submissions.values('claim_text'))
-        ).distinct()
+        # Fact-checks published for the user's submissions, through the Submission -> FactCheck foreign key
+        user_fact_checks = FactCheck.objects.filter(submission__submitter=user)
         
-        # Dashboard statistics
+        # Dashboard statistics, computed with a single conditional-aggregate query
+        counts = user_submissions.aggregate(
+            total=Count('id', distinct=True),
+            last_30_days=Count('id', filter=Q(date_submitted__gte=thirty_days_ago), distinct=True),
+            in_review=Count('id', filter=Q(status='in_review'), distinct=True),
+            completed=Count('id', filter=Q(status='completed'), distinct=True),
+            published=Count('fact_checks', distinct=True),
+        )
         stats = {
-            'total_submissions': user_submissions.count(),
-            'submissions_last_30_days': user_submissions.filter(
-                date_submitted__gte=thirty_days_ago
-            ).count(),
-            'submissions_in_review': user_submissions.filter(status='in_review').count(),
-            'submissions_completed': user_submissions.filter(status='completed').count(),
-            'submissions_published': user_fact_checks.count(),
+            'total_submissions': counts['total'],
+            'submissions_last_30_days': counts['last_30_days'],
+            'submissions_in_review': counts['in_review'],
+            'submissions_completed': counts['completed'],
+            'submissions_published': counts['published'],
             'completion_rate': round(
-                (user_submissions.filter(status='completed').count() / 
-                 user_submissions.count() * 100) if user_submissions.count() > 0 else 0
+                (counts['completed'] / counts['total'] * 100) if counts['total'] > 0 else 0
             )
         }
         
         # Recent activity
-        recent_submissions = user_submissions.order_by('-date_submitted')[:5]
+        recent_submissions = user_submissions.with_related_factcheck().order_by('-date_submitted')[:5]
         
         return Response({
             'user': {
@@ -58,18 +57,17 @@ class UserDashboardView(generics.RetrieveAPIView):
             'recent_fact_checks': UserFactCheckSerializer(user_fact_checks.order_by('-date_created')[:3], many=True).data
         })
 
-class UserSubmissionsListView(generics.ListAPIView):
+class UserSubmissionsListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Get all submissions for authenticated user.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserSubmissionSerializer
+    deferrable_fields = ('claim_text', 'context')
     
     def get_queryset(self):
         user = self.request.user
-        return Submission.objects.filter(
-            Q(submitter_email=user.email) | Q(submitter_email__iexact=user.email)
-        ).order_by('-date_submitted')
+        return Submission.objects.for_user(user).with_related_factcheck().order_by('-date_submitted')
 
 class UserSubmissionDetailView(generics.RetrieveAPIView):
     """
@@ -80,6 +78,4 @@ class UserSubmissionDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return Submission.objects.filter(
-            Q(submitter_email=user.email) | Q(submitter_email__iexact=user.email)
-        )
\ No newline at end of file
+        return Submission.objects.for_user(user).with_related_factcheck()
\ No newline at end of file
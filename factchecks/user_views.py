@@ -4,6 +4,7 @@ from rest_framework.permissions import IsAdminUser
 from django.contrib.auth.models import User
 from django.db.models import Q
 from .serializers import UserSerializer, UserDetailSerializer
+from .pagination import UserCursorPagination
 
 class AdminUserListView(generics.ListAPIView):
     """
@@ -12,6 +13,7 @@ class AdminUserListView(generics.ListAPIView):
     """
     permission_classes = [IsAdminUser]
     serializer_class = UserSerializer
+    pagination_class = UserCursorPagination
     
     def get_queryset(self):
         queryset = User.objects.all().order_by('-date_joined')
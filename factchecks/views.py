@@ -3,16 +3,39 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import FactCheck, Submission,PositiveContent # Import the new Submission model
 from .serializers import FactCheckSerializer, SubmissionSerializer,PositiveContentSerializer # Import the new serializer
+from .serializers import FactCheckSearchSerializer
 from rest_framework.permissions import IsAuthenticated
+from .pagination import DateCreatedCursorPagination, SearchResultsPagination
+from .search import search_factchecks
+from .caching import VersionedCacheMixin
+from .fieldsets import SparseFieldsetMixin
 
 
-class FactCheckListView(generics.ListAPIView):
+class FactCheckListView(VersionedCacheMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
     API view to list all fact-checks.
     This will handle a GET request and return a list of all FactCheck objects.
+    Responses are cached until a fact-check changes (see factchecks/caching.py).
     """
     queryset = FactCheck.objects.all() # This gets all objects from the FactCheck table
     serializer_class = FactCheckSerializer # This tells the view to use our serializer
+    pagination_class = DateCreatedCursorPagination # Newest first, paginated by cursor
+    response_cache_models = (FactCheck,)
+    deferrable_fields = ('summary',) # Skipped when ?fields=/?omit= leave it out
+
+
+class FactCheckSearchView(VersionedCacheMixin, SparseFieldsetMixin, generics.ListAPIView):
+    """
+    API view to search fact-checks by title and summary.
+    GET /api/factchecks/search/?q=... returns BM25-ranked results with highlighted matches.
+    """
+    serializer_class = FactCheckSearchSerializer
+    pagination_class = SearchResultsPagination
+    response_cache_models = (FactCheck,)
+    deferrable_fields = ('summary',)
+
+    def get_queryset(self):
+        return search_factchecks(self.request.query_params.get('q', ''))
 
 
 
@@ -44,8 +67,8 @@ class SubmitClaimView(APIView):
         
         # Check if the data is valid
         if serializer.is_valid():
-            # Save the valid data to the database
-            serializer.save()
+            # Save the valid data to the database, owned by the logged-in user
+            serializer.save(submitter=user)
             # Return a success response with the saved data
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -57,12 +80,15 @@ class SubmitClaimView(APIView):
 
 
 
-class PositiveContentView(generics.ListAPIView):
+class PositiveContentView(VersionedCacheMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
     API view to list published positive content about Haiti.
+    Responses are cached until positive content changes (see factchecks/caching.py).
     """
-    queryset = PositiveContent.objects.filter(is_published=True)
+    queryset = PositiveContent.objects.filter(is_published=True).select_related('remote_image').order_by('-date_created')
     serializer_class = PositiveContentSerializer
+    response_cache_models = (PositiveContent,)
+    deferrable_fields = ('description', 'image_derivatives')
     
     def get_serializer_context(self):
         """